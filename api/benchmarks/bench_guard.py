@@ -0,0 +1,87 @@
+"""
+Benchmark do guard de autenticação (services.guard.get_current_user).
+
+Mede a latência por chamada em três cenários:
+  - banco:      cache desligado, uma consulta de User por requisição (antes)
+  - cache:      usuário já verificado no PrincipalCache
+  - sem estado: AUTH_STATELESS, usuário montado a partir das claims do token
+
+Uso (dentro de api/):
+    JWT_TOKEN=... python -m benchmarks.bench_guard --repeat 2000
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from sqlmodel import Session, SQLModel, select
+
+from database import models  # noqa: F401 (registra as tabelas no metadata)
+from database.config import async_engine, engine
+from database.models import User
+from services import guard
+from services.auth_service import AuthService, hash_password, load_jwt_secret
+
+USUARIO = "bench_guard"
+
+
+def garantir_usuario() -> User:
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        user = session.exec(select(User).where(User.username == USUARIO)).first()
+        if user is None:
+            user = User(username=USUARIO, hashed_password=hash_password("bench"))
+            session.add(user)
+            session.commit()
+            session.refresh(user)
+        return user
+
+
+async def medir(token: str, repeat: int, preparar) -> list:
+    tempos = []
+    for _ in range(repeat):
+        preparar()
+        inicio = time.perf_counter()
+        await guard.get_current_user(token)
+        tempos.append(time.perf_counter() - inicio)
+    return tempos
+
+
+def percentil(tempos: list, p: float) -> float:
+    ordenados = sorted(tempos)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p))] * 1000
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    load_jwt_secret()
+    user = garantir_usuario()
+    token = AuthService(None).create_access_token(user.username, user_id=user.id)
+
+    cenarios = {
+        "banco": (False, guard.principal_cache.clear),
+        "cache": (False, lambda: None),
+        "sem estado": (True, lambda: None),
+    }
+
+    print(f"[BENCH] repeat={args.repeat}")
+    print(f"{'cenário':<12} {'p50 (ms)':>10} {'p95 (ms)':>10} {'média (ms)':>11}")
+    try:
+        for nome, (stateless, preparar) in cenarios.items():
+            guard.AUTH_STATELESS = stateless
+            # aquece pool de conexões e cache
+            await medir(token, 20, preparar)
+            tempos = await medir(token, args.repeat, preparar)
+            print(
+                f"{nome:<12} {percentil(tempos, 0.5):>10.3f} {percentil(tempos, 0.95):>10.3f}"
+                f" {statistics.mean(tempos) * 1000:>11.3f}"
+            )
+    finally:
+        await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
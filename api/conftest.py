@@ -0,0 +1,19 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def usuario_autenticado(request):
+    """
+    As rotas protegidas por get_current_user recebem um usuário fixo. Testes
+    marcados com auth_real (login, logout, revogação) usam o guard de verdade.
+    """
+    if request.node.get_closest_marker("auth_real"):
+        yield
+        return
+    from api.main import app
+    from database.models import User
+    from services.guard import get_current_user
+
+    app.dependency_overrides[get_current_user] = lambda: User(id=1, username="teste", hashed_password="")
+    yield
+    app.dependency_overrides.pop(get_current_user, None)
@@ -0,0 +1,193 @@
+from dataclasses import dataclass, field
+from typing import List
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import DBAPIError
+
+# Migrações de schema aplicadas depois do create_all do SQLModel (que só cria
+# tabelas novas). Cada migração roda uma única vez, na sua própria transação,
+# e fica registrada em schema_migrations. Para mudar o schema, acrescente uma
+# nova entrada no fim da lista; nunca edite uma migração já publicada.
+
+# Evita que dois workers do uvicorn apliquem a mesma migração ao mesmo tempo
+ADVISORY_LOCK_ID = 7_420_231
+
+
+@dataclass
+class Migration:
+    version: str
+    statements: List[str] = field(default_factory=list)
+    # Migrações opcionais (ex.: extensões que exigem superusuário) não abortam
+    # a subida; ficam pendentes e são tentadas de novo na próxima.
+    optional: bool = False
+
+
+MIGRATIONS: List[Migration] = [
+    # tsvector em português da ementa. Como a coluna é STORED, o ALTER TABLE
+    # calcula o valor para as linhas já existentes (backfill).
+    Migration("0001_busca_ementa_fts", [
+        """
+        ALTER TABLE atonormativo
+        ADD COLUMN IF NOT EXISTS ementa_tsv tsvector
+        GENERATED ALWAYS AS (to_tsvector('portuguese'::regconfig, coalesce(ementa, ''))) STORED
+        """,
+        "CREATE INDEX IF NOT EXISTS ix_atonormativo_ementa_tsv ON atonormativo USING gin (ementa_tsv)",
+    ]),
+    # Índice trigram para search_mode=substring (ILIKE '%termo%')
+    Migration("0002_busca_ementa_trgm", [
+        "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+        "CREATE INDEX IF NOT EXISTS ix_atonormativo_ementa_trgm ON atonormativo USING gin (ementa gin_trgm_ops)",
+    ], optional=True),
+    # Chave natural do ato, só entre os ativos. As duplicatas ativas
+    # inseridas por re-execuções do bot são excluídas logicamente (fica a
+    # mais antiga) e descontadas do resumo diário; nada é apagado.
+    # (Bancos que aplicaram a versão anterior desta migração, com DELETE e
+    # índice não parcial, são acertados pela 0007.)
+    Migration("0003_chave_natural_ato", [
+        """
+        WITH duplicados AS (
+            UPDATE atonormativo SET deleted = true
+            WHERE id IN (
+                SELECT id FROM (
+                    SELECT id, row_number() OVER (
+                        PARTITION BY tipo_ato, numero_ato, orgao, data_publicacao
+                        ORDER BY id
+                    ) AS rn
+                    FROM atonormativo
+                    WHERE deleted = false
+                ) t
+                WHERE t.rn > 1
+            )
+            RETURNING data_publicacao, orgao, tipo_ato
+        )
+        UPDATE atoresumodiario r SET total = r.total - d.n
+        FROM (
+            SELECT data_publicacao, orgao, tipo_ato, count(*) AS n
+            FROM duplicados GROUP BY data_publicacao, orgao, tipo_ato
+        ) d
+        WHERE r.data_publicacao = d.data_publicacao AND r.orgao = d.orgao AND r.tipo_ato = d.tipo_ato
+        """,
+        """
+        CREATE UNIQUE INDEX IF NOT EXISTS ux_atonormativo_chave_natural_ativos
+        ON atonormativo (tipo_ato, numero_ato, orgao, data_publicacao) WHERE deleted = false
+        """,
+    ]),
+    # Índices parciais para os filtros da API, que sempre excluem deleted.
+    # (data_publicacao, id) casa com a ordenação/cursor da listagem.
+    Migration("0004_indices_parciais_ato", [
+        """
+        CREATE INDEX IF NOT EXISTS ix_atonormativo_data_publicacao_ativos
+        ON atonormativo (data_publicacao, id) WHERE deleted = false
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS ix_atonormativo_orgao_tipo_ativos
+        ON atonormativo (orgao, tipo_ato) WHERE deleted = false
+        """,
+        "CREATE INDEX IF NOT EXISTS ix_execucaolog_data_hora ON execucaolog (data_hora)",
+    ]),
+    # Perfil de tempo por etapa enviado pelo RPA junto com o log
+    Migration("0005_perfil_execucao", [
+        "ALTER TABLE execucaolog ADD COLUMN IF NOT EXISTS perfil jsonb",
+    ]),
+    # Métricas estruturadas por execução. A tabela filha execucaologdata (por
+    # data de publicação) e seus índices são criados pelo create_all.
+    Migration("0006_metricas_execucao", [
+        """
+        ALTER TABLE execucaolog
+        ADD COLUMN IF NOT EXISTS paginas_visitadas integer,
+        ADD COLUMN IF NOT EXISTS linhas_extraidas integer,
+        ADD COLUMN IF NOT EXISTS linhas_enviadas integer,
+        ADD COLUMN IF NOT EXISTS linhas_com_falha integer,
+        ADD COLUMN IF NOT EXISTS api_latencia_p50_ms double precision,
+        ADD COLUMN IF NOT EXISTS api_latencia_p95_ms double precision,
+        ADD COLUMN IF NOT EXISTS navegador_inicializacao_segundos double precision
+        """,
+    ]),
+    # Chave natural só entre atos ativos: um ato excluído logicamente pode
+    # ser cadastrado/reenviado de novo (vira uma linha nova). Em bancos
+    # novos a 0003 já cria o índice parcial e isto não faz nada.
+    Migration("0007_chave_natural_ativos", [
+        """
+        CREATE UNIQUE INDEX IF NOT EXISTS ux_atonormativo_chave_natural_ativos
+        ON atonormativo (tipo_ato, numero_ato, orgao, data_publicacao) WHERE deleted = false
+        """,
+        "DROP INDEX IF EXISTS ux_atonormativo_chave_natural",
+    ]),
+    # Revogação de tokens por usuário (POST /logout), compartilhada entre workers
+    Migration("0008_revogacao_tokens", [
+        'ALTER TABLE "user" ADD COLUMN IF NOT EXISTS tokens_revogados_em integer',
+    ]),
+    # Revogação por versão do token: o instante em segundos deixava valer um
+    # token emitido no mesmo segundo do logout (inclusive o usado nele)
+    Migration("0009_versao_token", [
+        'ALTER TABLE "user" ADD COLUMN IF NOT EXISTS token_versao integer NOT NULL DEFAULT 0',
+        'ALTER TABLE "user" DROP COLUMN IF EXISTS tokens_revogados_em',
+    ]),
+    # Geração do cache dos dashboards compartilhada entre workers
+    Migration("0010_geracao_cache_dashboard", [
+        "CREATE SEQUENCE IF NOT EXISTS dashboard_cache_geracao",
+    ]),
+]
+
+
+def _ensure_table(engine: Engine):
+    with engine.begin() as conn:
+        conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version VARCHAR PRIMARY KEY,
+                applied_at TIMESTAMP NOT NULL DEFAULT now()
+            )
+        """))
+
+
+def applied_versions(engine: Engine) -> List[str]:
+    _ensure_table(engine)
+    with engine.connect() as conn:
+        return list(conn.execute(text("SELECT version FROM schema_migrations ORDER BY version")).scalars())
+
+
+def run_migrations(engine: Engine):
+    """Aplica as migrações pendentes, em ordem."""
+    _ensure_table(engine)
+
+    for migration in MIGRATIONS:
+        try:
+            with engine.begin() as conn:
+                conn.execute(text("SELECT pg_advisory_xact_lock(:id)"), {"id": ADVISORY_LOCK_ID})
+                ja_aplicada = conn.execute(
+                    text("SELECT 1 FROM schema_migrations WHERE version = :v"),
+                    {"v": migration.version},
+                ).first()
+                if ja_aplicada:
+                    continue
+
+                print(f"[MIGRATION] Aplicando {migration.version}...")
+                for stmt in migration.statements:
+                    conn.execute(text(stmt))
+                conn.execute(
+                    text("INSERT INTO schema_migrations (version) VALUES (:v)"),
+                    {"v": migration.version},
+                )
+        except DBAPIError as e:
+            if not migration.optional:
+                raise
+            print(f"[MIGRATION] {migration.version} (opcional) não aplicada: {e.orig}")
+
+
+if __name__ == "__main__":
+    import sys
+    from sqlmodel import SQLModel
+
+    from database import models  # noqa: F401 (registra as tabelas no metadata)
+    from database.config import engine
+
+    if "--status" in sys.argv:
+        aplicadas = set(applied_versions(engine))
+        for migration in MIGRATIONS:
+            marca = "x" if migration.version in aplicadas else " "
+            print(f"[{marca}] {migration.version}")
+    else:
+        SQLModel.metadata.create_all(engine)
+        run_migrations(engine)
+        print("[OK] Migrações aplicadas.")
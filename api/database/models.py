@@ -1,6 +1,8 @@
+from sqlalchemy import Column
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlmodel import SQLModel, Field
 from datetime import datetime, date
-from typing import Optional
+from typing import Any, Dict, List, Optional
 
 class AtoNormativo(SQLModel, table=True):
   id: Optional[int] = Field(default=None, primary_key=True)
@@ -12,6 +14,22 @@ class AtoNormativo(SQLModel, table=True):
   created_at: datetime = Field(default_factory=datetime.now)
   deleted: bool = Field(default=False)
 
+class AtoNormativoEntrada(SQLModel):
+    """Corpo do POST /atos/ e item da carga em lote (POST /atos/bulk)."""
+    tipo_ato: str
+    numero_ato: int
+    orgao: str
+    data_publicacao: date
+    ementa: str
+
+class AtoNormativoAtualizacao(SQLModel):
+    """Corpo do PUT /atos/{id}: só os campos enviados são alterados."""
+    tipo_ato: Optional[str] = None
+    numero_ato: Optional[int] = None
+    orgao: Optional[str] = None
+    data_publicacao: Optional[date] = None
+    ementa: Optional[str] = None
+
 class ExecucaoLog(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     data_hora: datetime = Field(default_factory=datetime.now)
@@ -19,8 +37,59 @@ class ExecucaoLog(SQLModel, table=True):
     tempo_execucao_segundos: float
     status: str 
     mensagem_erro: Optional[str] = None
+    # Tempo por etapa da raspagem enviado pelo RPA (navigate, fill, submit...)
+    perfil: Optional[Dict[str, Any]] = Field(default=None, sa_column=Column(JSONB))
+    # Métricas estruturadas da execução (nulas em logs antigos)
+    paginas_visitadas: Optional[int] = None
+    linhas_extraidas: Optional[int] = None
+    linhas_enviadas: Optional[int] = None
+    linhas_com_falha: Optional[int] = None
+    api_latencia_p50_ms: Optional[float] = None
+    api_latencia_p95_ms: Optional[float] = None
+    navegador_inicializacao_segundos: Optional[float] = None
+
+class ExecucaoLogDataBase(SQLModel):
+    data_publicacao: date
+    duracao_segundos: float
+    paginas: int = 0
+    linhas_extraidas: int = 0
+    linhas_enviadas: int = 0
+    linhas_com_falha: int = 0
+    erro: Optional[str] = None
+
+class ExecucaoLogData(ExecucaoLogDataBase, table=True):
+    """Métricas de uma data de publicação processada numa execução do RPA."""
+    id: Optional[int] = Field(default=None, primary_key=True)
+    execucao_id: int = Field(foreign_key="execucaolog.id", ondelete="CASCADE", index=True)
+    data_publicacao: date = Field(index=True)
+
+class ExecucaoLogEntrada(SQLModel):
+    """Corpo do POST /logs/: o log da execução e, opcionalmente, as métricas por data."""
+    data_hora: Optional[datetime] = None
+    registros_capturados: int
+    tempo_execucao_segundos: float
+    status: str
+    mensagem_erro: Optional[str] = None
+    perfil: Optional[Dict[str, Any]] = None
+    paginas_visitadas: Optional[int] = None
+    linhas_extraidas: Optional[int] = None
+    linhas_enviadas: Optional[int] = None
+    linhas_com_falha: Optional[int] = None
+    api_latencia_p50_ms: Optional[float] = None
+    api_latencia_p95_ms: Optional[float] = None
+    navegador_inicializacao_segundos: Optional[float] = None
+    datas: List[ExecucaoLogDataBase] = []
 
 class User(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     username: str = Field(index=True, unique=True, nullable=False)
-    hashed_password: str
\ No newline at end of file
+    hashed_password: str
+    # Incrementada a cada logout: tokens com versão ("ver") menor são recusados
+    token_versao: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
+
+class AtoResumoDiario(SQLModel, table=True):
+    """Contagem de atos não excluídos por dia de publicação, órgão e tipo."""
+    data_publicacao: date = Field(primary_key=True)
+    orgao: str = Field(primary_key=True)
+    tipo_ato: str = Field(primary_key=True)
+    total: int = Field(default=0)
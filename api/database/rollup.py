@@ -0,0 +1,87 @@
+from datetime import date
+from typing import Dict, Tuple, Union
+
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import insert
+from sqlmodel import Session, select, delete
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from database.models import AtoNormativo, AtoResumoDiario
+
+# Tabela atoresumodiario: contagens por (data_publicacao, orgao, tipo_ato),
+# mantidas pelo AtoService na mesma transação da escrita do ato. Os dashboards
+# sem busca textual leem daqui, custando O(dias x grupos) e não O(linhas).
+
+
+async def ajustar_resumo(
+    session: AsyncSession,
+    data_publicacao: Union[date, str],
+    orgao: str,
+    tipo_ato: str,
+    delta: int,
+):
+    """Soma delta à contagem da chave. Não faz commit."""
+    stmt = insert(AtoResumoDiario).values(
+        data_publicacao=data_publicacao, orgao=orgao, tipo_ato=tipo_ato, total=delta
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["data_publicacao", "orgao", "tipo_ato"],
+        set_={"total": AtoResumoDiario.total + stmt.excluded.total},
+    )
+    await session.exec(stmt)
+
+    if delta < 0:
+        await session.exec(
+            delete(AtoResumoDiario).where(
+                AtoResumoDiario.data_publicacao == data_publicacao,
+                AtoResumoDiario.orgao == orgao,
+                AtoResumoDiario.tipo_ato == tipo_ato,
+                AtoResumoDiario.total <= 0,
+            )
+        )
+
+
+async def incrementar_resumo_lote(session: AsyncSession, contagens: Dict[Tuple[date, str, str], int]):
+    """Versão em lote de ajustar_resumo para deltas positivos: um único upsert."""
+    if not contagens:
+        return
+    stmt = insert(AtoResumoDiario).values([
+        {"data_publicacao": d, "orgao": o, "tipo_ato": t, "total": n}
+        for (d, o, t), n in contagens.items()
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["data_publicacao", "orgao", "tipo_ato"],
+        set_={"total": AtoResumoDiario.total + stmt.excluded.total},
+    )
+    await session.exec(stmt)
+
+
+def rebuild_rollup(session: Session):
+    """Recalcula a tabela inteira a partir de atonormativo."""
+    session.exec(delete(AtoResumoDiario))
+    session.exec(text("""
+        INSERT INTO atoresumodiario (data_publicacao, orgao, tipo_ato, total)
+        SELECT data_publicacao, orgao, tipo_ato, count(*)
+        FROM atonormativo
+        WHERE deleted = false
+        GROUP BY data_publicacao, orgao, tipo_ato
+    """))
+    session.commit()
+
+
+def rebuild_if_empty(session: Session):
+    """Na primeira subida com a tabela nova, popula a partir dos atos existentes."""
+    if session.exec(select(AtoResumoDiario).limit(1)).first() is not None:
+        return
+    if session.exec(select(AtoNormativo.id).limit(1)).first() is None:
+        return
+    print("[ROLLUP] Tabela de resumo vazia, reconstruindo...")
+    rebuild_rollup(session)
+
+
+if __name__ == "__main__":
+    from database.config import engine
+
+    with Session(engine) as session:
+        rebuild_rollup(session)
+    print("[OK] Resumo diário reconstruído.")
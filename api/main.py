@@ -1,13 +1,21 @@
-from typing import List
-from fastapi import FastAPI, WebSocket
+from fastapi import FastAPI
 from contextlib import asynccontextmanager
 from fastapi.params import Depends
-from sqlmodel import SQLModel, create_engine
+from sqlmodel import SQLModel, Session
 from router.logs_router import logs_router
 from router.ato_router import router 
 from router.auth_router import auth_router
+from router.metrics_router import metrics_router
 from router.redirects_router import router_redirect
+from router.ws_router import ws_router
 from services.guard import get_current_user
+from services.auth_service import load_jwt_secret
+from services.password_hasher import password_hasher
+from services.event_stream import manager
+from services.pubsub import broker
+from database.migrations import run_migrations
+from database.rollup import rebuild_if_empty
+from database.config import async_engine, engine
 import os
 from dotenv import load_dotenv
 from pathlib import Path
@@ -20,31 +28,22 @@ if not DATABASE_URL:
     raise ValueError("DATABASE_URL não está configurada no ambiente.")
 
 
-class ConnectionManager:
-    def __init__(self):
-        self.active_connections: List[WebSocket] = []
-
-    async def connect(self, websocket: WebSocket):
-        await websocket.accept()
-        self.active_connections.append(websocket)
-
-    def disconnect(self, websocket: WebSocket):
-        self.active_connections.remove(websocket)
-
-    async def broadcast(self, message: str):
-        for connection in self.active_connections:
-            await connection.send_text(message)
-
-manager = ConnectionManager()
-
-
-engine = create_engine(DATABASE_URL)
-
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     
+    load_jwt_secret()
     SQLModel.metadata.create_all(engine)
+    run_migrations(engine)
+    with Session(engine) as session:
+        rebuild_if_empty(session)
+    # memory ou postgres (LISTEN/NOTIFY entre workers), via EVENTS_BACKEND
+    await broker.start()
     yield
+    await broker.stop()
+    await manager.disconnect_all()
+    password_hasher.shutdown()
+    await async_engine.dispose()
+    engine.dispose()
 
 app = FastAPI(
     title="API RF - Service Layer",
@@ -57,6 +56,9 @@ app.include_router(router, tags=["Atos Normativos"], dependencies=[Depends(get_c
 app.include_router(router_redirect)
 app.include_router(logs_router, tags=["Logs"], dependencies=[Depends(get_current_user)])
 app.include_router(auth_router, tags=["Autenticação"] )
+app.include_router(metrics_router, tags=["Métricas"], dependencies=[Depends(get_current_user)])
+# Autenticação no handshake (token na query ou no header Authorization)
+app.include_router(ws_router, tags=["Tempo real"])
 
 
 
@@ -1,49 +1,76 @@
-from fastapi import APIRouter, Depends
-from sqlmodel import Session
+from fastapi import APIRouter, Depends, Query, Request
+from sqlmodel.ext.asyncio.session import AsyncSession
 from datetime import date
 from typing import Optional, List
 
-from database.config import get_session
-from database.models import AtoNormativo, ExecucaoLog
-from services.ato_service import AtoService 
+from database.config import get_async_session
+from database.models import AtoNormativo, AtoNormativoAtualizacao, AtoNormativoEntrada, ExecucaoLog
+from services.ato_service import AtoService, PAGE_SIZE_PADRAO, validar_granularidade, validar_search_mode
+from services.response_cache import dashboard_cache, normalizar_busca
 
 router = APIRouter()
 
-@router.get("/atos/", response_model=List[AtoNormativo])
-def read_atos(
+@router.get("/atos/")
+async def read_atos(
     data_publicacao: Optional[date] = None,
     search: Optional[str] = None,
-    session: Session = Depends(get_session)
+    cursor: Optional[str] = None,
+    limit: int = Query(PAGE_SIZE_PADRAO, ge=1),
+    fields: Optional[str] = Query(None, description="Campos separados por vírgula, ex: id,numero_ato,tipo_ato"),
+    search_mode: str = Query("fts", description="fts (texto completo, por relevância) ou substring"),
+    session: AsyncSession = Depends(get_async_session)
 ):
     
-    return AtoService(session).get_atos_filtrados(
+    return await AtoService(session).get_atos_filtrados(
         data_publicacao=data_publicacao,
-        search=search
+        search=search,
+        cursor=cursor,
+        limit=limit,
+        fields=fields,
+        search_mode=search_mode
     )
 @router.get("/atos/{ato_id}", response_model=AtoNormativo)
-def get_ato_by_id(ato_id: int, session: Session = Depends(get_session)) -> AtoNormativo:
-    ato = AtoService(session).get_ato_by_id(ato_id)
+async def get_ato_by_id(ato_id: int, session: AsyncSession = Depends(get_async_session)) -> AtoNormativo:
+    ato = await AtoService(session).get_ato_by_id(ato_id)
     return ato
 
 @router.get("/dashboard/")
-def get_dashboard_data(
+async def get_dashboard_data(
+    request: Request,
     data_inicio: Optional[date] = None,
     data_fim: Optional[date] = None,
     search: Optional[str] = None, # Novo campo de busca
-    session: Session = Depends(get_session)
+    search_mode: str = "fts",
+    granularidade: Optional[str] = Query(None, description="dia, semana ou mes"),
+    session: AsyncSession = Depends(get_async_session)
 ):
-    return AtoService(session).get_dados_dashboard(data_inicio, data_fim, search)
+    # Valida antes do cache: parâmetro inválido dá 400 com ou sem cache
+    search = normalizar_busca(search)
+    if search:
+        validar_search_mode(search_mode)
+    validar_granularidade(granularidade)
+    return await dashboard_cache.responder(
+        request,
+        session,
+        "dashboard",
+        {"data_inicio": data_inicio, "data_fim": data_fim, "search": search, "search_mode": search_mode, "granularidade": granularidade},
+        lambda: AtoService(session).get_dados_dashboard(data_inicio, data_fim, search, search_mode, granularidade),
+    )
 
 
 @router.post("/atos/", response_model=AtoNormativo, status_code=201)
-def create_ato(ato: AtoNormativo, session: Session = Depends(get_session)):
-    return AtoService(session).create_ato(ato)
+async def create_ato(ato: AtoNormativoEntrada, session: AsyncSession = Depends(get_async_session)):
+    return await AtoService(session).create_ato(ato)
+
+@router.post("/atos/bulk")
+async def bulk_upsert_atos(atos: List[AtoNormativoEntrada], session: AsyncSession = Depends(get_async_session)):
+    return await AtoService(session).upsert_atos(atos)
 
 @router.put("/atos/{ato_id}", response_model=AtoNormativo)
-def update_ato(ato_id: int, ato_data: AtoNormativo, session: Session = Depends(get_session)):
-    return AtoService(session).update_ato(ato_id, ato_data)
+async def update_ato(ato_id: int, ato_data: AtoNormativoAtualizacao, session: AsyncSession = Depends(get_async_session)):
+    return await AtoService(session).update_ato(ato_id, ato_data)
 
 @router.delete("/atos/{ato_id}", status_code=204)
-def delete_ato(ato_id: int, session: Session = Depends(get_session)):
-    return AtoService(session).delete_ato(ato_id)
+async def delete_ato(ato_id: int, session: AsyncSession = Depends(get_async_session)):
+    return await AtoService(session).delete_ato(ato_id)
 
@@ -1,26 +1,55 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.security import  OAuth2PasswordRequestForm
-from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from database.config import get_session
-from services.auth_service import AuthService
+from database.config import get_async_session
+from database.models import User
+from services.auth_service import TOKEN_EXPIRES_SECONDS, AuthService
+from services.guard import get_current_user, revoke_user
+from services.rate_limit import login_limiter
 
 auth_router = APIRouter()
 
 
 @auth_router.post("/usuarios/", tags=["Autenticação"])
-def criar_usuario(user_data: dict, session: Session = Depends(get_session)):
-    return AuthService(session).criar_usuario(user_data)
+async def criar_usuario(user_data: dict, session: AsyncSession = Depends(get_async_session)):
+    return await AuthService(session).criar_usuario(user_data)
 
 
 @auth_router.post("/token", tags=["Autenticação"])
-def login(form_data: OAuth2PasswordRequestForm = Depends(), session: Session = Depends(get_session)):
+async def login(
+    request: Request,
+    form_data: OAuth2PasswordRequestForm = Depends(),
+    session: AsyncSession = Depends(get_async_session),
+):
+    # Conta só as falhas, por username + IP: um atacante não bloqueia o login
+    # do robô/admin a partir de outro endereço, e o sucesso zera a contagem
+    ip = request.client.host if request.client else "desconhecido"
+    chave = f"{form_data.username.strip().lower()}|{ip}"
+    retry_after = login_limiter.retry_after(chave)
+    if retry_after:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Muitas tentativas de login, tente novamente mais tarde",
+            headers={"Retry-After": str(int(retry_after) + 1)},
+        )
+
     service = AuthService(session)
-    user = service.authenticate_user(form_data.username, form_data.password)
+    user = await service.authenticate_user(form_data.username, form_data.password)
     if not user:
+        login_limiter.hit(chave)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Usuário ou senha incorretos",
         )
-    token = service.create_access_token(user.username)
-    return {"access_token": token, "token_type": "bearer"}
+    login_limiter.reset(chave)
+    token = service.create_access_token(user.username, TOKEN_EXPIRES_SECONDS, user_id=user.id, versao=user.token_versao)
+    # expires_in permite ao cliente (RPA) reaproveitar o token até perto de expirar
+    return {"access_token": token, "token_type": "bearer", "expires_in": TOKEN_EXPIRES_SECONDS}
+
+
+@auth_router.post("/logout", tags=["Autenticação"], status_code=204)
+async def logout(user: User = Depends(get_current_user), session: AsyncSession = Depends(get_async_session)):
+    """Revoga todos os tokens já emitidos para o usuário (sai de todas as sessões)."""
+    versao = await AuthService(session).revogar_tokens(user.id)
+    revoke_user(user.id, versao)
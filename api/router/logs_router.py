@@ -1,27 +1,54 @@
 from datetime import date
-from typing import Optional
-from fastapi import APIRouter, Depends
-from sqlmodel import Session
+from typing import List, Optional
+from fastapi import APIRouter, Depends, Query, Request
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from services.logs_service import LogsService
+from services.response_cache import dashboard_cache
 
-from database.config import get_session
-from database.models import ExecucaoLog
+from database.config import get_async_session
+from database.models import ExecucaoLog, ExecucaoLogData, ExecucaoLogEntrada
 
 
 logs_router = APIRouter()
 
 @logs_router.post("/logs/", response_model=ExecucaoLog, status_code=201)
-def create_log(log: ExecucaoLog, session: Session = Depends(get_session)):
-  return LogsService(session).create_log(log)
+async def create_log(log: ExecucaoLogEntrada, session: AsyncSession = Depends(get_async_session)):
+  return await LogsService(session).create_log(log)
 
 @logs_router.get("/logs/dashboard/")
-def get_dashboard_data(
+async def get_dashboard_data(
+    request: Request,
     data_inicio: Optional[date] = None,
     data_fim: Optional[date] = None,
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ):
-    return LogsService(session).get_dashboard_data(
-        data_inicio=data_inicio,
-        data_fim=data_fim
-    )
\ No newline at end of file
+    return await dashboard_cache.responder(
+        request,
+        session,
+        "logs_dashboard",
+        {"data_inicio": data_inicio, "data_fim": data_fim},
+        lambda: LogsService(session).get_dashboard_data(data_inicio=data_inicio, data_fim=data_fim),
+    )
+
+@logs_router.get("/logs/tendencias/execucoes/")
+async def get_serie_execucoes(
+    ultimas: int = Query(30, ge=1, le=1000),
+    session: AsyncSession = Depends(get_async_session)
+):
+    return await LogsService(session).get_serie_execucoes(ultimas=ultimas)
+
+@logs_router.get("/logs/tendencias/datas-lentas/")
+async def get_datas_lentas(
+    ultimas_execucoes: int = Query(30, ge=1, le=1000),
+    limite: int = Query(10, ge=1, le=100),
+    session: AsyncSession = Depends(get_async_session)
+):
+    return await LogsService(session).get_datas_lentas(
+        ultimas_execucoes=ultimas_execucoes,
+        limite=limite
+    )
+
+@logs_router.get("/logs/{execucao_id}/datas/", response_model=List[ExecucaoLogData])
+async def get_datas_execucao(execucao_id: int, session: AsyncSession = Depends(get_async_session)):
+    return await LogsService(session).get_datas_execucao(execucao_id)
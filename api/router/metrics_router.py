@@ -0,0 +1,28 @@
+from fastapi import APIRouter
+
+from database.config import pool_status
+from services.event_stream import manager
+from services.guard import principal_cache
+from services.pubsub import broker
+from services.response_cache import dashboard_cache
+from services.password_hasher import password_hasher
+from services.rate_limit import login_limiter
+
+
+metrics_router = APIRouter()
+
+@metrics_router.get("/metrics/")
+async def get_metrics():
+    return {
+        "pool": pool_status(),
+        "auth_cache": principal_cache.stats(),
+        "password_hasher": password_hasher.stats(),
+        "login_rate_limit": {
+            "limit": login_limiter.limit,
+            "window_seconds": login_limiter.window_seconds,
+            "rejected": login_limiter.rejected,
+        },
+        "websocket": manager.status(),
+        "eventos": broker.status(),
+        "dashboard_cache": dashboard_cache.stats(),
+    }
@@ -0,0 +1,45 @@
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query, WebSocket, WebSocketDisconnect, status
+
+from services.event_stream import manager
+from services.guard import get_current_user
+
+
+ws_router = APIRouter()
+
+@ws_router.websocket("/ws/atos")
+async def atos_stream(
+    websocket: WebSocket,
+    token: Optional[str] = Query(None, description="JWT (navegadores não enviam Authorization no WebSocket)"),
+    tipos: Optional[str] = Query(None, description="Prefixos de evento separados por vírgula, ex: ato.,execucao."),
+):
+    """
+    Eventos em tempo real: ato.criado, ato.atualizado, ato.excluido,
+    atos.lote (carga do RPA) e execucao.registrada. "resync" indica que
+    eventos foram descartados e o cliente deve recarregar os dados.
+    """
+    if not token:
+        autorizacao = websocket.headers.get("authorization", "")
+        if autorizacao.lower().startswith("bearer "):
+            token = autorizacao[7:]
+
+    # Autentica no handshake: token inválido fecha antes do accept (HTTP 403)
+    try:
+        user = await get_current_user(token or "")
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    prefixos = [t.strip() for t in tipos.split(",") if t.strip()] if tipos else None
+    conexao = await manager.connect(
+        websocket, prefixos,
+        saudacao={"tipo": "conectado", "usuario": user.username, "tipos": prefixos},
+    )
+    try:
+        # Mensagens do cliente são ignoradas; o loop só detecta a desconexão
+        while (await websocket.receive())["type"] != "websocket.disconnect":
+            pass
+    except WebSocketDisconnect:
+        pass
+    finally:
+        await manager.disconnect(conexao)
@@ -1,106 +1,441 @@
 from fastapi import HTTPException
 from fastapi.params import Depends
-from sqlmodel import Session, select, func, and_
+from sqlmodel import select, func, and_
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy import Date, Integer, cast, column, literal_column, or_, true, tuple_
+from sqlalchemy.dialects.postgresql import DOUBLE_PRECISION, TSVECTOR, insert
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.sql import func
-from datetime import date
-from typing import Any, List, Optional
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional
+import base64
+import binascii
+import json
 
-from database.config import get_session
-from database.models import AtoNormativo, ExecucaoLog
+from database.models import AtoNormativo, AtoNormativoAtualizacao, AtoNormativoEntrada, AtoResumoDiario, ExecucaoLog
+from database.rollup import ajustar_resumo, incrementar_resumo_lote
+from services.pubsub import publicar_evento
+from services.response_cache import dashboard_cache
 
 
+# Paginação por cursor (keyset em data_publicacao, id)
+PAGE_SIZE_PADRAO = 50
+PAGE_SIZE_MAXIMO = 500
+CAMPOS_PROJETAVEIS = tuple(AtoNormativo.model_fields.keys())
+
+# Busca na ementa: "fts" usa o tsvector indexado (ementa_tsv, ver
+# database/migrations.py) com ranking; "substring" usa ILIKE, coberto pelo
+# índice trigram quando o pg_trgm está disponível.
+SEARCH_MODES = ("fts", "substring")
+FTS_CONFIG = literal_column("'portuguese'::regconfig")
+ementa_tsv = column("ementa_tsv", TSVECTOR)
+
+
+def encode_cursor(chave: List[Any]) -> str:
+    valores = [v.isoformat() if isinstance(v, date) else v for v in chave]
+    raw = json.dumps(valores).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, ranked: bool = False) -> List[Any]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        valores = json.loads(base64.urlsafe_b64decode(padded))
+        if ranked:
+            rank, data_iso, ato_id = valores
+            return [float(rank), date.fromisoformat(data_iso), int(ato_id)]
+        data_iso, ato_id = valores
+        return [date.fromisoformat(data_iso), int(ato_id)]
+    except (binascii.Error, ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+
+def parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    if not fields:
+        return None
+    campos = [f.strip() for f in fields.split(",") if f.strip()]
+    invalidos = [f for f in campos if f not in CAMPOS_PROJETAVEIS]
+    if invalidos:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Campos inválidos em fields: {', '.join(invalidos)}"
+        )
+    # Remove duplicados mantendo a ordem pedida
+    return list(dict.fromkeys(campos)) or None
+
+
+def validar_search_mode(search_mode: str):
+    if search_mode not in SEARCH_MODES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"search_mode inválido. Use: {', '.join(SEARCH_MODES)}"
+        )
+
+
+def search_filter(search: str, search_mode: str = "fts"):
+    """Condição de busca na ementa (e no número do ato, se o termo for numérico)."""
+    validar_search_mode(search_mode)
+
+    termo = search.strip()
+    if search_mode == "fts":
+        cond = ementa_tsv.bool_op("@@")(func.websearch_to_tsquery(FTS_CONFIG, termo))
+    else:
+        escapado = termo.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        cond = AtoNormativo.ementa.ilike(f"%{escapado}%", escape="\\")
+
+    if termo.isdigit():
+        cond = or_(cond, AtoNormativo.numero_ato == int(termo))
+    return cond
+
+
+def search_rank(search: str):
+    # ts_rank devolve real; em double precision o valor volta idêntico no cursor
+    rank = func.ts_rank(ementa_tsv, func.websearch_to_tsquery(FTS_CONFIG, search.strip()))
+    return cast(rank, DOUBLE_PRECISION)
+
+
+# Carga em lote (POST /atos/bulk)
+MAX_ITENS_LOTE = 1000
+CHAVE_NATURAL = ("tipo_ato", "numero_ato", "orgao", "data_publicacao")
+
+
+def chave_natural(ato) -> tuple:
+    return tuple(getattr(ato, c) for c in CHAVE_NATURAL)
+
+
+# Buckets de tempo aceitos pelo dashboard -> unidade do date_trunc
+GRANULARIDADES = {"dia": "day", "semana": "week", "mes": "month"}
+
+
+def filtro_periodo(fonte, data_inicio: Optional[date], data_fim: Optional[date]) -> List[Any]:
+    where: List[Any] = []
+    if fonte is AtoNormativo:
+        # Base da query com exclusão lógica (o resumo só conta não excluídos)
+        where.append(AtoNormativo.deleted == False)
+    if data_inicio:
+        where.append(fonte.data_publicacao >= data_inicio)
+    if data_fim:
+        where.append(fonte.data_publicacao <= data_fim)
+    return where
+
+
+def validar_granularidade(granularidade: Optional[str]):
+    if granularidade and granularidade not in GRANULARIDADES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"granularidade inválida. Use: {', '.join(GRANULARIDADES)}"
+        )
+
+
+def consulta_distribuicoes(where, granularidade: Optional[str] = None, fonte=AtoNormativo):
+    """
+    Total, distribuição por órgão, por tipo e (opcional) série temporal numa
+    única varredura, via GROUPING SETS ((orgao), (tipo_ato), (bucket), ()).
+    A fonte é a tabela de atos (count) ou o resumo diário (sum de total).
+    """
+    validar_granularidade(granularidade)
+
+    orgao = fonte.orgao
+    tipo = fonte.tipo_ato
+    if fonte is AtoResumoDiario:
+        medida = cast(func.coalesce(func.sum(AtoResumoDiario.total), 0), Integer)
+    else:
+        medida = func.count()
+    colunas = [orgao, tipo, func.grouping(orgao), func.grouping(tipo), medida]
+    conjuntos = [tuple_(orgao), tuple_(tipo), tuple_()]
+
+    if granularidade:
+        # Unidade vem da whitelist; como literal, a expressão do SELECT e do
+        # GROUP BY fica idêntica para o Postgres
+        unidade = literal_column(f"'{GRANULARIDADES[granularidade]}'")
+        bucket = cast(func.date_trunc(unidade, fonte.data_publicacao), Date)
+        colunas.append(bucket)
+        conjuntos.append(tuple_(bucket))
+
+    return select(*colunas).where(where).group_by(func.grouping_sets(*conjuntos))
+
+
+async def agregar_distribuicoes(
+    session: AsyncSession,
+    where,
+    granularidade: Optional[str] = None,
+    fonte=AtoNormativo,
+) -> Dict[str, Any]:
+    rows = (await session.exec(consulta_distribuicoes(where, granularidade, fonte))).all()
+
+    total = 0
+    por_orgao: Dict[str, int] = {}
+    por_tipo: Dict[str, int] = {}
+    serie: Dict[str, int] = {}
+    for row in rows:
+        valor_orgao, valor_tipo, sem_orgao, sem_tipo, quantidade = row[:5]
+        if not sem_orgao:
+            por_orgao[valor_orgao] = quantidade
+        elif not sem_tipo:
+            por_tipo[valor_tipo] = quantidade
+        elif granularidade and row[5] is not None:
+            serie[row[5].isoformat()] = quantidade
+        else:
+            total = quantidade
+
+    resultado: Dict[str, Any] = {
+        "total_registros": total,
+        "distribuicao_por_orgao": por_orgao,
+        "distribuicao_por_tipo": por_tipo,
+    }
+    if granularidade:
+        resultado["serie_temporal"] = dict(sorted(serie.items()))
+    return resultado
+
+
+def consulta_atos(
+    campos: List[str],
+    data_publicacao: Optional[date] = None,
+    search: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = PAGE_SIZE_PADRAO,
+    search_mode: str = "fts",
+):
+    """Monta o SELECT da listagem; lê limit + 1 linhas para saber se há próxima página."""
+    # id e data_publicacao sempre são lidos, pois formam o cursor
+    colunas = [getattr(AtoNormativo, c) for c in campos]
+    for chave in ("id", "data_publicacao"):
+        if chave not in campos:
+            colunas.append(getattr(AtoNormativo, chave))
+
+    ranked = bool(search) and search_mode == "fts"
+    ordem = [AtoNormativo.data_publicacao, AtoNormativo.id]
+    if ranked:
+        rank = search_rank(search).label("rank")
+        colunas.append(rank)
+        ordem.insert(0, rank)
+
+    query = select(*colunas).where(AtoNormativo.deleted == False)
+
+    if data_publicacao:
+        query = query.where(AtoNormativo.data_publicacao == data_publicacao)
+
+    if search:
+        query = query.where(search_filter(search, search_mode))
+
+    if cursor:
+        chave_cursor = decode_cursor(cursor, ranked=ranked)
+        query = query.where(tuple_(*ordem) < tuple_(*chave_cursor))
+
+    return query.order_by(*[c.desc() for c in ordem]).limit(limit + 1), ranked
+
 
 class AtoService:
-    def __init__(self, session: Session):
+    def __init__(self, session: AsyncSession):
         self.session = session
 
-    def get_atos_filtrados(self, data_publicacao: Optional[date], search: Optional[str]):
-        """Lógica de filtragem e busca."""
-        query = select(AtoNormativo).where(AtoNormativo.deleted == False)
-
-        if data_publicacao:
-            query = query.where(AtoNormativo.data_publicacao == data_publicacao)
+    async def get_atos_filtrados(
+        self,
+        data_publicacao: Optional[date],
+        search: Optional[str],
+        cursor: Optional[str] = None,
+        limit: int = PAGE_SIZE_PADRAO,
+        fields: Optional[str] = None,
+        search_mode: str = "fts",
+    ) -> Dict[str, Any]:
+        """
+        Lógica de filtragem e busca, paginada por cursor.
+        Ordena por (data_publicacao, id) decrescente; na busca "fts" a ordem é
+        por relevância antes disso. O cursor guarda a última chave entregue e a
+        próxima página começa estritamente depois dela.
+        """
+        limit = max(1, min(limit, PAGE_SIZE_MAXIMO))
+        campos = parse_fields(fields) or list(CAMPOS_PROJETAVEIS)
+        query, ranked = consulta_atos(campos, data_publicacao, search, cursor, limit, search_mode)
 
-        if search:
-            query = query.where(
-                (func.lower(AtoNormativo.ementa).ilike(f"%{search}%")) | 
-                (func.lower(AtoNormativo.numero_ato).ilike(f"%{search}%"))
-            )
-        
         # O Service executa a query e retorna o resultado
-        return self.session.exec(query).all()
+        rows = (await self.session.exec(query)).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+
+        items = [{c: row._mapping[c] for c in campos} for row in rows]
+
+        next_cursor = None
+        if has_more and rows:
+            last = rows[-1]._mapping
+            chave = [last["data_publicacao"], last["id"]]
+            if ranked:
+                chave.insert(0, last["rank"])
+            next_cursor = encode_cursor(chave)
+
+        return {"items": items, "next_cursor": next_cursor}
     
-    def get_ato_by_id(self, ato_id: int):
-        ato = self.session.get(AtoNormativo, ato_id)
+    async def get_ato_by_id(self, ato_id: int):
+        ato = await self.session.get(AtoNormativo, ato_id)
         if not ato or ato.deleted:
             raise HTTPException(status_code=404, detail="Ato Normativo não encontrado")
         return ato
 
-    def get_dados_dashboard(self, data_inicio: Optional[date], data_fim: Optional[date], search: Optional[str] = None):
-    # Base da query com exclusão lógica
-        base_where : List[Any] = [AtoNormativo.deleted == False]
-        
-        if data_inicio:
-            base_where.append(AtoNormativo.data_publicacao >= data_inicio)
-        if data_fim:
-            base_where.append(AtoNormativo.data_publicacao <= data_fim)
+    async def get_dados_dashboard(
+        self,
+        data_inicio: Optional[date],
+        data_fim: Optional[date],
+        search: Optional[str] = None,
+        search_mode: str = "fts",
+        granularidade: Optional[str] = None,
+    ):
+        # Sem busca textual o resumo diário responde; com busca é preciso
+        # olhar a ementa de cada ato
+        fonte = AtoNormativo if search else AtoResumoDiario
+        base_where = filtro_periodo(fonte, data_inicio, data_fim)
         if search:
-            # Campo de busca (Search) na ementa ou órgão
-            base_where.append(func.lower(AtoNormativo.ementa).ilike(f"%{search}%"))
-
-        # 1. Total Geral
-        total = self.session.exec(
-            select(func.count()).where(and_(*base_where))
-        ).one()
-
-        # 2. Distribuição por Órgão (Agregado no Banco)
-        # Resultado esperado: [("Órgão A", 10), ("Órgão B", 5)]
-        query_orgao = self.session.exec(
-            select(AtoNormativo.orgao, func.count())
-            .where(and_(*base_where))
-            .group_by(AtoNormativo.orgao)
-        ).all()
-
-        # 3. Distribuição por Tipo
-        query_tipo = self.session.exec(
-            select(AtoNormativo.tipo_ato, func.count())
-            .where(and_(*base_where))
-            .group_by(AtoNormativo.tipo_ato)
-        ).all()
-
-        return {
-            "total_registros": total,
-            "distribuicao_por_orgao": {row[0]: row[1] for row in query_orgao},
-            "distribuicao_por_tipo": {row[0]: row[1] for row in query_tipo},
-        }
-    def create_ato(self, ato: AtoNormativo ):
+            # Campo de busca (Search) na ementa
+            base_where.append(search_filter(search, search_mode))
+
+        return await agregar_distribuicoes(self.session, and_(true(), *base_where), granularidade, fonte)
+
+    async def create_ato(self, entrada: AtoNormativoEntrada):
+        ato = AtoNormativo(**entrada.model_dump())
         self.session.add(ato)
-        self.session.commit()
-        self.session.refresh(ato)
+        await self._flush_unico()
+        await ajustar_resumo(self.session, ato.data_publicacao, ato.orgao, ato.tipo_ato, 1)
+        await self.session.commit()
+        await self.session.refresh(ato)
+        await dashboard_cache.incrementar_geracao(self.session)
+        await publicar_evento("ato.criado", id=ato.id, dados=ato.model_dump())
         return ato
 
-    def update_ato(self, ato_id: int, ato_data: AtoNormativo):
-        ato_db = self.session.get(AtoNormativo, ato_id)
+    async def upsert_atos(self, itens: List[AtoNormativoEntrada]) -> Dict[str, Any]:
+        """
+        Grava o lote numa única transação com INSERT ... ON CONFLICT na chave
+        natural. Cada item volta com status inserted, updated (ementa mudou),
+        unchanged ou duplicate (repetido dentro do próprio lote).
+        """
+        if len(itens) > MAX_ITENS_LOTE:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Lote acima do limite de {MAX_ITENS_LOTE} itens"
+            )
+
+        # Dentro do lote vale a última ocorrência de cada chave; o Postgres
+        # não aceita a mesma linha duas vezes no mesmo ON CONFLICT DO UPDATE
+        ultimo_indice: Dict[tuple, int] = {}
+        for i, item in enumerate(itens):
+            ultimo_indice[chave_natural(item)] = i
+
+        resultado: List[Dict[str, Any]] = [
+            {"index": i, "status": "duplicate", "id": None} for i in range(len(itens))
+        ]
+        if not ultimo_indice:
+            return self._resumo_lote(resultado)
+
+        agora = datetime.now()
+        valores = [
+            {**itens[i].model_dump(), "created_at": agora, "deleted": False}
+            for i in ultimo_indice.values()
+        ]
+        stmt = insert(AtoNormativo).values(valores)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(CHAVE_NATURAL),
+            # Mesmo predicado do índice parcial (excluídos não conflitam)
+            index_where=AtoNormativo.deleted == False,
+            set_={"ementa": stmt.excluded.ementa},
+            where=AtoNormativo.ementa.is_distinct_from(stmt.excluded.ementa),
+        ).returning(
+            AtoNormativo.id,
+            *[getattr(AtoNormativo, c) for c in CHAVE_NATURAL],
+            literal_column("(xmax = 0)").label("inserido"),
+        )
+
+        gravados = {}
+        inseridos: Dict[tuple, int] = {}
+        for row in (await self.session.exec(stmt)).all():
+            chave = tuple(row._mapping[c] for c in CHAVE_NATURAL)
+            gravados[chave] = (row.id, "inserted" if row.inserido else "updated")
+            if row.inserido:
+                resumo = (row.data_publicacao, row.orgao, row.tipo_ato)
+                inseridos[resumo] = inseridos.get(resumo, 0) + 1
+
+        # Chaves que já existiam com a mesma ementa não voltam no RETURNING
+        faltantes = [c for c in ultimo_indice if c not in gravados]
+        if faltantes:
+            colunas = [getattr(AtoNormativo, c) for c in CHAVE_NATURAL]
+            existentes = (await self.session.exec(
+                select(AtoNormativo.id, *colunas)
+                .where(tuple_(*colunas).in_(faltantes), AtoNormativo.deleted == False)
+            )).all()
+            for row in existentes:
+                gravados[tuple(row._mapping[c] for c in CHAVE_NATURAL)] = (row.id, "unchanged")
+
+        await incrementar_resumo_lote(self.session, inseridos)
+        await self.session.commit()
+
+        for chave, i in ultimo_indice.items():
+            ato_id, status = gravados.get(chave, (None, "unchanged"))
+            resultado[i] = {"index": i, "status": status, "id": ato_id}
+        resumo = self._resumo_lote(resultado)
+        alterados = {chave: ato_id for chave, (ato_id, status) in gravados.items() if status != "unchanged"}
+        if alterados:
+            await dashboard_cache.incrementar_geracao(self.session)
+            # Um evento por lote (o RPA envia centenas de atos por chamada)
+            indice_data = CHAVE_NATURAL.index("data_publicacao")
+            await publicar_evento(
+                "atos.lote",
+                inserted=resumo["inserted"],
+                updated=resumo["updated"],
+                ids=sorted(alterados.values()),
+                datas=sorted({chave[indice_data] for chave in alterados}),
+            )
+        return resumo
+
+    @staticmethod
+    def _resumo_lote(itens: List[Dict[str, Any]]) -> Dict[str, Any]:
+        contagem = {"inserted": 0, "updated": 0, "unchanged": 0, "duplicate": 0}
+        for item in itens:
+            contagem[item["status"]] += 1
+        return {"total": len(itens), **contagem, "itens": itens}
+
+    async def _flush_unico(self):
+        """Flush que converte violação da chave natural em 409."""
+        try:
+            await self.session.flush()
+        except IntegrityError:
+            await self.session.rollback()
+            raise HTTPException(status_code=409, detail="Ato normativo já cadastrado")
+
+    async def update_ato(self, ato_id: int, ato_data: AtoNormativoAtualizacao):
+        ato_db = await self.session.get(AtoNormativo, ato_id)
         if not ato_db or ato_db.deleted:
-            return HTTPException(status_code=404, detail="Ato normativo não encontrado")
+            raise HTTPException(status_code=404, detail="Ato normativo não encontrado")
 
-        ato_dados = ato_data.model_dump(exclude_unset=True, exclude={"id", "created_at", "deleted"})
+        chave_antiga = (ato_db.data_publicacao, ato_db.orgao, ato_db.tipo_ato)
+
+        ato_dados = ato_data.model_dump(exclude_unset=True, exclude_none=True)
         for key, value in ato_dados.items():
             setattr(ato_db, key, value)
 
         self.session.add(ato_db)
-        self.session.commit()
-        self.session.refresh(ato_db)
+        await self._flush_unico()
+
+        chave_nova = (ato_db.data_publicacao, ato_db.orgao, ato_db.tipo_ato)
+        if chave_nova != chave_antiga:
+            await ajustar_resumo(self.session, *chave_antiga, -1)
+            await ajustar_resumo(self.session, *chave_nova, 1)
+
+        await self.session.commit()
+        await self.session.refresh(ato_db)
+        await dashboard_cache.incrementar_geracao(self.session)
+        await publicar_evento("ato.atualizado", id=ato_db.id, dados=ato_db.model_dump())
         return ato_db
 
-    def delete_ato(self, ato_id: int):
-        ato_db = self.session.get(AtoNormativo, ato_id)
+    async def delete_ato(self, ato_id: int):
+        ato_db = await self.session.get(AtoNormativo, ato_id)
         if not ato_db:
             raise HTTPException(status_code=404, detail="Ato não encontrado")
         
+        if not ato_db.deleted:
+            await ajustar_resumo(self.session, ato_db.data_publicacao, ato_db.orgao, ato_db.tipo_ato, -1)
+
         ato_db.deleted = True
         self.session.add(ato_db)
-        self.session.commit()
+        await self.session.commit()
+        await dashboard_cache.incrementar_geracao(self.session)
+        await publicar_evento("ato.excluido", id=ato_id)
         return {"message": "Ato excluído com sucesso"}
 
     
\ No newline at end of file
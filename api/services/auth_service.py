@@ -1,56 +1,103 @@
-from sqlmodel import Session, select
-from passlib.context import CryptContext
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from fastapi import HTTPException
 from jose import jwt
-from sqlalchemy import func, text
-from datetime import datetime, timedelta
+from sqlalchemy import func, text, update
+from datetime import datetime, timedelta, timezone
 from typing import Optional, Any
 import os
 
 from database.models import User
+from services.password_hasher import password_hasher, pwd_context
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+JWT_ALGORITHM = "HS256"
+TOKEN_EXPIRES_SECONDS = int(os.environ.get("TOKEN_EXPIRES_SECONDS", "3600"))
+_jwt_secret: Optional[str] = None
+
+
+def load_jwt_secret() -> Optional[str]:
+    """Lê JWT_TOKEN do ambiente uma vez (chamado no lifespan da API)."""
+    global _jwt_secret
+    _jwt_secret = os.environ.get("JWT_TOKEN") or None
+    return _jwt_secret
+
+
+def get_jwt_secret() -> str:
+    secret = _jwt_secret or load_jwt_secret()
+    if not secret:
+        raise HTTPException(status_code=500, detail="JWT_TOKEN não configurada no ambiente")
+    return secret
+
+
+def hash_password(password: str) -> str:
+    return pwd_context.hash(password)
 
 
 class AuthService:
-    def __init__(self, session: Session):
+    def __init__(self, session: AsyncSession):
         self.session = session
 
-    def criar_usuario(self, user_data: dict):
-        existing = self.session.exec(
+    async def criar_usuario(self, user_data: dict):
+        existing = (await self.session.exec(
             select(User).where(User.username == user_data["username"])
-        ).first()
+        )).first()
         if existing:
             raise HTTPException(status_code=400, detail="Username já existe")
 
-        h_password = pwd_context.hash(user_data["password"])
+        # bcrypt é CPU pura; roda no pool de processos limitado
+        h_password = await password_hasher.hash(user_data["password"])
         novo_user = User(username=user_data["username"], hashed_password=h_password)
         self.session.add(novo_user)
-        self.session.commit()
-        self.session.refresh(novo_user)
+        await self.session.commit()
+        await self.session.refresh(novo_user)
         return novo_user
 
-    def authenticate_user(self, username: str, password: str):
+    async def authenticate_user(self, username: str, password: str):
 
         self.session.expire_all()
         stmt = select(User).where(User.username == username.strip())
-        user = self.session.exec(stmt).first()
+        user = (await self.session.exec(stmt)).first()
 
         if not user:
             return None
-        if not pwd_context.verify(password, user.hashed_password):
+        if not await password_hasher.verify(password, user.hashed_password):
             return None
         return user
 
-    def create_access_token(self, subject: str, expires_seconds: Optional[int] = 3600) -> str:
-        secret = os.environ.get("JWT_TOKEN")
-        if not secret:
-            raise HTTPException(status_code=500, detail="JWT_TOKEN não configurada no ambiente")
+    async def revogar_tokens(self, user_id: int) -> int:
+        """Incrementa a versão de token do usuário; tokens já emitidos deixam de valer."""
+        versao = (await self.session.exec(
+            update(User)
+            .where(User.id == user_id)
+            .values(token_versao=User.token_versao + 1)
+            .returning(User.token_versao)
+        )).scalar_one_or_none()
+        if versao is None:
+            raise HTTPException(status_code=404, detail="Usuário não encontrado")
+        await self.session.commit()
+        return versao
+
+    def create_access_token(
+        self,
+        subject: str,
+        expires_seconds: Optional[int] = TOKEN_EXPIRES_SECONDS,
+        user_id: Optional[int] = None,
+        versao: int = 0,
+    ) -> str:
+        secret = get_jwt_secret()
 
-        to_encode: dict[str, Any] = {"sub": subject}
+        agora = datetime.now(timezone.utc)
+        # ver (versão do usuário) permite revogar os tokens já emitidos;
+        # uid permite o modo sem estado do guard (AUTH_STATELESS)
+        to_encode: dict[str, Any] = {"sub": subject, "iat": int(agora.timestamp())}
+        if user_id is not None:
+            to_encode["uid"] = user_id
+        if versao:
+            # Versão do usuário na emissão (revogação no logout)
+            to_encode["ver"] = versao
         if expires_seconds:
-            expire = datetime.utcnow() + timedelta(seconds=expires_seconds)
+            expire = agora + timedelta(seconds=expires_seconds)
             to_encode.update({"exp": expire})
 
-        encoded_jwt = jwt.encode(to_encode, secret, algorithm="HS256")
+        encoded_jwt = jwt.encode(to_encode, secret, algorithm=JWT_ALGORITHM)
         return encoded_jwt
\ No newline at end of file
@@ -0,0 +1,161 @@
+import asyncio
+import json
+import os
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set
+
+from fastapi import WebSocket
+
+# Fila de envio por conexão: quem não consome a tempo não trava os demais
+WS_SEND_QUEUE_SIZE = int(os.environ.get("WS_SEND_QUEUE_SIZE", "100"))
+# Um send que passa disso derruba a conexão (cliente parado)
+WS_SEND_TIMEOUT_SECONDS = float(os.environ.get("WS_SEND_TIMEOUT_SECONDS", "5"))
+
+# Fechamento por cliente lento (1013 = Try Again Later)
+WS_CODIGO_LENTO = 1013
+
+
+class _Conexao:
+    def __init__(self, websocket: WebSocket, tipos: Optional[List[str]], queue_size: int):
+        self.websocket = websocket
+        # Prefixos de tipo aceitos (ex.: ["ato."]); None = todos
+        self.tipos = tipos
+        self.fila: "asyncio.Queue[str]" = asyncio.Queue(maxsize=queue_size)
+        self.loop = asyncio.get_running_loop()
+        self.tarefa: Optional[asyncio.Task] = None
+
+    def aceita(self, tipo: str) -> bool:
+        return not self.tipos or any(tipo.startswith(p) for p in self.tipos)
+
+
+class ConnectionManager:
+    """
+    WebSockets de /ws/atos. Cada conexão tem uma fila limitada e uma tarefa
+    própria de envio, então o broadcast só enfileira e nunca espera um
+    socket. Fila cheia: os eventos pendentes viram um único "resync" (o
+    cliente recarrega os dados). Send que não termina em
+    WS_SEND_TIMEOUT_SECONDS: a conexão é derrubada.
+    """
+
+    def __init__(self, queue_size: int = WS_SEND_QUEUE_SIZE, send_timeout: float = WS_SEND_TIMEOUT_SECONDS):
+        self.queue_size = queue_size
+        self.send_timeout = send_timeout
+        self._lock = threading.Lock()
+        self._conexoes: Set[_Conexao] = set()
+        self.stats = {"published": 0, "sent": 0, "coalesced": 0, "dropped": 0}
+
+    @property
+    def active_connections(self) -> List[WebSocket]:
+        with self._lock:
+            return [c.websocket for c in self._conexoes]
+
+    async def connect(
+        self,
+        websocket: WebSocket,
+        tipos: Optional[List[str]] = None,
+        saudacao: Optional[Dict[str, Any]] = None,
+    ) -> _Conexao:
+        await websocket.accept()
+        conexao = _Conexao(websocket, tipos, self.queue_size)
+        if saudacao is not None:
+            # Primeira mensagem, pela mesma fila (um único escritor por socket)
+            conexao.fila.put_nowait(json.dumps(saudacao, default=str, ensure_ascii=False))
+        conexao.tarefa = asyncio.create_task(self._enviar(conexao))
+        with self._lock:
+            self._conexoes.add(conexao)
+        return conexao
+
+    async def disconnect(self, conexao: _Conexao):
+        with self._lock:
+            self._conexoes.discard(conexao)
+        if conexao.tarefa is not None and conexao.tarefa is not asyncio.current_task():
+            conexao.tarefa.cancel()
+            await asyncio.gather(conexao.tarefa, return_exceptions=True)
+
+    async def disconnect_all(self):
+        """Encerra as tarefas de envio de todas as conexões (shutdown da API)."""
+        with self._lock:
+            conexoes = list(self._conexoes)
+        for conexao in conexoes:
+            await self.disconnect(conexao)
+
+    def publish(self, evento: Dict[str, Any]):
+        """Enfileira o evento (serializado uma vez) nas conexões interessadas."""
+        mensagem = json.dumps(evento, default=str, ensure_ascii=False)
+        tipo = evento.get("tipo", "")
+        with self._lock:
+            destinos = [c for c in self._conexoes if c.aceita(tipo)]
+            self.stats["published"] += 1
+        self._distribuir(destinos, mensagem)
+
+    async def broadcast(self, message: str):
+        with self._lock:
+            destinos = list(self._conexoes)
+        self._distribuir(destinos, message)
+
+    def _distribuir(self, destinos: List[_Conexao], mensagem: str):
+        try:
+            loop_atual = asyncio.get_running_loop()
+        except RuntimeError:
+            loop_atual = None
+        for conexao in destinos:
+            if conexao.loop is loop_atual:
+                self._oferecer(conexao, mensagem)
+            else:
+                # Publicado de outra thread (ex.: rota síncrona no threadpool)
+                conexao.loop.call_soon_threadsafe(self._oferecer, conexao, mensagem)
+
+    def _oferecer(self, conexao: _Conexao, mensagem: str):
+        try:
+            conexao.fila.put_nowait(mensagem)
+            return
+        except asyncio.QueueFull:
+            pass
+        descartados = 0
+        while not conexao.fila.empty():
+            conexao.fila.get_nowait()
+            descartados += 1
+        with self._lock:
+            self.stats["coalesced"] += 1
+        conexao.fila.put_nowait(json.dumps({
+            "tipo": "resync",
+            "descartados": descartados + 1,
+            "em": datetime.now().isoformat(),
+        }))
+
+    async def _enviar(self, conexao: _Conexao):
+        while True:
+            mensagem = await conexao.fila.get()
+            try:
+                await asyncio.wait_for(conexao.websocket.send_text(mensagem), timeout=self.send_timeout)
+            except asyncio.TimeoutError:
+                with self._lock:
+                    self.stats["dropped"] += 1
+                await self._derrubar(conexao)
+                return
+            except Exception:
+                # Cliente já desconectou; o endpoint faz a limpeza
+                await self.disconnect(conexao)
+                return
+            with self._lock:
+                self.stats["sent"] += 1
+
+    async def _derrubar(self, conexao: _Conexao):
+        await self.disconnect(conexao)
+        try:
+            await asyncio.wait_for(conexao.websocket.close(code=WS_CODIGO_LENTO), timeout=1)
+        except Exception:
+            pass
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "connections": len(self._conexoes),
+                "queue_size": self.queue_size,
+                "send_timeout_s": self.send_timeout,
+                **self.stats,
+            }
+
+
+manager = ConnectionManager()
@@ -1,44 +1,158 @@
 import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
-from sqlmodel import Session, select
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from database.config import get_session
+from database.config import async_engine
 from database.models import User
+from services.auth_service import JWT_ALGORITHM, get_jwt_secret
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
+# Cache de usuários já verificados, por "sub" do token
+AUTH_CACHE_TTL_SECONDS = float(os.environ.get("AUTH_CACHE_TTL_SECONDS", "60"))
+AUTH_CACHE_MAXSIZE = int(os.environ.get("AUTH_CACHE_MAXSIZE", "1024"))
+# true = confia nas claims assinadas (sub + uid + ver) e não consulta o banco.
+# O POST /logout incrementa user.token_versao: vale na hora neste processo;
+# nos demais workers só quando o usuário sai do cache (até
+# AUTH_CACHE_TTL_SECONDS). No modo sem estado os outros workers nunca leem
+# a versão do banco: use-o só onde a revogação não for necessária.
+AUTH_STATELESS = os.environ.get("AUTH_STATELESS", "false").lower() == "true"
+
+
+class PrincipalCache:
+    """LRU com TTL de usuários autenticados, com revogação por id."""
+
+    def __init__(self, maxsize: int = AUTH_CACHE_MAXSIZE, ttl_seconds: float = AUTH_CACHE_TTL_SECONDS):
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._items: "OrderedDict[str, Tuple[float, User]]" = OrderedDict()
+        # user_id -> instante (epoch) da revogação; tokens emitidos antes são recusados
+        self._revogados: Dict[int, float] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, sub: str) -> Optional[User]:
+        with self._lock:
+            item = self._items.get(sub)
+            if item is None or item[0] < time.monotonic():
+                if item is not None:
+                    del self._items[sub]
+                self.misses += 1
+                return None
+            self._items.move_to_end(sub)
+            self.hits += 1
+            return item[1]
+
+    def set(self, sub: str, user: User):
+        with self._lock:
+            self._items[sub] = (time.monotonic() + self.ttl_seconds, user)
+            self._items.move_to_end(sub)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def revoke_user(self, user_id: int, versao: int):
+        """Remove o usuário do cache; tokens com versão abaixo de `versao` deixam de valer."""
+        with self._lock:
+            self._revogados[user_id] = max(versao, self._revogados.get(user_id, 0))
+            for sub in [s for s, (_, u) in self._items.items() if u.id == user_id]:
+                del self._items[sub]
+
+    def is_revoked(self, user_id: Optional[int], versao_token: int) -> bool:
+        versao_minima = self._revogados.get(user_id) if user_id is not None else None
+        return token_revogado(versao_minima, versao_token)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "size": len(self._items),
+                "hits": self.hits,
+                "misses": self.misses,
+                "ttl_seconds": self.ttl_seconds,
+                "stateless": AUTH_STATELESS,
+            }
+
+
+def token_revogado(versao_atual: Optional[int], versao_token: int) -> bool:
+    """Token emitido antes do último logout (versão menor que a do usuário)."""
+    return versao_atual is not None and versao_token < versao_atual
+
+
+principal_cache = PrincipalCache()
+
+
+def revoke_user(user_id: int, versao: int):
+    principal_cache.revoke_user(user_id, versao)
+
+
+async def _carregar_usuario(username: str) -> Optional[User]:
+    # Sessão própria, aberta só quando o cache falha: um acerto não ocupa
+    # conexão do pool
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        return (await session.exec(select(User).where(User.username == username))).first()
+
+
 async def get_current_user(
-    token: str = Depends(oauth2_scheme), 
-    session: Session = Depends(get_session)
+    token: str = Depends(oauth2_scheme),
 ) -> User:
     """
-    Dependency Guard que valida o JWT e retorna o usuário do banco.
+    Dependency Guard que valida o JWT e retorna o usuário.
+    O usuário vem do cache (ou das próprias claims, no modo sem estado) e
+    só vai ao banco quando não está em cache.
     """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Token inválido ou expirado",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    
-    secret = os.environ.get("JWT_TOKEN")
-    if not secret:
-        raise HTTPException(status_code=500, detail="JWT_TOKEN não configurada")
 
     try:
         # 1. Decodifica o Token
-        payload = jwt.decode(token, secret, algorithms=["HS256"])
+        payload = jwt.decode(token, get_jwt_secret(), algorithms=[JWT_ALGORITHM])
         username: str = payload.get("sub") or ""
-        if username is None:
+        if not username:
             raise credentials_exception
     except JWTError:
         raise credentials_exception
 
-    # 2. Busca o usuário no banco (usando sua Session injetada)
-    user = session.exec(select(User).where(User.username == username)).first()
-    
-    if user is None:
+    user_id = payload.get("uid")
+    # Tokens sem "ver" são da versão 0 (emitidos antes do primeiro logout)
+    versao = payload.get("ver", 0)
+    if not isinstance(versao, int) or principal_cache.is_revoked(user_id, versao):
         raise credentials_exception
-        
-    return user
\ No newline at end of file
+
+    if AUTH_STATELESS and user_id is not None:
+        return User(id=user_id, username=username, hashed_password="")
+
+    # 2. Cache de usuários verificados
+    user = principal_cache.get(username)
+    if user is not None:
+        if token_revogado(user.token_versao, versao):
+            raise credentials_exception
+        return user
+
+    # 3. Busca o usuário no banco (revogação gravada por outro worker ou
+    # antes de um restart vem junto)
+    user = await _carregar_usuario(username)
+
+    if (
+        user is None
+        or principal_cache.is_revoked(user.id, versao)
+        or token_revogado(user.token_versao, versao)
+    ):
+        raise credentials_exception
+
+    principal_cache.set(username, user)
+    return user
@@ -1,50 +1,201 @@
-from datetime import date
-from typing import Optional
-from sqlmodel import Session
-from sqlmodel import Session, select
+from datetime import date, datetime, time, timedelta
+from typing import Any, Dict, List, Optional
+from fastapi import HTTPException
+from sqlmodel import select, func, and_
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy import Date, cast, true, tuple_
 
 
-from database.models import AtoNormativo, ExecucaoLog
+from database.models import AtoResumoDiario, ExecucaoLog, ExecucaoLogData, ExecucaoLogEntrada
+from services.ato_service import agregar_distribuicoes, filtro_periodo
+from services.pubsub import publicar_evento
+from services.response_cache import dashboard_cache
+
+
+# O bot grava success/partial/failed; registros antigos (seed) usam SUCESSO/ERRO
+STATUS_NORMALIZADO = {
+    "success": "success",
+    "sucesso": "success",
+    "partial": "partial",
+    "parcial": "partial",
+    "failed": "failed",
+    "erro": "failed",
+    "falha": "failed",
+}
 
 
 class LogsService:
-    def __init__(self, session: Session):
+    def __init__(self, session: AsyncSession):
       self.session = session
 
-    def create_log(self, log: ExecucaoLog):
+    async def create_log(self, entrada: ExecucaoLogEntrada):
+        dados = entrada.model_dump(exclude={"datas"}, exclude_none=True)
+        log = ExecucaoLog.model_validate(dados)
         self.session.add(log)
-        self.session.commit()
-        self.session.refresh(log)
+        if entrada.datas:
+            # flush para obter o id da execução antes de gravar as filhas
+            await self.session.flush()
+            self.session.add_all([
+                ExecucaoLogData(execucao_id=log.id, **item.model_dump())
+                for item in entrada.datas
+            ])
+        await self.session.commit()
+        await self.session.refresh(log)
+        # /logs/dashboard/ inclui as métricas das execuções
+        await dashboard_cache.incrementar_geracao(self.session)
+        await publicar_evento("execucao.registrada", id=log.id, dados=log.model_dump(exclude={"perfil"}))
         return log
-    
-    def get_dashboard_data(
+
+    async def get_datas_execucao(self, execucao_id: int) -> List[ExecucaoLogData]:
+        if await self.session.get(ExecucaoLog, execucao_id) is None:
+            raise HTTPException(status_code=404, detail="Execução não encontrada")
+        query = (
+            select(ExecucaoLogData)
+            .where(ExecucaoLogData.execucao_id == execucao_id)
+            .order_by(ExecucaoLogData.data_publicacao)
+        )
+        return list((await self.session.exec(query)).all())
+
+    def _ultimas_execucoes(self, ultimas: int):
+        # Usa o índice em data_hora (ORDER BY ... LIMIT)
+        return (
+            select(ExecucaoLog.id)
+            .order_by(ExecucaoLog.data_hora.desc(), ExecucaoLog.id.desc())
+            .limit(ultimas)
+            .subquery()
+        )
+
+    async def get_serie_execucoes(self, ultimas: int = 30) -> List[Dict[str, Any]]:
+        """Métricas das últimas N execuções, da mais antiga para a mais recente."""
+        query = (
+            select(ExecucaoLog)
+            .order_by(ExecucaoLog.data_hora.desc(), ExecucaoLog.id.desc())
+            .limit(ultimas)
+        )
+        logs = list((await self.session.exec(query)).all())
+        logs.reverse()
+        return [
+            {
+                "id": log.id,
+                "data_hora": log.data_hora,
+                "status": STATUS_NORMALIZADO.get((log.status or "").strip().lower(), log.status),
+                "tempo_execucao_segundos": log.tempo_execucao_segundos,
+                "registros_capturados": log.registros_capturados,
+                "paginas_visitadas": log.paginas_visitadas,
+                "linhas_extraidas": log.linhas_extraidas,
+                "linhas_enviadas": log.linhas_enviadas,
+                "linhas_com_falha": log.linhas_com_falha,
+                "api_latencia_p50_ms": log.api_latencia_p50_ms,
+                "api_latencia_p95_ms": log.api_latencia_p95_ms,
+                "navegador_inicializacao_segundos": log.navegador_inicializacao_segundos,
+            }
+            for log in logs
+        ]
+
+    async def get_datas_lentas(self, ultimas_execucoes: int = 30, limite: int = 10) -> Dict[str, Any]:
+        """
+        Datas de publicação mais lentas nas últimas N execuções, pela maior
+        duração observada (com média e totais para comparar).
+        """
+        recentes = self._ultimas_execucoes(ultimas_execucoes)
+        duracao = ExecucaoLogData.duracao_segundos
+        maximo = func.max(duracao)
+        query = (
+            select(
+                ExecucaoLogData.data_publicacao,
+                func.count(),
+                func.avg(duracao),
+                maximo,
+                func.avg(ExecucaoLogData.paginas),
+                func.coalesce(func.sum(ExecucaoLogData.linhas_extraidas), 0),
+                func.coalesce(func.sum(ExecucaoLogData.linhas_com_falha), 0),
+                func.count(ExecucaoLogData.erro),
+            )
+            .where(ExecucaoLogData.execucao_id.in_(select(recentes.c.id)))
+            .group_by(ExecucaoLogData.data_publicacao)
+            .order_by(maximo.desc(), ExecucaoLogData.data_publicacao)
+            .limit(limite)
+        )
+        datas = [
+            {
+                "data_publicacao": data_publicacao,
+                "execucoes": quantidade,
+                "duracao_media_segundos": round(float(media), 3),
+                "duracao_max_segundos": round(float(maior), 3),
+                "paginas_media": round(float(paginas or 0), 2),
+                "linhas_extraidas": int(linhas),
+                "linhas_com_falha": int(falhas),
+                "erros": erros,
+            }
+            for data_publicacao, quantidade, media, maior, paginas, linhas, falhas, erros in (await self.session.exec(query)).all()
+        ]
+        return {"ultimas_execucoes": ultimas_execucoes, "datas": datas}
+
+    async def get_dashboard_data(
         self,
         data_inicio: Optional[date] = None,
         data_fim: Optional[date] = None
     ):
 
-        query = select(AtoNormativo).where(AtoNormativo.deleted == False)
+        where_atos = filtro_periodo(AtoResumoDiario, data_inicio, data_fim)
+        atos = await agregar_distribuicoes(self.session, and_(true(), *where_atos), fonte=AtoResumoDiario)
+
+        return {
+            "periodo": {"inicio": data_inicio, "fim": data_fim},
+            **atos,
+            "execucoes": await self.get_metricas_execucoes(data_inicio, data_fim),
+        }
+
+    async def get_metricas_execucoes(
+        self,
+        data_inicio: Optional[date] = None,
+        data_fim: Optional[date] = None
+    ) -> Dict[str, Any]:
+        """
+        Métricas das execuções do RPA numa única consulta:
+        GROUPING SETS ((status), (dia), ()) com percentis no conjunto vazio.
+        """
+        dia = cast(ExecucaoLog.data_hora, Date)
+        tempo = ExecucaoLog.tempo_execucao_segundos
 
+        query = (
+            select(
+                ExecucaoLog.status,
+                dia,
+                func.grouping(ExecucaoLog.status),
+                func.grouping(dia),
+                func.count(),
+                func.coalesce(func.sum(ExecucaoLog.registros_capturados), 0),
+                func.percentile_cont(0.5).within_group(tempo),
+                func.percentile_cont(0.95).within_group(tempo),
+                func.max(tempo),
+            )
+            .group_by(func.grouping_sets(tuple_(ExecucaoLog.status), tuple_(dia), tuple_()))
+        )
+        # Filtro direto em data_hora (e não no cast) para usar o índice
         if data_inicio:
-            query = query.where(AtoNormativo.data_publicacao >= data_inicio)
+            query = query.where(ExecucaoLog.data_hora >= datetime.combine(data_inicio, time.min))
         if data_fim:
-            query = query.where(AtoNormativo.data_publicacao <= data_fim)
+            query = query.where(ExecucaoLog.data_hora < datetime.combine(data_fim + timedelta(days=1), time.min))
 
-        atos = self.session.exec(query).all()
-        
-        total_atos = len(atos)
+        total = 0
+        por_status = {"success": 0, "partial": 0, "failed": 0}
+        registros_por_dia: Dict[str, int] = {}
+        tempos: Dict[str, Optional[float]] = {"p50": None, "p95": None, "max": None}
 
-        por_orgao = {}
-        for ato in atos:
-            por_orgao[ato.orgao] = por_orgao.get(ato.orgao, 0) + 1
-
-        por_tipo = {}
-        for ato in atos:
-            por_tipo[ato.tipo_ato] = por_tipo.get(ato.tipo_ato, 0) + 1
+        for status, valor_dia, sem_status, sem_dia, quantidade, registros, p50, p95, maximo in (await self.session.exec(query)).all():
+            if not sem_status:
+                chave = STATUS_NORMALIZADO.get((status or "").strip().lower(), (status or "").strip().lower())
+                por_status[chave] = por_status.get(chave, 0) + quantidade
+            elif not sem_dia:
+                registros_por_dia[valor_dia.isoformat()] = int(registros)
+            else:
+                total = quantidade
+                tempos = {"p50": p50, "p95": p95, "max": maximo}
 
         return {
-            "periodo": {"inicio": data_inicio, "fim": data_fim},
-            "total_registros": total_atos,
-            "distribuicao_por_orgao": por_orgao,
-            "distribuicao_por_tipo": por_tipo
-        }
\ No newline at end of file
+            "total_execucoes": total,
+            "por_status": por_status,
+            "tempo_execucao_segundos": tempos,
+            "registros_capturados_por_dia": dict(sorted(registros_por_dia.items())),
+        }
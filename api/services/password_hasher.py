@@ -0,0 +1,118 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Optional
+
+from fastapi import HTTPException
+from passlib.context import CryptContext
+from starlette.concurrency import run_in_threadpool
+
+# bcrypt custa ~250 ms de CPU por chamada. Roda num pool de processos
+# próprio, para não disputar o threadpool (e o GIL) com as rotas de /atos/.
+# PASSWORD_HASH_WORKERS=0 desliga o pool e usa o threadpool do Starlette.
+HASH_WORKERS = int(os.environ.get("PASSWORD_HASH_WORKERS", "2"))
+# Quantos hashes podem rodar ao mesmo tempo e quantos podem esperar na fila;
+# acima disso a requisição recebe 503 em vez de acumular latência
+HASH_MAX_CONCURRENCY = int(os.environ.get("PASSWORD_HASH_MAX_CONCURRENCY", str(max(1, HASH_WORKERS))))
+HASH_MAX_QUEUE = int(os.environ.get("PASSWORD_HASH_MAX_QUEUE", "32"))
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+def _hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def _verify(password: str, hashed_password: str) -> bool:
+    return pwd_context.verify(password, hashed_password)
+
+
+class PasswordHasher:
+    """Executa hash/verify de senha com concorrência e fila limitadas."""
+
+    def __init__(
+        self,
+        workers: int = HASH_WORKERS,
+        max_concurrency: int = HASH_MAX_CONCURRENCY,
+        max_queue: int = HASH_MAX_QUEUE,
+    ):
+        self.workers = workers
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._lock = threading.Lock()
+        self.waiting = 0
+        self.running = 0
+        self.completed = 0
+        self.rejected = 0
+        self.max_waiting = 0
+
+    def _get_executor(self) -> Optional[ProcessPoolExecutor]:
+        if self.workers <= 0:
+            return None
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            return self._executor
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    async def _run(self, fn, *args) -> Any:
+        if self.waiting >= self.max_queue:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=503,
+                detail="Serviço de autenticação sobrecarregado, tente novamente",
+                headers={"Retry-After": "1"},
+            )
+
+        self.waiting += 1
+        self.max_waiting = max(self.max_waiting, self.waiting)
+        try:
+            await self._get_semaphore().acquire()
+        finally:
+            self.waiting -= 1
+
+        self.running += 1
+        try:
+            executor = self._get_executor()
+            if executor is None:
+                return await run_in_threadpool(fn, *args)
+            return await asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+        finally:
+            self.running -= 1
+            self.completed += 1
+            self._get_semaphore().release()
+
+    async def hash(self, password: str) -> str:
+        return await self._run(_hash, password)
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        return await self._run(_verify, password, hashed_password)
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+        self._semaphore = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "queue_depth": self.waiting,
+            "running": self.running,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "max_queue_depth": self.max_waiting,
+        }
+
+
+password_hasher = PasswordHasher()
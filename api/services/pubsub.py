@@ -0,0 +1,243 @@
+import asyncio
+import json
+import os
+import threading
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+import asyncpg
+
+from database.config import DATABASE_URL
+from services.event_stream import ConnectionManager, manager
+
+# "memory": um único processo; "postgres": LISTEN/NOTIFY, para vários
+# workers do uvicorn (cada um entrega aos próprios WebSockets)
+EVENTS_BACKEND = os.environ.get("EVENTS_BACKEND", "memory").strip().lower()
+EVENTS_CHANNEL = os.environ.get("EVENTS_CHANNEL", "atos_eventos")
+# Intervalo do health-check da conexão de LISTEN (e espera entre reconexões)
+EVENTS_PING_SECONDS = float(os.environ.get("EVENTS_PING_SECONDS", "15"))
+# Timeout de conexão e de cada NOTIFY (banco lento não segura ninguém)
+EVENTS_TIMEOUT_SECONDS = float(os.environ.get("EVENTS_TIMEOUT_SECONDS", "5"))
+# Fila de publicação: a escrita só enfileira; cheia, o evento é descartado
+# e os clientes recebem "resync"
+EVENTS_QUEUE_SIZE = int(os.environ.get("EVENTS_QUEUE_SIZE", "1000"))
+
+# Limite do payload do NOTIFY no Postgres (8000 bytes)
+NOTIFY_MAX_BYTES = 7900
+
+
+def _dsn_asyncpg(url: str) -> str:
+    """postgresql+psycopg2:// ou postgresql+asyncpg:// -> postgresql:// (asyncpg puro)."""
+    for prefixo in ("postgresql+psycopg2://", "postgresql+asyncpg://"):
+        if url.startswith(prefixo):
+            return "postgresql://" + url[len(prefixo):]
+    return url
+
+
+class MemoryBroker:
+    """Entrega direto às conexões deste processo."""
+
+    backend = "memory"
+
+    def __init__(self, destino: ConnectionManager = manager):
+        self.destino = destino
+        self._lock = threading.Lock()
+        self.stats = {"published": 0, "received": 0, "errors": 0}
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    def _contar(self, campo: str):
+        with self._lock:
+            self.stats[campo] += 1
+
+    async def publish(self, evento: Dict[str, Any]):
+        self._contar("published")
+        self._contar("received")
+        self.destino.publish(evento)
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"backend": self.backend, **self.stats}
+
+
+class PostgresBroker(MemoryBroker):
+    """
+    Fan-out entre workers via LISTEN/NOTIFY. Cada processo mantém uma
+    conexão asyncpg em LISTEN e entrega o que chega às próprias conexões
+    (inclusive os eventos que ele mesmo publicou). Se a conexão cair, ela é
+    refeita e os clientes recebem "resync" (eventos podem ter se perdido).
+    publish só enfileira: o NOTIFY sai de uma tarefa em segundo plano, para
+    que um banco lento ou fora do ar não atrase as rotas de escrita.
+    """
+
+    backend = "postgres"
+
+    def __init__(
+        self,
+        dsn: str = DATABASE_URL,
+        canal: str = EVENTS_CHANNEL,
+        destino: ConnectionManager = manager,
+        ping_seconds: float = EVENTS_PING_SECONDS,
+        timeout_seconds: float = EVENTS_TIMEOUT_SECONDS,
+        queue_size: int = EVENTS_QUEUE_SIZE,
+    ):
+        super().__init__(destino)
+        self.dsn = _dsn_asyncpg(dsn)
+        self.canal = canal
+        self.ping_seconds = ping_seconds
+        self.timeout_seconds = timeout_seconds
+        self.queue_size = queue_size
+        self.stats.update({"truncated": 0, "reconnects": 0, "dropped": 0})
+        self._escuta: Optional[asyncpg.Connection] = None
+        self._publicacao: Optional[asyncpg.Connection] = None
+        self._fila: Optional["asyncio.Queue[str]"] = None
+        self._publicador: Optional[asyncio.Task] = None
+        # Evento descartado ou NOTIFY que falhou: o próximo envio leva um resync antes
+        self._perdeu_eventos = False
+        self._supervisor: Optional[asyncio.Task] = None
+        self._pronto: Optional[asyncio.Event] = None
+
+    async def start(self):
+        self._garantir_publicador()
+        self._pronto = asyncio.Event()
+        self._supervisor = asyncio.create_task(self._supervisionar())
+        await self._pronto.wait()
+
+    async def stop(self):
+        if self._publicador is not None:
+            # Dá um tempo para a fila esvaziar antes de encerrar
+            try:
+                await asyncio.wait_for(self._fila.join(), timeout=self.timeout_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._publicador.cancel()
+            await asyncio.gather(self._publicador, return_exceptions=True)
+            self._publicador = None
+        if self._supervisor is not None:
+            self._supervisor.cancel()
+            await asyncio.gather(self._supervisor, return_exceptions=True)
+            self._supervisor = None
+        for conexao in (self._escuta, self._publicacao):
+            if conexao is not None and not conexao.is_closed():
+                await conexao.close()
+        self._escuta = self._publicacao = None
+
+    def _ao_notificar(self, _conexao, _pid, _canal, payload: str):
+        try:
+            evento = json.loads(payload)
+        except ValueError:
+            self._contar("errors")
+            return
+        self._contar("received")
+        self.destino.publish(evento)
+
+    async def _supervisionar(self):
+        primeira = True
+        while True:
+            try:
+                self._escuta = await asyncpg.connect(self.dsn, timeout=self.timeout_seconds)
+                await self._escuta.add_listener(self.canal, self._ao_notificar)
+                if not primeira:
+                    self._contar("reconnects")
+                    # O que foi publicado enquanto estava fora não chega mais
+                    self.destino.publish({"tipo": "resync", "motivo": "reconexao", "em": datetime.now().isoformat()})
+                primeira = False
+                self._pronto.set()
+                while True:
+                    await asyncio.sleep(self.ping_seconds)
+                    await self._escuta.execute("SELECT 1", timeout=self.timeout_seconds)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._contar("errors")
+                print(f"[EVENTOS] Conexão de LISTEN perdida ({e!r}); reconectando em {self.ping_seconds}s.")
+                if self._escuta is not None and not self._escuta.is_closed():
+                    self._escuta.terminate()
+                # Não segura a subida da API se o banco estiver fora
+                self._pronto.set()
+                await asyncio.sleep(self.ping_seconds)
+
+    def _payload(self, evento: Dict[str, Any]) -> str:
+        payload = json.dumps(evento, default=str, ensure_ascii=False)
+        if len(payload.encode("utf-8")) <= NOTIFY_MAX_BYTES:
+            return payload
+        # Grande demais para o NOTIFY: vai só o essencial, o cliente recarrega
+        self._contar("truncated")
+        enxuto = {k: v for k, v in evento.items() if k not in ("dados", "ids")}
+        enxuto["truncado"] = True
+        payload = json.dumps(enxuto, default=str, ensure_ascii=False)
+        if len(payload.encode("utf-8")) > NOTIFY_MAX_BYTES:
+            payload = json.dumps({"tipo": evento.get("tipo"), "em": evento.get("em"), "truncado": True})
+        return payload
+
+    def _garantir_publicador(self):
+        if self._publicador is None or self._publicador.done():
+            if self._fila is None:
+                self._fila = asyncio.Queue(maxsize=self.queue_size)
+            self._publicador = asyncio.create_task(self._publicar_fila())
+
+    async def publish(self, evento: Dict[str, Any]):
+        """Só enfileira (não espera o banco); fila cheia descarta o evento."""
+        self._garantir_publicador()
+        try:
+            self._fila.put_nowait(self._payload(evento))
+        except asyncio.QueueFull:
+            self._contar("dropped")
+            self._perdeu_eventos = True
+
+    async def _notificar(self, payload: str):
+        if self._publicacao is None or self._publicacao.is_closed():
+            self._publicacao = await asyncpg.connect(self.dsn, timeout=self.timeout_seconds)
+        await self._publicacao.execute("SELECT pg_notify($1, $2)", self.canal, payload, timeout=self.timeout_seconds)
+
+    async def _publicar_fila(self):
+        while True:
+            payload = await self._fila.get()
+            try:
+                if self._perdeu_eventos:
+                    self._perdeu_eventos = False
+                    await self._notificar(json.dumps({"tipo": "resync", "motivo": "eventos_perdidos", "em": datetime.now().isoformat()}))
+                await self._notificar(payload)
+                self._contar("published")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._contar("errors")
+                self._perdeu_eventos = True
+                print(f"[EVENTOS] Falha no NOTIFY ({e!r}); evento descartado.")
+                if self._publicacao is not None:
+                    self._publicacao.terminate()
+                    self._publicacao = None
+                # Banco fora: não martela a cada evento da fila
+                await asyncio.sleep(min(self.ping_seconds, 1.0))
+            finally:
+                self._fila.task_done()
+
+
+def build_broker(backend: str = EVENTS_BACKEND) -> MemoryBroker:
+    if backend == "postgres":
+        return PostgresBroker()
+    if backend != "memory":
+        raise ValueError(f"EVENTS_BACKEND inválido: {backend!r} (use memory ou postgres)")
+    return MemoryBroker()
+
+
+broker = build_broker()
+
+
+async def publicar_evento(tipo: str, **dados: Any):
+    """
+    Evento para /ws/atos, ex.: await publicar_evento("ato.criado", id=1, dados={...}).
+    Chamado depois do commit; não espera o NOTIFY e uma falha na publicação
+    não desfaz a escrita.
+    """
+    evento = {"tipo": tipo, "em": datetime.now().isoformat(), **dados}
+    try:
+        await broker.publish(evento)
+    except Exception as e:
+        broker._contar("errors")
+        print(f"[EVENTOS] Falha ao publicar {tipo}: {e!r}")
@@ -0,0 +1,64 @@
+import os
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict
+
+# Logins que falharam por (username, IP) dentro da janela (POST /token)
+LOGIN_RATE_LIMIT = int(os.environ.get("LOGIN_RATE_LIMIT", "10"))
+LOGIN_RATE_WINDOW_SECONDS = float(os.environ.get("LOGIN_RATE_WINDOW_SECONDS", "60"))
+
+
+class SlidingWindowLimiter:
+    """Limite de N eventos por chave numa janela deslizante de tempo."""
+
+    def __init__(self, limit: int, window_seconds: float):
+        self.limit = limit
+        self.window_seconds = window_seconds
+        self._lock = threading.Lock()
+        self._eventos: Dict[str, Deque[float]] = {}
+        self.rejected = 0
+
+    def _janela(self, key: str, agora: float) -> Deque[float]:
+        eventos = self._eventos.setdefault(key, deque())
+        while eventos and eventos[0] <= agora - self.window_seconds:
+            eventos.popleft()
+        return eventos
+
+    def retry_after(self, key: str) -> float:
+        """
+        Não registra nada. Retorna 0 se a chave ainda está abaixo do limite,
+        senão quantos segundos faltam para a próxima tentativa ser aceita.
+        """
+        if self.limit <= 0:
+            return 0.0
+        agora = time.monotonic()
+        with self._lock:
+            eventos = self._janela(key, agora)
+            if len(eventos) < self.limit:
+                if not eventos:
+                    del self._eventos[key]
+                return 0.0
+            self.rejected += 1
+            return eventos[0] + self.window_seconds - agora
+
+    def hit(self, key: str):
+        """Registra um evento (ex.: login que falhou) para a chave."""
+        if self.limit <= 0:
+            return
+        agora = time.monotonic()
+        with self._lock:
+            self._janela(key, agora).append(agora)
+            # Evita crescer sem limite com usernames aleatórios
+            if len(self._eventos) > 10_000:
+                self._eventos = {k: v for k, v in self._eventos.items() if v and v[-1] > agora - self.window_seconds}
+
+    def reset(self, key: str = None):
+        with self._lock:
+            if key is None:
+                self._eventos.clear()
+            else:
+                self._eventos.pop(key, None)
+
+
+login_limiter = SlidingWindowLimiter(LOGIN_RATE_LIMIT, LOGIN_RATE_WINDOW_SECONDS)
@@ -0,0 +1,168 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy import text
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+# Cache das respostas de /dashboard/ e /logs/dashboard/
+DASHBOARD_CACHE_TTL_SECONDS = float(os.environ.get("DASHBOARD_CACHE_TTL_SECONDS", "300"))
+DASHBOARD_CACHE_MAXSIZE = int(os.environ.get("DASHBOARD_CACHE_MAXSIZE", "256"))
+# max-age do Cache-Control; 0 = o cliente sempre revalida (If-None-Match -> 304)
+DASHBOARD_CACHE_MAX_AGE_SECONDS = int(os.environ.get("DASHBOARD_CACHE_MAX_AGE_SECONDS", "0"))
+# Sequência (migração 0010) com a geração compartilhada entre os workers
+GERACAO_SEQUENCIA = "dashboard_cache_geracao"
+
+
+def normalizar_busca(search: Optional[str]) -> Optional[str]:
+    """
+    Texto livre da busca sem espaços nas pontas e em minúsculas (FTS e ILIKE
+    já ignoram caixa). A rota passa o mesmo valor à chave e à consulta.
+    """
+    if search is None:
+        return None
+    return search.strip().lower() or None
+
+
+def normalizar_parametros(**params: Any) -> Tuple[Tuple[str, str], ...]:
+    """
+    Chave a partir de parâmetros já validados e normalizados pela rota.
+    Os demais valores entram como vieram: "DIA" e "dia" são chaves
+    diferentes, e o inválido nunca chega ao cache (a consulta dá 400).
+    """
+    normalizados = []
+    for nome, valor in sorted(params.items()):
+        if isinstance(valor, date):
+            valor = valor.isoformat()
+        normalizados.append((nome, "" if valor is None else str(valor)))
+    return tuple(normalizados)
+
+
+async def ler_geracao(session: AsyncSession) -> int:
+    return (await session.execute(text(f"SELECT CASE WHEN is_called THEN last_value ELSE 0 END FROM {GERACAO_SEQUENCIA}"))).scalar_one()
+
+
+class ResponseCache:
+    """
+    LRU com TTL de respostas já serializadas, por processo. As escritas em
+    atos e logs só incrementam a geração: ela faz parte da chave, então
+    entradas antigas deixam de ser encontradas e saem pelo LRU/TTL.
+
+    Há duas gerações na chave: a local (invalidar) e a do banco
+    (incrementar_geracao). A do banco é lida a cada requisição, então uma
+    escrita feita em outro worker vale aqui na hora, sem depender de
+    NOTIFY nem do backend de eventos.
+    """
+
+    def __init__(self, maxsize: int = DASHBOARD_CACHE_MAXSIZE, ttl_seconds: float = DASHBOARD_CACHE_TTL_SECONDS):
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._items: "OrderedDict[tuple, Tuple[float, str, bytes]]" = OrderedDict()
+        self.geracao = 0
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    def invalidar(self):
+        with self._lock:
+            self.geracao += 1
+
+    async def incrementar_geracao(self, session: AsyncSession):
+        """
+        Chamado depois do commit de uma escrita: invalida o cache de todos
+        os workers. Se o banco falhar aqui, a escrita já valeu; os outros
+        workers só veem a mudança quando a entrada vencer (TTL).
+        """
+        self.invalidar()
+        try:
+            await session.execute(text(f"SELECT nextval('{GERACAO_SEQUENCIA}')"))
+        except Exception as e:
+            await session.rollback()
+            print(f"[CACHE] Falha ao incrementar a geração dos dashboards: {e!r}")
+
+    def get(self, chave: tuple) -> Optional[Tuple[str, bytes]]:
+        with self._lock:
+            item = self._items.get(chave)
+            if item is None or item[0] < time.monotonic():
+                if item is not None:
+                    del self._items[chave]
+                self.misses += 1
+                return None
+            self._items.move_to_end(chave)
+            self.hits += 1
+            return item[1], item[2]
+
+    def set(self, chave: tuple, etag: str, corpo: bytes):
+        with self._lock:
+            self._items[chave] = (time.monotonic() + self.ttl_seconds, etag, corpo)
+            self._items.move_to_end(chave)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "size": len(self._items),
+                "generation": self.geracao,
+                "hits": self.hits,
+                "misses": self.misses,
+                "not_modified": self.not_modified,
+            }
+
+    async def responder(
+        self,
+        request: Request,
+        session: AsyncSession,
+        rota: str,
+        params: Dict[str, Any],
+        produzir: Callable[[], Awaitable[Any]],
+    ) -> Response:
+        """Resposta do cache (ou de `produzir`) com ETag; If-None-Match igual vira 304."""
+        with self._lock:
+            geracao = self.geracao
+        # As gerações são lidas antes de consultar: escrita no meio do
+        # cálculo grava na chave antiga, que ninguém mais procura
+        chave = (rota, geracao, await ler_geracao(session), normalizar_parametros(**params))
+        item = self.get(chave)
+        if item is None:
+            corpo = JSONResponse(content=jsonable_encoder(await produzir())).body
+            etag = '"' + hashlib.sha1(corpo).hexdigest() + '"'
+            self.set(chave, etag, corpo)
+        else:
+            etag, corpo = item
+
+        headers = {
+            "ETag": etag,
+            # Dados de usuário autenticado: só o cache do próprio cliente
+            "Cache-Control": f"private, max-age={DASHBOARD_CACHE_MAX_AGE_SECONDS}, must-revalidate",
+        }
+        if _etag_confere(request.headers.get("if-none-match"), etag):
+            with self._lock:
+                self.not_modified += 1
+            return Response(status_code=304, headers=headers)
+        return Response(content=corpo, media_type="application/json", headers=headers)
+
+
+def _etag_confere(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    for candidato in if_none_match.split(","):
+        candidato = candidato.strip()
+        if candidato == "*" or candidato.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+dashboard_cache = ResponseCache()
@@ -0,0 +1,301 @@
+"""
+Cliente HTTP do bot para a API: uma requests.Session com pool de conexões
+(keep-alive), retry com backoff exponencial, login automático (token em
+cache em disco, renovado perto de expirar ou após 401) e métricas de
+latência por rota, enviadas no perfil do ExecucaoLog.
+"""
+import base64
+import json
+import os
+import random
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Limites superiores (ms) das faixas do histograma de latência
+LATENCY_BUCKETS_MS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+RETRY_STATUS = (429, 500, 502, 503, 504)
+# Amostras guardadas por rota para os percentis exatos enviados no log
+LATENCY_MAX_SAMPLES = 10_000
+
+
+def percentile(ordenados: List[float], q: float) -> Optional[float]:
+    """Percentil com interpolação linear (mesma regra do percentile_cont)."""
+    if not ordenados:
+        return None
+    pos = (len(ordenados) - 1) * q
+    baixo = int(pos)
+    alto = min(baixo + 1, len(ordenados) - 1)
+    valor = ordenados[baixo] + (ordenados[alto] - ordenados[baixo]) * (pos - baixo)
+    return round(valor, 2)
+
+
+class LatencyHistogram:
+    def __init__(self, buckets_ms=LATENCY_BUCKETS_MS):
+        self.buckets_ms = buckets_ms
+        self.counts = [0] * (len(buckets_ms) + 1)
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.n = 0
+        self.samples = deque(maxlen=LATENCY_MAX_SAMPLES)
+
+    def observe(self, ms: float):
+        self.samples.append(ms)
+        for i, limite in enumerate(self.buckets_ms):
+            if ms <= limite:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.n += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def to_dict(self) -> Dict[str, Any]:
+        rotulos = [f"<={b}ms" for b in self.buckets_ms] + [f">{self.buckets_ms[-1]}ms"]
+        return {
+            "n": self.n,
+            "avg_ms": round(self.total_ms / self.n, 2) if self.n else 0.0,
+            "max_ms": round(self.max_ms, 2),
+            "buckets": {r: c for r, c in zip(rotulos, self.counts) if c},
+        }
+
+
+class ApiClient:
+    def __init__(
+        self,
+        token_url: str,
+        username: str,
+        password: str,
+        timeout: float = 15,
+        pool_size: int = 4,
+        max_retries: int = 3,
+        backoff_seconds: float = 0.5,
+        token_cache_path: Optional[Path] = None,
+        token_renew_margin_seconds: int = 120,
+    ):
+        self.token_url = token_url
+        self.username = username
+        self.password = password
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.token_cache_path = token_cache_path
+        self.token_renew_margin_seconds = token_renew_margin_seconds
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self.token: Optional[str] = None
+        self.expires_at = 0.0
+        self._auth_lock = threading.Lock()
+        self._metrics_lock = threading.Lock()
+        self._metricas: Dict[str, Dict[str, Any]] = {}
+
+    # ------------------------------------------------------------ token
+    @staticmethod
+    def _expira_em(token: str, expires_in: Optional[int]) -> float:
+        """Epoch de expiração: expires_in da resposta ou claim exp do JWT."""
+        if expires_in:
+            return time.time() + int(expires_in)
+        try:
+            payload = token.split(".")[1]
+            payload += "=" * (-len(payload) % 4)
+            return float(json.loads(base64.urlsafe_b64decode(payload))["exp"])
+        except Exception:
+            return 0.0
+
+    def _token_valido(self) -> bool:
+        return bool(self.token) and self.expires_at - self.token_renew_margin_seconds > time.time()
+
+    def _carregar_cache(self) -> bool:
+        if self.token_cache_path is None:
+            return False
+        try:
+            cache = json.loads(self.token_cache_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return False
+        if cache.get("username") != self.username or cache.get("token_url") != self.token_url:
+            return False
+        self.token = cache.get("access_token")
+        self.expires_at = float(cache.get("expires_at", 0))
+        return self._token_valido()
+
+    def _salvar_cache(self):
+        if self.token_cache_path is None:
+            return
+        try:
+            self.token_cache_path.write_text(json.dumps({
+                "username": self.username,
+                "token_url": self.token_url,
+                "access_token": self.token,
+                "expires_at": self.expires_at,
+            }), encoding="utf-8")
+            os.chmod(self.token_cache_path, 0o600)
+        except OSError as e:
+            print(f"[!] Não foi possível salvar o token em cache: {e}")
+
+    def clear_token(self):
+        self.token = None
+        self.expires_at = 0.0
+        if self.token_cache_path is not None:
+            try:
+                self.token_cache_path.unlink()
+            except OSError:
+                pass
+
+    def authenticate(self, force: bool = False, token_recusado: Optional[str] = None) -> bool:
+        """
+        Garante um token válido. Reaproveita o token em memória/disco; com
+        force (ou após 401 do token_recusado) faz novo login. Só uma thread
+        loga por vez; as outras usam o token novo.
+        """
+        with self._auth_lock:
+            if token_recusado is not None and self.token and self.token != token_recusado:
+                return True
+            if not force and token_recusado is None:
+                if self._token_valido():
+                    return True
+                if self._carregar_cache():
+                    print("[+] Reaproveitando token em cache.")
+                    return True
+            self.clear_token()
+
+            print(f"[*] Autenticando na API como '{self.username}'...")
+            try:
+                resp = self._enviar(
+                    "token", "POST", self.token_url,
+                    data={"username": self.username, "password": self.password},
+                    autenticado=False,
+                )
+            except requests.RequestException as e:
+                print(f"[-] Erro ao autenticar: {e}")
+                return False
+
+            if resp.status_code != 200:
+                print(f"[-] Falha ao autenticar ({resp.status_code}): {resp.text}")
+                return False
+            corpo = resp.json()
+            self.token = corpo.get("access_token")
+            if not self.token:
+                print("[-] Token não veio no response.")
+                return False
+            self.expires_at = self._expira_em(self.token, corpo.get("expires_in"))
+            self._salvar_cache()
+            print("[+] Token obtido com sucesso.")
+            return True
+
+    # ------------------------------------------------------------ requisições
+    def _registrar(self, rota: str, ms: Optional[float], status: Optional[int], retry: bool):
+        with self._metrics_lock:
+            m = self._metricas.setdefault(rota, {"requests": 0, "errors": 0, "retries": 0, "status": {}, "latency": LatencyHistogram()})
+            if retry:
+                m["retries"] += 1
+                return
+            m["requests"] += 1
+            if ms is not None:
+                m["latency"].observe(ms)
+            chave = str(status) if status is not None else "erro_conexao"
+            m["status"][chave] = m["status"].get(chave, 0) + 1
+            if status is None or status >= 400:
+                m["errors"] += 1
+
+    def _enviar(self, rota: str, method: str, url: str, autenticado: bool = True, **kwargs) -> requests.Response:
+        headers = dict(kwargs.pop("headers", None) or {})
+        if autenticado and self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        inicio = time.perf_counter()
+        try:
+            r = self.session.request(method, url, headers=headers, timeout=self.timeout, **kwargs)
+        except requests.RequestException:
+            self._registrar(rota, (time.perf_counter() - inicio) * 1000, None, False)
+            raise
+        self._registrar(rota, (time.perf_counter() - inicio) * 1000, r.status_code, False)
+        return r
+
+    def request(
+        self,
+        rota: str,
+        method: str,
+        url: str,
+        retries: Optional[int] = None,
+        idempotent: bool = True,
+        **kwargs,
+    ) -> requests.Response:
+        """
+        Requisição autenticada. Renova o token perto do vencimento e após
+        401 (uma vez). Erros de conexão e 429/5xx são repetidos com backoff
+        exponencial; timeouts só quando a operação é idempotente.
+        """
+        retries = self.max_retries if retries is None else retries
+        if not self._token_valido():
+            self.authenticate()
+
+        reautenticou = False
+        tentativa = 0
+        while True:
+            token = self.token
+            try:
+                r = self._enviar(rota, method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                transitorio = isinstance(e, requests.ConnectionError) or idempotent
+                if not transitorio or tentativa >= retries:
+                    raise
+            else:
+                if r.status_code == 401 and not reautenticou:
+                    reautenticou = True
+                    if self.authenticate(token_recusado=token):
+                        self._registrar(rota, None, None, True)
+                        continue
+                    return r
+                if r.status_code not in RETRY_STATUS or tentativa >= retries:
+                    return r
+
+            tentativa += 1
+            self._registrar(rota, None, None, True)
+            espera = self.backoff_seconds * (2 ** (tentativa - 1))
+            time.sleep(espera + random.uniform(0, espera / 2))
+
+    def post(self, rota: str, url: str, payload: Any, **kwargs) -> requests.Response:
+        return self.request(rota, "POST", url, json=payload, **kwargs)
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._metrics_lock:
+            return {
+                rota: {
+                    "requests": m["requests"],
+                    "errors": m["errors"],
+                    "retries": m["retries"],
+                    "status": dict(m["status"]),
+                    "latency": m["latency"].to_dict(),
+                }
+                for rota, m in self._metricas.items()
+            }
+
+    def latency_percentiles(self, rotas: Optional[List[str]] = None) -> Dict[str, Optional[float]]:
+        """p50/p95 (ms) das chamadas da rodada, somando as rotas pedidas (todas por padrão)."""
+        with self._metrics_lock:
+            amostras = sorted(
+                ms
+                for rota, m in self._metricas.items()
+                if rotas is None or rota in rotas
+                for ms in m["latency"].samples
+            )
+        return {
+            "p50": percentile(amostras, 0.5),
+            "p95": percentile(amostras, 0.95),
+        }
+
+    def reset_metrics(self):
+        with self._metrics_lock:
+            self._metricas.clear()
+
+    def close(self):
+        self.session.close()
@@ -0,0 +1,130 @@
+"""
+Carga histórica (backfill) por intervalo de datas: uma consulta "da
+publicação" por janela (um mês por padrão) em vez de uma por dia.
+
+Janelas com páginas demais são divididas ao meio e consultadas de novo,
+até caberem no limite ou chegarem a um único dia. As linhas de uma janela
+só são entregues ao sink depois que ela coube no limite, então a janela
+descartada não gera envio em dobro. O andamento fica no CheckpointStore
+(concluída/dividida por janela): uma carga interrompida recomeça só pelo
+que faltou.
+"""
+import time
+import traceback
+from contextlib import closing
+from datetime import date, timedelta
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from checkpoint import JANELA_CONCLUIDA, JANELA_DIVIDIDA, CheckpointStore
+from extraction import parse_data_publicacao
+
+Janela = Tuple[date, date]
+
+
+def monthly_windows(inicio: date, fim: date) -> List[Janela]:
+    """Janelas por mês do calendário; a primeira e a última podem ser parciais."""
+    janelas: List[Janela] = []
+    atual = inicio
+    while atual <= fim:
+        proximo_mes = (atual.replace(day=1) + timedelta(days=32)).replace(day=1)
+        janelas.append((atual, min(fim, proximo_mes - timedelta(days=1))))
+        atual = proximo_mes
+    return janelas
+
+
+def split_window(inicio: date, fim: date) -> List[Janela]:
+    meio = inicio + timedelta(days=(fim - inicio).days // 2)
+    return [(inicio, meio), (meio + timedelta(days=1), fim)]
+
+
+def window_key(inicio: date, fim: date) -> str:
+    # Janela de um dia usa a própria data (fallback do build_backfill_payload)
+    return inicio.isoformat() if inicio == fim else f"{inicio.isoformat()}/{fim.isoformat()}"
+
+
+class _JanelaGrande(Exception):
+    """A janela passou do limite de páginas e precisa ser dividida."""
+
+
+def process_window(
+    inicio: date,
+    fim: date,
+    range_fn: Callable[[date, date], Iterator[List[Dict]]],
+    filtrar: Callable[[List[Dict]], List[Dict]],
+    sink,
+    store: Optional[CheckpointStore] = None,
+    max_pages: int = 20,
+) -> List[Dict]:
+    """
+    Raspa a janela [inicio, fim] e entrega as linhas ao sink (com a chave
+    "inicio/fim"). Devolve um resultado por janela efetivamente consultada
+    (mais de um quando houve divisão). ok/fail chegam pelo callback do sink.
+    """
+    chave = window_key(inicio, fim)
+    estado = store.window_state(inicio.isoformat(), fim.isoformat()) if store is not None else None
+    if estado == JANELA_CONCLUIDA:
+        return []
+
+    def dividir() -> List[Dict]:
+        return [
+            r
+            for parte in split_window(inicio, fim)
+            for r in process_window(*parte, range_fn, filtrar, sink, store, max_pages)
+        ]
+
+    if estado == JANELA_DIVIDIDA and inicio < fim:
+        return dividir()
+
+    resultado = {
+        "janela": chave, "inicio": inicio, "fim": fim, "new": 0, "ok": 0, "fail": 0,
+        "erro": None, "erros_itens": [], "paginas": 0, "linhas": 0, "duracao_s": 0.0,
+    }
+    print(f"\n[*] Backfill: 'da publicação' de {inicio:%d/%m/%Y} a {fim:%d/%m/%Y}")
+    inicio_t = time.perf_counter()
+    linhas: List[Dict] = []
+    try:
+        with closing(range_fn(inicio, fim)) as paginas:
+            for rows in paginas:
+                resultado["paginas"] += 1
+                # Um único dia não tem como ser dividido: pagina até o fim
+                if resultado["paginas"] > max_pages and inicio < fim:
+                    raise _JanelaGrande()
+                linhas.extend(rows)
+    except _JanelaGrande:
+        print(f"    [~] Mais de {max_pages} páginas em {chave}; dividindo a janela.")
+        if store is not None:
+            store.save_window(inicio.isoformat(), fim.isoformat(), JANELA_DIVIDIDA)
+        return dividir()
+    except Exception as e:
+        resultado["erro"] = repr(e)
+        print(f"    [ERRO] Erro ao processar {chave}: {repr(e)}")
+        traceback.print_exc()
+
+    # Cada linha vai com a própria data; sem ela só dá para aproveitar
+    # janelas de um dia
+    validas, sem_data = [], []
+    for r in linhas:
+        if inicio < fim and parse_data_publicacao(r.get("publicacao_texto", "")) is None:
+            sem_data.append(r)
+        else:
+            validas.append(r)
+    resultado["linhas"] = len(linhas)
+    items = filtrar(validas)
+    resultado["new"] = len(items)
+    if items:
+        sink.put(chave, items)
+    resultado["duracao_s"] = round(time.perf_counter() - inicio_t, 3)
+
+    def concluir(ok: int, fail: int, erros: List[str]):
+        resultado["ok"] = ok
+        resultado["fail"] = fail + len(sem_data)
+        resultado["erros_itens"] = erros + [
+            f"{r.get('tipo_ato', '')}: data de publicação ilegível ({r.get('publicacao_texto', '')!r})"
+            for r in sem_data
+        ]
+        print(f"    [API] {chave} novos: {resultado['new']} | OK: {ok} | Falhas: {resultado['fail']}")
+        if store is not None and resultado["fail"] == 0 and resultado["erro"] is None:
+            store.save_window(inicio.isoformat(), fim.isoformat(), JANELA_CONCLUIDA, resultado["linhas"])
+
+    sink.finish_date(chave, concluir)
+    return [resultado]
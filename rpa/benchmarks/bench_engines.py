@@ -0,0 +1,67 @@
+"""
+Benchmark dos motores de raspagem: HTTP (requests + HTMLParser) x Selenium,
+este com a extração antiga (elements) e a de uma chamada (js).
+
+Sobe o SIJUT local (fixtures/sijut_server.py), raspa as mesmas datas com
+cada motor e imprime linhas/s. O Selenium só roda se houver Chrome.
+
+Uso (dentro de rpa/):
+    python -m benchmarks.bench_engines --dias 30 --delay 0.05
+"""
+import argparse
+import time
+from datetime import date, timedelta
+
+import bot
+from fixtures.sijut_server import SijutFixtureServer
+from http_engine import HttpEngine
+
+
+def medir(nome: str, datas, scrape_fn):
+    inicio = time.perf_counter()
+    linhas = sum(len(scrape_fn(d)) for d in datas)
+    duracao = time.perf_counter() - inicio
+    print(f"{nome:<10} {linhas:>8} {duracao:>10.2f} {linhas / duracao:>12.1f}")
+    return linhas
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dias", type=int, default=30)
+    parser.add_argument("--delay", type=float, default=0.0, help="Latência simulada por requisição (s)")
+    parser.add_argument("--page-size", type=int, default=10)
+    parser.add_argument("--sem-selenium", action="store_true")
+    args = parser.parse_args()
+
+    datas = [date(2024, 1, 1) + timedelta(days=i) for i in range(args.dias)]
+
+    with SijutFixtureServer(page_size=args.page_size, delay_seconds=args.delay) as servidor:
+        print(f"[BENCH] {args.dias} datas, delay={args.delay}s, página={args.page_size}")
+        print(f"{'motor':<10} {'linhas':>8} {'tempo (s)':>10} {'linhas/s':>12}")
+
+        http = HttpEngine(servidor.url)
+        try:
+            medir("http", datas, http.scrape_date)
+        finally:
+            http.close()
+
+        if args.sem_selenium:
+            return
+        bot.BASE_URL = servidor.url
+        try:
+            driver, wait = bot.setup_driver(headless=True)
+        except Exception as e:
+            print(f"selenium   indisponível ({type(e).__name__})")
+            return
+        try:
+            for modo in ("elements", "js"):
+                bot.EXTRACT_MODE = modo
+                medir(f"sel/{modo}", datas, lambda d: bot.scrape_date(driver, wait, d))
+            for linha in bot.extract_stats.summary_lines():
+                print(linha)
+        finally:
+            driver.quit()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,13 @@
+import asyncio
+import json
 import os
-import re
+import threading
 import time
 import traceback
 import requests
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date, datetime, timedelta
-from typing import Dict, List, Tuple, Optional
+from typing import Callable, Dict, Iterator, List, Tuple, Optional
 from dotenv import load_dotenv
 from pathlib import Path
 
@@ -18,23 +21,22 @@ from selenium.common.exceptions import TimeoutException, WebDriverException
 
 from webdriver_manager.chrome import ChromeDriverManager
 
+from extraction import parse_data_publicacao, rows_from_table
+from backfill import monthly_windows, process_window
+from api_client import ApiClient
+from http_engine import HttpEngine
+from checkpoint import CheckpointStore
+from pipeline import BatchRejected, IngestPipeline, RetryableError
+from profiling import NullProfiler, StepProfiler
+from scheduler import Job, Scheduler
+
 
 # =========================================================
 # CONFIGURAÇÃO SIMPLES (EDITÁVEL POR QUALQUER PESSOA)
 # =========================================================
-# Auto reexecução dentro do próprio código
+# Auto reexecução dentro do próprio código (scheduler com os JOBS abaixo)
 AUTO_RUN_ENABLED = True
 
-# "interval" = roda a cada X minutos
-# "daily"    = roda em horários fixos (HH:MM)
-SCHEDULE_MODE = "daily"  # "interval" ou "daily"
-
-# Se SCHEDULE_MODE == "interval"
-RUN_EVERY_MINUTES = 60
-
-# Se SCHEDULE_MODE == "daily"
-RUN_AT_TIMES = ["00:30"]  # ex: ["00:30", "12:30", "18:00"]
-
 # Operação do robô
 LOOKBACK_DAYS_DEFAULT = 3   # requisito: hoje + 3 datas anteriores
 HEADLESS_DEFAULT = True     # True = não abre janela do Chrome
@@ -44,6 +46,61 @@ KEEP_BROWSER_OPEN_ON_DEBUG = False  # True = segura browser aberto no fim (debug
 SELENIUM_WAIT_SECONDS = 25
 HTTP_TIMEOUT_SECONDS = 15
 
+# Envio em lote para POST /atos/bulk (máx. 1000 por chamada na API)
+BULK_CHUNK_SIZE = int(os.getenv("RPA_BULK_CHUNK_SIZE", "200"))
+
+# Pipeline de envio: a raspagem coloca as linhas numa fila limitada e
+# UPLOAD_WORKERS threads enviam em lotes de BULK_CHUNK_SIZE, em paralelo com
+# a raspagem. 0 = envio síncrono, página a página.
+UPLOAD_WORKERS = int(os.getenv("RPA_UPLOAD_WORKERS", "2"))
+UPLOAD_QUEUE_SIZE = int(os.getenv("RPA_UPLOAD_QUEUE_SIZE", "1000"))
+UPLOAD_MAX_RETRIES = int(os.getenv("RPA_UPLOAD_MAX_RETRIES", "4"))
+UPLOAD_BACKOFF_SECONDS = float(os.getenv("RPA_UPLOAD_BACKOFF_SECONDS", "0.5"))
+MAX_ITEM_ERRORS_PER_DATE = 5
+# Tentativas extras do cliente da API em erro de conexão e 429/5xx
+API_MAX_RETRIES = int(os.getenv("RPA_API_MAX_RETRIES", "3"))
+
+# Quantos navegadores (Chrome headless) processam datas em paralelo.
+# 1 = sequencial, como antes. Cada worker usa ~300 MB de RAM.
+RPA_WORKERS = int(os.getenv("RPA_WORKERS", "1"))
+
+# Motor de raspagem:
+# "http"     = só requisições HTTP + parser de HTML (sem navegador)
+# "selenium" = Chrome, como antes
+# "auto"     = HTTP e, se a página não tiver o formato esperado, Selenium
+SCRAPE_ENGINE = os.getenv("RPA_SCRAPE_ENGINE", "auto").strip().lower()
+
+# Extração da tabela no Selenium:
+# "js"       = uma única chamada execute_script por página
+# "elements" = find_elements + .text por célula (modo antigo, para comparação)
+EXTRACT_MODE = os.getenv("RPA_EXTRACT_MODE", "js").strip().lower()
+
+# Espera no Selenium:
+# "event" = espera por condição (campo preenchido, rádio marcado, tabela nova)
+# "sleep" = pausas fixas do código original, para comparação
+WAIT_STRATEGY = os.getenv("RPA_WAIT_STRATEGY", "event").strip().lower()
+WAIT_POLL_SECONDS = float(os.getenv("RPA_WAIT_POLL_SECONDS", "0.1"))
+
+# Jobs do scheduler. cron = "minuto hora dia mês dia-da-semana" (horário
+# local); vários horários: "30 0 * * *; 15 12 * * *". Exemplos:
+#   "30 0 * * *"   todo dia às 00:30
+#   "0 * * * *"    a cada hora
+#   "0 8-18/2 * * mon-fri"  dias úteis, das 8h às 18h, a cada 2h
+JOBS = [
+    {"nome": "coleta", "cron": os.getenv("RPA_SCHEDULE_CRON", "30 0 * * *"), "lookback_days": LOOKBACK_DAYS_DEFAULT},
+    # {"nome": "coleta-semana", "cron": "0 3 * * sun", "lookback_days": 7},
+]
+# Atraso aleatório (0..N s) no disparo, para não bater sempre no mesmo segundo
+SCHEDULER_JITTER_SECONDS = float(os.getenv("RPA_SCHEDULER_JITTER_SECONDS", "30"))
+# Na subida, roda uma vez se a última execução agendada foi perdida
+SCHEDULER_CATCH_UP = os.getenv("RPA_SCHEDULER_CATCH_UP", "true").strip().lower() == "true"
+# "skip" = ignora o disparo se a anterior ainda roda; "queue" = roda em seguida
+SCHEDULER_OVERLAP = os.getenv("RPA_SCHEDULER_OVERLAP", "skip").strip().lower()
+
+# Backfill (python bot.py --backfill AAAA-MM-DD): uma consulta por mês; a
+# janela com mais páginas que isso é dividida ao meio
+BACKFILL_MAX_PAGES = int(os.getenv("RPA_BACKFILL_MAX_PAGES", "20"))
+
 
 # =========================================================
 # CONFIG / ENV
@@ -53,6 +110,7 @@ load_dotenv(dotenv_path=raiz_projeto / ".env")
 
 BASE_URL = os.getenv("RPA_BASE_URL", "https://normas.receita.fazenda.gov.br/sijut2consulta/consulta.action")
 API_URL = os.getenv("RPA_API_URL", "http://127.0.0.1:8000/atos/")
+API_BULK_URL = os.getenv("RPA_API_BULK_URL", "http://127.0.0.1:8000/atos/bulk")
 TOKEN_URL = os.getenv("RPA_TOKEN_URL", "http://127.0.0.1:8000/token")
 
 # >>> NOVO: endpoint de logs (sua rota é POST /logs/)
@@ -61,7 +119,39 @@ LOGS_URL = os.getenv("RPA_LOGS_URL", "http://127.0.0.1:8000/logs/")
 ADMIN_USER = os.getenv("ADMIN_USER", "admin").strip()
 ADMIN_PASS = os.getenv("ADMIN_PASSWORD", "adminpassword").strip()
 
-AUTH_TOKEN: Optional[str] = None
+# Token reaproveitado entre execuções (evita um login/bcrypt por rodada)
+TOKEN_CACHE_PATH = Path(os.getenv("RPA_TOKEN_CACHE", str(raiz_projeto / ".rpa_token.json")))
+TOKEN_RENEW_MARGIN_SECONDS = 120
+
+# Caminho do chromedriver resolvido pelo webdriver-manager, salvo em disco
+DRIVER_CACHE_PATH = Path(os.getenv("RPA_DRIVER_CACHE", str(raiz_projeto / ".rpa_driver.json")))
+# Navegador aquecido entre execuções do scheduler: recicla após N execuções
+# ou se o heap JS passar do limite (0 = sem limite)
+DRIVER_MAX_RUNS = int(os.getenv("RPA_DRIVER_MAX_RUNS", "20"))
+DRIVER_MAX_HEAP_MB = float(os.getenv("RPA_DRIVER_MAX_HEAP_MB", "512"))
+
+# Checkpoint (SQLite) do que já foi enviado: só linhas novas/alteradas vão
+# para a API. Datas mais antigas que CHECKPOINT_FREEZE_DAYS que já têm
+# checkpoint nem são consultadas de novo (0 = sempre consulta).
+CHECKPOINT_ENABLED = os.getenv("RPA_CHECKPOINT_ENABLED", "true").strip().lower() == "true"
+CHECKPOINT_PATH = Path(os.getenv("RPA_CHECKPOINT_PATH", str(raiz_projeto / ".rpa_checkpoint.sqlite3")))
+CHECKPOINT_FREEZE_DAYS = int(os.getenv("RPA_CHECKPOINT_FREEZE_DAYS", "0"))
+
+# Estado do scheduler (última execução de cada job) e travas por job
+SCHEDULER_STATE_PATH = Path(os.getenv("RPA_SCHEDULER_STATE", str(raiz_projeto / ".rpa_scheduler.json")))
+SCHEDULER_LOCK_DIR = Path(os.getenv("RPA_SCHEDULER_LOCK_DIR", str(raiz_projeto / ".rpa_locks")))
+
+# Cliente da API (pool de conexões, retry, login automático e métricas)
+API_CLIENT = ApiClient(
+    TOKEN_URL,
+    ADMIN_USER,
+    ADMIN_PASS,
+    timeout=HTTP_TIMEOUT_SECONDS,
+    pool_size=max(4, UPLOAD_WORKERS + 2),
+    max_retries=API_MAX_RETRIES,
+    token_cache_path=TOKEN_CACHE_PATH,
+    token_renew_margin_seconds=TOKEN_RENEW_MARGIN_SECONDS,
+)
 
 Locator = Tuple[str, str]
 
@@ -69,36 +159,40 @@ Locator = Tuple[str, str]
 # =========================================================
 # AUTH
 # =========================================================
-def get_auth_token() -> bool:
-    global AUTH_TOKEN
-    try:
-        print(f"[*] Autenticando na API como '{ADMIN_USER}'...")
-        resp = requests.post(
-            TOKEN_URL,
-            data={"username": ADMIN_USER, "password": ADMIN_PASS},
-            timeout=HTTP_TIMEOUT_SECONDS
-        )
-
-        if resp.status_code == 200:
-            AUTH_TOKEN = resp.json().get("access_token")
-            if not AUTH_TOKEN:
-                print("[-] Token não veio no response.")
-                return False
-            print("[+] Token obtido com sucesso.")
-            return True
-
-        print(f"[-] Falha ao autenticar ({resp.status_code}): {resp.text}")
-        return False
-    except Exception as e:
-        print(f"[-] Erro ao autenticar: {e}")
-        return False
+def get_auth_token(force: bool = False) -> bool:
+    return API_CLIENT.authenticate(force=force)
 
 
 # =========================================================
 # SELENIUM
 # =========================================================
-def setup_driver(headless: bool = False):
-    service = ChromeService(ChromeDriverManager().install())
+def resolve_driver_path() -> str:
+    """
+    Caminho do chromedriver. CHROMEDRIVER_PATH tem prioridade; senão usa o
+    caminho salvo em disco e só chama o webdriver-manager (que consulta a
+    rede) quando o binário salvo não existe mais.
+    """
+    explicito = os.getenv("CHROMEDRIVER_PATH", "").strip()
+    if explicito:
+        return explicito
+
+    try:
+        salvo = json.loads(DRIVER_CACHE_PATH.read_text(encoding="utf-8")).get("path", "")
+        if salvo and os.path.isfile(salvo) and os.access(salvo, os.X_OK):
+            return salvo
+    except (OSError, ValueError):
+        pass
+
+    path = ChromeDriverManager().install()
+    try:
+        DRIVER_CACHE_PATH.write_text(json.dumps({"path": path, "resolvido_em": datetime.now().isoformat()}), encoding="utf-8")
+    except OSError as e:
+        print(f"[!] Não foi possível salvar o caminho do chromedriver: {e}")
+    return path
+
+
+def setup_driver(headless: bool = False, driver_path: Optional[str] = None):
+    service = ChromeService(driver_path or resolve_driver_path())
     options = webdriver.ChromeOptions()
     options.add_argument("--start-maximized")
     options.add_argument("--ignore-certificate-errors")
@@ -110,7 +204,7 @@ def setup_driver(headless: bool = False):
         options.add_argument("--window-size=1920,1080")
 
     driver = webdriver.Chrome(service=service, options=options)
-    wait = WebDriverWait(driver, SELENIUM_WAIT_SECONDS)
+    wait = WebDriverWait(driver, SELENIUM_WAIT_SECONDS, poll_frequency=WAIT_POLL_SECONDS)
     return driver, wait
 
 
@@ -150,11 +244,20 @@ def fill_date_input(driver, element, value: str):
         element.send_keys(Keys.CONTROL, "a")
         element.send_keys(Keys.BACKSPACE)
         element.send_keys(value)
-        time.sleep(0.12)
+        if WAIT_STRATEGY == "sleep":
+            time.sleep(0.12)
     except Exception:
         pass
 
     set_value_with_events(driver, element, value)
+    if WAIT_STRATEGY != "sleep":
+        # A máscara pode reformatar o valor de forma assíncrona
+        try:
+            WebDriverWait(driver, 2, poll_frequency=WAIT_POLL_SECONDS).until(
+                lambda d: element.get_attribute("value") == value
+            )
+        except TimeoutException:
+            pass
 
 
 def find_clickable_any(driver, wait, locators: List[Locator]):
@@ -192,7 +295,13 @@ def ensure_radio_publicacao(driver, wait) -> bool:
         r.dispatchEvent(new Event('change', { bubbles: true }));
         r.click();
     """, radio)
-    time.sleep(0.15)
+    if WAIT_STRATEGY == "sleep":
+        time.sleep(0.15)
+    else:
+        try:
+            wait.until(EC.element_to_be_selected(radio))
+        except TimeoutException:
+            pass
     return driver.execute_script("return document.getElementById('daPublicacao')?.checked === true;")
 
 
@@ -221,19 +330,68 @@ def wait_results_or_empty(wait):
 
 
 def page_has_no_results(driver) -> bool:
-    src = driver.page_source
-    return ("Nenhum ato" in src) or ("Nenhum ato publicado" in src)
+    # Só o texto visível, sem baixar o page_source inteiro
+    return bool(driver.execute_script(
+        "return !!document.body && document.body.innerText.includes('Nenhum ato');"
+    ))
+
+
+# Marca a tabela atual antes de submeter/paginar; o resultado está pronto
+# quando existe #tabelaAtos sem a marca (página nova ou tbody trocado via
+# AJAX) ou a mensagem de "Nenhum ato".
+MARK_RESULTS_JS = """
+const t = document.getElementById('tabelaAtos');
+if (t) { (t.querySelector('tbody') || t).setAttribute('data-rpa-old', '1'); }
+"""
+
+RESULTS_READY_JS = """
+const t = document.getElementById('tabelaAtos');
+if (t && (t.querySelector('tbody') || t).getAttribute('data-rpa-old') === null) return 'table';
+if (!t && document.body && document.body.innerText.includes('Nenhum ato')) return 'empty';
+return null;
+"""
+
+
+def mark_current_results(driver):
+    if WAIT_STRATEGY != "sleep":
+        driver.execute_script(MARK_RESULTS_JS)
+
+
+def wait_for_results(driver, wait, settle_seconds: float = 0.2) -> str:
+    """Espera a resposta de uma busca/paginação. Retorna "table" ou "empty"."""
+    if WAIT_STRATEGY == "sleep":
+        wait_results_or_empty(wait)
+        time.sleep(settle_seconds)
+        return "empty" if page_has_no_results(driver) else "table"
+
+    def pronto(d):
+        try:
+            return d.execute_script(RESULTS_READY_JS)
+        except WebDriverException:
+            # Página ainda trocando (navegação em andamento)
+            return None
+
+    return wait.until(pronto)
+
+
+def wait_date_inputs(driver, wait):
+    if WAIT_STRATEGY == "sleep":
+        time.sleep(0.4)
+        return pick_date_inputs(driver)
+
+    def prontos(d):
+        try:
+            return pick_date_inputs(d)
+        except (TimeoutException, WebDriverException):
+            return False
+
+    return wait.until(prontos)
 
 
 # =========================================================
 # EXTRAÇÃO
 # =========================================================
-def parse_numero_ato(tipo_ato: str) -> int:
-    m = re.search(r"(\d+)", tipo_ato or "")
-    return int(m.group(1)) if m else 0
-
-
-def build_header_index_map(table_el) -> Dict[str, int]:
+def header_texts(table_el) -> List[str]:
     headers = []
     try:
         ths = table_el.find_elements(By.CSS_SELECTOR, "thead th")
@@ -247,22 +405,65 @@ def build_header_index_map(table_el) -> Dict[str, int]:
             headers = [h.text.strip().lower() for h in ths]
         except Exception:
             headers = []
+    return headers
+
+
+# Lê cabeçalho e células de #tabelaAtos numa única chamada ao chromedriver
+TABLE_JS = """
+const table = document.getElementById('tabelaAtos');
+if (!table) return null;
+let ths = table.querySelectorAll('thead th');
+if (!ths.length) ths = table.querySelectorAll('tr th');
+const headers = Array.from(ths, th => th.innerText.trim().toLowerCase());
+const rows = Array.from(table.querySelectorAll('tbody tr'), tr =>
+    Array.from(tr.querySelectorAll('td'), td => td.innerText.trim())
+);
+return {headers: headers, rows: rows};
+"""
+
+
+class ExtractStats:
+    """Tempo gasto em extract_rows por modo, para o resumo da execução."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.dados: Dict[str, Dict[str, float]] = {}
+
+    def record(self, mode: str, seconds: float, rows: int):
+        with self._lock:
+            d = self.dados.setdefault(mode, {"pages": 0, "rows": 0, "seconds": 0.0})
+            d["pages"] += 1
+            d["rows"] += rows
+            d["seconds"] += seconds
+
+    def reset(self):
+        with self._lock:
+            self.dados.clear()
 
-    idx = {}
-    for i, h in enumerate(headers):
-        idx[h] = i
-    return idx
+    def summary_lines(self) -> List[str]:
+        with self._lock:
+            linhas = []
+            for mode, d in sorted(self.dados.items()):
+                por_pagina = d["seconds"] / d["pages"] * 1000 if d["pages"] else 0.0
+                linhas.append(
+                    f"Extração ({mode}): {d['pages']:.0f} páginas, {d['rows']:.0f} linhas, "
+                    f"{d['seconds']:.2f}s ({por_pagina:.0f} ms/página)"
+                )
+            return linhas
 
 
-def pick_col(idx_map: Dict[str, int], candidates: List[str]) -> Optional[int]:
-    for c in candidates:
-        for k, i in idx_map.items():
-            if c in k:
-                return i
-    return None
+extract_stats = ExtractStats()
 
 
-def extract_rows(driver, wait) -> List[Dict]:
+def extract_rows_elements(table) -> Tuple[List[str], List[List[str]]]:
+    """Modo antigo: um find_elements/.text por célula (N idas ao chromedriver)."""
+    linhas = []
+    for tr in table.find_elements(By.CSS_SELECTOR, "tbody tr"):
+        linhas.append([td.text for td in tr.find_elements(By.TAG_NAME, "td")])
+    return header_texts(table), linhas
+
+
+def extract_rows(driver, wait, mode: Optional[str] = None) -> List[Dict]:
     """
     Retorna dicts com:
     - tipo_ato
@@ -271,46 +472,20 @@ def extract_rows(driver, wait) -> List[Dict]:
     - publicacao_texto
     - ementa
     """
+    mode = mode or EXTRACT_MODE
     table = wait.until(EC.presence_of_element_located((By.ID, "tabelaAtos")))
-    idx_map = build_header_index_map(table)
-
-    col_tipo = pick_col(idx_map, ["tipo do ato", "tipo"])
-    col_orgao = pick_col(idx_map, ["órgão", "orgao", "unidade"])
-    col_pub = pick_col(idx_map, ["publicação", "publicacao"])
-    col_ementa = pick_col(idx_map, ["ementa"])
-
-    fallback = {"tipo": 0, "orgao": 2, "pub": 3, "ementa": 4}
-
-    linhas = table.find_elements(By.CSS_SELECTOR, "tbody tr")
-    results = []
-
-    for tr in linhas:
-        tds = tr.find_elements(By.TAG_NAME, "td")
-        if len(tds) < 4:
-            continue
 
-        i_tipo = col_tipo if col_tipo is not None else fallback["tipo"]
-        i_orgao = col_orgao if col_orgao is not None else fallback["orgao"]
-        i_pub = col_pub if col_pub is not None else fallback["pub"]
-        i_ementa = col_ementa if col_ementa is not None else fallback["ementa"]
-
-        if max(i_tipo, i_orgao, i_pub, i_ementa) >= len(tds):
-            continue
-
-        tipo_ato = tds[i_tipo].text.strip()
-        orgao = tds[i_orgao].text.strip()
-        publicacao = tds[i_pub].text.strip()
-        ementa = tds[i_ementa].text.strip()
-
-        results.append({
-            "tipo_ato": tipo_ato,
-            "numero_ato": parse_numero_ato(tipo_ato),
-            "orgao": orgao,
-            "publicacao_texto": publicacao,
-            "ementa": ementa,
-        })
+    inicio = time.perf_counter()
+    dados = driver.execute_script(TABLE_JS) if mode == "js" else None
+    if dados:
+        headers, linhas = dados["headers"], dados["rows"]
+    else:
+        mode = "elements"
+        headers, linhas = extract_rows_elements(table)
+    rows = rows_from_table(headers, linhas)
+    extract_stats.record(mode, time.perf_counter() - inicio, len(rows))
 
-    return results
+    return rows
 
 
 # =========================================================
@@ -342,9 +517,9 @@ def try_go_next_page(driver, wait) -> bool:
             except Exception:
                 pass
 
+            mark_current_results(driver)
             click_safely(driver, el)
-            wait.until(EC.presence_of_element_located((By.ID, "tabelaAtos")))
-            time.sleep(0.25)
+            wait_for_results(driver, wait, settle_seconds=0.25)
             return True
         except Exception:
             continue
@@ -355,37 +530,103 @@ def try_go_next_page(driver, wait) -> bool:
 # =========================================================
 # API - ATOS
 # =========================================================
-def send_to_api(items: List[Dict], data_execucao_iso: str) -> Tuple[int, int]:
-    if not AUTH_TOKEN:
-        raise RuntimeError("AUTH_TOKEN não definido")
+def build_payload(data_execucao_iso: str, it: Dict) -> Dict:
+    return {
+        "tipo_ato": it["tipo_ato"],
+        "numero_ato": it["numero_ato"],
+        "orgao": it["orgao"],
+        "ementa": it["ementa"],
+        "data_publicacao": data_execucao_iso,  # data do filtro (dia consultado)
+        "publicacao_texto": it.get("publicacao_texto", ""),
+    }
+
+
+def build_backfill_payload(data_janela: str, it: Dict) -> Dict:
+    """
+    Só para o backfill: a janela cobre vários dias, então a data vem da
+    coluna Publicação (sem ela, a chave da janela de um dia). A execução
+    diária continua com a data do filtro, a mesma das linhas já gravadas,
+    para a chave natural do upsert não mudar.
+    """
+    payload = build_payload(data_janela, it)
+    publicacao = parse_data_publicacao(it.get("publicacao_texto", ""))
+    if publicacao:
+        payload["data_publicacao"] = publicacao.isoformat()
+    return payload
+
+
+def post_bulk(payloads: List[Dict]):
+    """
+    Envia um lote para /atos/bulk. Usado pelos uploaders do pipeline, que
+    têm o próprio retry: traduz a resposta em RetryableError (tenta de novo)
+    ou BatchRejected (o pipeline divide o lote para achar o item com problema).
+    """
+    try:
+        r = API_CLIENT.post("bulk", API_BULK_URL, payloads, retries=0)
+    except requests.RequestException as e:
+        raise RetryableError(f"Falha de rede: {e!r}")
+
+    if r.status_code == 200:
+        return
+    if r.status_code == 401 or r.status_code == 429 or r.status_code >= 500:
+        raise RetryableError(f"HTTP {r.status_code}")
+    raise BatchRejected(f"HTTP {r.status_code}: {r.text[:300]}")
+
+
+class DirectSink:
+    """Envio síncrono: cada página vai direto para send_to_api (sem pipeline)."""
+
+    def __init__(self, to_payload: Callable[[str, Dict], Dict] = build_payload):
+        self.to_payload = to_payload
+        self._totais: Dict[str, List[int]] = {}
 
-    headers = {"Authorization": f"Bearer {AUTH_TOKEN}"}
+    def put(self, data_iso: str, rows: List[Dict]):
+        ok, fail = send_to_api(rows, data_iso, to_payload=self.to_payload)
+        totais = self._totais.setdefault(data_iso, [0, 0])
+        totais[0] += ok
+        totais[1] += fail
+
+    def finish_date(self, data_iso: str, callback: Callable[[int, int, List[str]], None]):
+        ok, fail = self._totais.pop(data_iso, [0, 0])
+        callback(ok, fail, [])
+
+
+def send_to_api(
+    items: List[Dict],
+    data_execucao_iso: str,
+    chunk_size: int = BULK_CHUNK_SIZE,
+    to_payload: Callable[[str, Dict], Dict] = build_payload,
+) -> Tuple[int, int]:
+    """
+    Envia os itens em lotes para /atos/bulk (upsert idempotente na chave
+    natural). Inseridos, atualizados e já existentes contam como OK.
+    """
+    if not API_CLIENT.token:
+        raise RuntimeError("AUTH_TOKEN não definido")
 
     ok = 0
     fail = 0
 
-    for it in items:
-        payload = {
-            "tipo_ato": it["tipo_ato"],
-            "numero_ato": it["numero_ato"],
-            "orgao": it["orgao"],
-            "ementa": it["ementa"],
-            "data_publicacao": data_execucao_iso,  # data do filtro (dia consultado)
-            "publicacao_texto": it.get("publicacao_texto", ""),
-        }
+    payloads = [to_payload(data_execucao_iso, it) for it in items]
 
+    for inicio in range(0, len(payloads), max(1, chunk_size)):
+        lote = payloads[inicio:inicio + max(1, chunk_size)]
         try:
-            r = requests.post(API_URL, json=payload, headers=headers, timeout=HTTP_TIMEOUT_SECONDS)
-            if r.status_code in (200, 201):
-                ok += 1
-            elif r.status_code == 409:
-                ok += 1
+            # Upsert idempotente: pode repetir com segurança (retry/401 no cliente)
+            r = API_CLIENT.post("bulk", API_BULK_URL, lote)
+            if r.status_code == 200:
+                resumo = r.json()
+                ok += len(lote)
+                print(
+                    f"      [LOTE] {len(lote)} itens | novos: {resumo.get('inserted', 0)} | "
+                    f"atualizados: {resumo.get('updated', 0)} | inalterados: {resumo.get('unchanged', 0)}"
+                )
             else:
-                fail += 1
-                print(f"      [ERRO] {r.status_code} ao enviar {it['tipo_ato']}: {r.text}")
+                fail += len(lote)
+                print(f"      [ERRO] {r.status_code} ao enviar lote de {len(lote)}: {r.text}")
         except Exception as e:
-            fail += 1
-            print(f"      [EXCEÇÃO] Falha ao enviar item: {e}")
+            fail += len(lote)
+            print(f"      [EXCEÇÃO] Falha ao enviar lote: {e}")
 
     return ok, fail
 
@@ -397,28 +638,33 @@ def send_execution_log(
     registros_capturados: int,
     tempo_execucao_segundos: float,
     status: str,
-    mensagem_erro: Optional[str] = None
+    mensagem_erro: Optional[str] = None,
+    perfil: Optional[Dict] = None,
+    metricas: Optional[Dict] = None,
+    datas: Optional[List[Dict]] = None,
 ) -> bool:
     """
     Envia 1 log para a API /logs/
-    Seu model (não alterado):
-      data_hora (default), registros_capturados, tempo_execucao_segundos, status, mensagem_erro
+      data_hora (default), registros_capturados, tempo_execucao_segundos, status, mensagem_erro,
+      perfil, métricas estruturadas (páginas, linhas, latência da API...) e uma entrada por data
     """
-    if not AUTH_TOKEN:
+    if not API_CLIENT.token:
         print("[-] Sem AUTH_TOKEN para enviar log.")
         return False
 
-    headers = {"Authorization": f"Bearer {AUTH_TOKEN}"}
-
     payload = {
         "registros_capturados": int(registros_capturados),
         "tempo_execucao_segundos": float(tempo_execucao_segundos),
         "status": status,
-        "mensagem_erro": mensagem_erro
+        "mensagem_erro": mensagem_erro,
+        "perfil": perfil,
+        **(metricas or {}),
+        "datas": datas or [],
     }
 
     try:
-        r = requests.post(LOGS_URL, json=payload, headers=headers, timeout=HTTP_TIMEOUT_SECONDS)
+        # Não idempotente: timeout não é repetido (evita log duplicado)
+        r = API_CLIENT.post("logs", LOGS_URL, payload, idempotent=False)
         if r.status_code in (200, 201):
             print("[+] Log salvo em /logs/.")
             return True
@@ -433,7 +679,373 @@ def send_execution_log(
 # =========================================================
 # RPA CORE  (ALTERADO PARA GERAR LOG)
 # =========================================================
-def run_rpa(lookback_days: int, headless: bool, keep_open: bool):
+class SeenSet:
+    """Dedupe entre dias e páginas, compartilhado pelos workers."""
+
+    def __init__(self):
+        self._keys = set()
+        self._lock = threading.Lock()
+
+    def add(self, key) -> bool:
+        """Registra a chave; retorna False se ela já tinha sido vista."""
+        with self._lock:
+            if key in self._keys:
+                return False
+            self._keys.add(key)
+            return True
+
+
+def scrape_date(driver, wait, alvo: date, profiler: StepProfiler = NullProfiler()) -> List[Dict]:
+    """Preenche o formulário no Chrome para uma data e devolve os atos (com paginação)."""
+    return [row for pagina in iter_pages(driver, wait, alvo, profiler) for row in pagina]
+
+
+def iter_pages(driver, wait, alvo: date, profiler: StepProfiler = NullProfiler(), pular_paginas: int = 0) -> Iterator[List[Dict]]:
+    """Como scrape_date, mas gera as linhas página a página."""
+    return iter_range_pages(driver, wait, alvo, alvo, profiler, pular_paginas)
+
+
+def iter_range_pages(
+    driver, wait, inicio: date, fim: date, profiler: StepProfiler = NullProfiler(), pular_paginas: int = 0,
+) -> Iterator[List[Dict]]:
+    """
+    Como iter_pages, para "da publicação" de inicio a fim numa única consulta.
+    As primeiras `pular_paginas` páginas são só navegadas (retomada depois
+    de uma falha do motor HTTP no meio da data).
+    """
+    data_str = inicio.strftime("%d/%m/%Y")
+    data_fim_str = fim.strftime("%d/%m/%Y")
+    data_iso = inicio.isoformat() if inicio == fim else f"{inicio.isoformat()}/{fim.isoformat()}"
+
+    with profiler.step("navigate", data_iso):
+        driver.get(BASE_URL)
+
+    with profiler.step("fill", data_iso):
+        ensure_radio_publicacao(driver, wait)
+        ensure_checkbox_atos_vigentes_desmarcado(driver)
+
+        dt_ini, dt_fim = wait_date_inputs(driver, wait)
+
+        fill_date_input(driver, dt_ini, data_str)
+        fill_date_input(driver, dt_fim, data_fim_str)
+
+    # Debug opcional
+    print(f"    [DEBUG] {data_str} dt_inicio.value =", dt_ini.get_attribute("value"))
+    print(f"    [DEBUG] {data_fim_str} dt_fim.value    =", dt_fim.get_attribute("value"))
+
+    with profiler.step("submit", data_iso):
+        btn_locators = [
+            (By.ID, "btnSubmit"),
+            (By.CSS_SELECTOR, "button#btnSubmit"),
+            (By.XPATH, "//button[contains(normalize-space(.),'Buscar')]"),
+        ]
+        btn_buscar = find_clickable_any(driver, wait, btn_locators)
+        mark_current_results(driver)
+        click_safely(driver, btn_buscar)
+
+    with profiler.step("wait", data_iso):
+        resultado = wait_for_results(driver, wait)
+
+    if resultado == "empty":
+        print(f"    [!] Sem resultados em {data_iso}.")
+        return
+
+    # Extrai (com paginação se existir)
+    pagina = 0
+    while True:
+        pagina += 1
+        if pagina > pular_paginas:
+            with profiler.step("extract", data_iso):
+                rows = [dict(r, _pagina=pagina) for r in extract_rows(driver, wait)]
+            yield rows
+        with profiler.step("paginate", data_iso):
+            avancou = try_go_next_page(driver, wait)
+        if not avancou:
+            break
+
+
+def iter_with_fallback(
+    primario: Callable[[], Iterator[List[Dict]]],
+    reserva: Callable[[int], Iterator[List[Dict]]],
+    descricao: str,
+    estrito: bool = False,
+) -> Iterator[List[Dict]]:
+    """
+    Páginas do motor HTTP; se ele falhar, o Selenium (`reserva`) continua da
+    página seguinte à última entregue, sem recontar páginas e linhas.
+    """
+    entregues = 0
+    try:
+        for rows in primario():
+            entregues += 1
+            yield rows
+        return
+    except Exception as e:
+        if estrito:
+            raise
+        print(f"    [!] Motor HTTP falhou em {descricao} na página {entregues + 1} ({e!r}); usando Selenium.")
+    yield from reserva(entregues)
+
+
+def filter_new(rows: List[Dict], seen: SeenSet) -> List[Dict]:
+    novos = []
+    for r in rows:
+        key = (
+            r.get("tipo_ato", ""),
+            r.get("numero_ato", 0),
+            r.get("orgao", ""),
+            r.get("publicacao_texto", ""),
+            r.get("ementa", ""),
+        )
+        if seen.add(key):
+            novos.append(r)
+    return novos
+
+
+def process_date(
+    alvo: date,
+    seen: SeenSet,
+    pages_fn: Callable[[date], Iterator[List[Dict]]],
+    checkpoint: Optional[CheckpointStore] = None,
+    sink=None,
+) -> Dict:
+    """
+    Raspa uma data e entrega as linhas novas ao sink página a página
+    (DirectSink: envio imediato; IngestPipeline: fila dos uploaders).
+    ok/fail são preenchidos quando o sink confirma a data inteira, e só
+    então o checkpoint da data é gravado. Erros ficam no resultado.
+    """
+    sink = sink if sink is not None else DirectSink()
+    data_str = alvo.strftime("%d/%m/%Y")
+    data_iso = alvo.isoformat()
+    resultado = {
+        "data": alvo, "new": 0, "ok": 0, "fail": 0, "unchanged": 0, "erro": None, "erros_itens": [],
+        "paginas": 0, "linhas": 0, "duracao_s": 0.0,
+    }
+    estado = checkpoint.begin(data_iso) if checkpoint is not None else None
+    print(f"\n[*] Buscando por 'da publicação' em: {data_str}")
+    inicio = time.perf_counter()
+    try:
+        for rows in pages_fn(alvo):
+            resultado["paginas"] += 1
+            resultado["linhas"] += len(rows)
+            candidatos = rows
+            if estado is not None:
+                # Só o que mudou desde o último envio aceito pela API
+                candidatos, inalteradas = estado.filter_page(rows)
+                resultado["unchanged"] += inalteradas
+
+            items = filter_new(candidatos, seen)
+            if estado is not None:
+                estado.mark_queued(rows, items)
+            resultado["new"] += len(items)
+            if items:
+                sink.put(data_iso, items)
+
+        print(
+            f"    [+] Capturados (novos) na data {data_str}: {resultado['new']}"
+            + (f" | inalterados: {resultado['unchanged']}" if estado is not None else "")
+        )
+    except Exception as e:
+        resultado["erro"] = repr(e)
+        print(f"    [ERRO] Erro ao processar {data_str}: {repr(e)}")
+        traceback.print_exc()
+    # Raspagem + entrega ao sink (com DirectSink inclui o envio à API)
+    resultado["duracao_s"] = round(time.perf_counter() - inicio, 3)
+
+    def concluir(ok: int, fail: int, erros: List[str]):
+        resultado["ok"] = ok
+        resultado["fail"] = fail
+        resultado["erros_itens"] = erros
+        if resultado["new"]:
+            print(f"    [API] {data_str} OK: {ok} | Falhas: {fail}")
+        if estado is not None and fail == 0 and resultado["erro"] is None:
+            estado.commit()
+
+    sink.finish_date(data_iso, concluir)
+    return resultado
+
+
+def metricas_por_data(resultados: List[Dict]) -> List[Dict]:
+    """Entradas `datas` do POST /logs/, uma por data processada."""
+    return [
+        {
+            "data_publicacao": r["data"].isoformat(),
+            "duracao_segundos": r.get("duracao_s", 0.0),
+            "paginas": r.get("paginas", 0),
+            "linhas_extraidas": r.get("linhas", 0),
+            "linhas_enviadas": r["ok"],
+            "linhas_com_falha": r["fail"],
+            "erro": r["erro"],
+        }
+        for r in resultados
+    ]
+
+
+def run_dates(
+    datas: List[date],
+    workers: int,
+    worker_fn: Callable[[date], Dict],
+) -> List[Dict]:
+    """
+    Distribui as datas entre N workers (1 = sequencial). Devolve os
+    resultados na ordem das datas.
+    """
+    if workers <= 1 or len(datas) <= 1:
+        return [worker_fn(alvo) for alvo in datas]
+
+    with ThreadPoolExecutor(max_workers=min(workers, len(datas)), thread_name_prefix="rpa") as pool:
+        return list(pool.map(worker_fn, datas))
+
+
+class _PooledDriver:
+    def __init__(self, driver, wait):
+        self.driver = driver
+        self.wait = wait
+        self.runs = 0
+        self.cdp_ready = False
+
+
+class DriverPool:
+    """
+    Chromes reaproveitados entre execuções. Em cada execução cada thread de
+    worker pega um navegador (get) e no fim (end_run) eles voltam aquecidos
+    para o pool. Um navegador é reciclado quando não responde, após
+    DRIVER_MAX_RUNS execuções ou se o heap JS passar de DRIVER_MAX_HEAP_MB.
+    """
+
+    def __init__(
+        self,
+        headless: bool,
+        max_runs: int = DRIVER_MAX_RUNS,
+        max_heap_mb: float = DRIVER_MAX_HEAP_MB,
+    ):
+        self.headless = headless
+        self.max_runs = max_runs
+        self.max_heap_mb = max_heap_mb
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._idle: List[_PooledDriver] = []
+        self._leased: List[_PooledDriver] = []
+        self._run = 0
+        self._driver_path: Optional[str] = None
+        self.stats = {"created": 0, "reused": 0, "recycled": 0}
+        # Tempo total gasto abrindo navegadores (setup_driver)
+        self.startup_seconds = 0.0
+
+    def get(self):
+        item = getattr(self._local, "item", None)
+        if item is None or getattr(self._local, "run", None) != self._run:
+            item = self._acquire()
+            self._local.item, self._local.run = item, self._run
+        return item.driver, item.wait
+
+    def _acquire(self) -> _PooledDriver:
+        while True:
+            with self._lock:
+                item = self._idle.pop() if self._idle else None
+            if item is None:
+                break
+            if self._healthy(item):
+                with self._lock:
+                    self._leased.append(item)
+                    self.stats["reused"] += 1
+                return item
+            print("[DRIVER] Navegador não respondeu ao health-check; descartando.")
+            self._quit(item)
+
+        with self._lock:
+            # webdriver-manager não é seguro para chamadas concorrentes
+            if self._driver_path is None:
+                self._driver_path = resolve_driver_path()
+        inicio = time.perf_counter()
+        driver, wait = setup_driver(headless=self.headless, driver_path=self._driver_path)
+        item = _PooledDriver(driver, wait)
+        with self._lock:
+            self._leased.append(item)
+            self.stats["created"] += 1
+            self.startup_seconds += time.perf_counter() - inicio
+        return item
+
+    def _healthy(self, item: _PooledDriver) -> bool:
+        try:
+            return item.driver.execute_script("return 1;") == 1 and bool(item.driver.window_handles)
+        except Exception:
+            return False
+
+    def heap_mb(self, item: _PooledDriver) -> Optional[float]:
+        """Heap JS do navegador via CDP (Performance.getMetrics)."""
+        try:
+            if not item.cdp_ready:
+                item.driver.execute_cdp_cmd("Performance.enable", {})
+                item.cdp_ready = True
+            metricas = item.driver.execute_cdp_cmd("Performance.getMetrics", {})["metrics"]
+            valores = {m["name"]: m["value"] for m in metricas}
+            return valores.get("JSHeapTotalSize", 0) / (1024 * 1024)
+        except Exception:
+            return None
+
+    def _recycle_reason(self, item: _PooledDriver) -> Optional[str]:
+        if self.max_runs and item.runs >= self.max_runs:
+            return f"{item.runs} execuções"
+        if self.max_heap_mb:
+            heap = self.heap_mb(item)
+            if heap is not None and heap > self.max_heap_mb:
+                return f"heap JS de {heap:.0f} MB"
+        if not self._healthy(item):
+            return "não responde"
+        return None
+
+    def end_run(self):
+        """Devolve os navegadores da execução ao pool (ou recicla)."""
+        with self._lock:
+            leased, self._leased = self._leased, []
+            self._run += 1
+        for item in leased:
+            item.runs += 1
+            motivo = self._recycle_reason(item)
+            if motivo:
+                print(f"[DRIVER] Reciclando navegador ({motivo}).")
+                self.stats["recycled"] += 1
+                self._quit(item)
+                continue
+            try:
+                # Libera a memória da última página enquanto espera a próxima execução
+                item.driver.get("about:blank")
+            except Exception:
+                self._quit(item)
+                continue
+            with self._lock:
+                self._idle.append(item)
+
+    def quit_all(self):
+        with self._lock:
+            itens = self._leased + self._idle
+            self._leased, self._idle = [], []
+            self._run += 1
+        for item in itens:
+            self._quit(item)
+
+    @staticmethod
+    def _quit(item: _PooledDriver):
+        try:
+            item.driver.quit()
+        except Exception:
+            pass
+
+
+def run_rpa(
+    lookback_days: int,
+    headless: bool,
+    keep_open: bool,
+    workers: int = RPA_WORKERS,
+    engine: str = SCRAPE_ENGINE,
+    drivers: Optional[DriverPool] = None,
+):
+    """
+    Executa uma rodada. Com `drivers` (pool do scheduler) os navegadores
+    continuam abertos para a próxima rodada; sem ele são fechados no fim.
+    """
     started_at = datetime.now()
     error_messages: List[str] = []
 
@@ -441,7 +1053,18 @@ def run_rpa(lookback_days: int, headless: bool, keep_open: bool):
     total_fail = 0
     total_new = 0
 
-    driver = None
+    pool_proprio = drivers is None
+    if drivers is None:
+        drivers = DriverPool(headless=headless)
+    http: Optional[HttpEngine] = None
+    profiler = StepProfiler(WAIT_STRATEGY)
+    checkpoint: Optional[CheckpointStore] = None
+    pipeline: Optional[IngestPipeline] = None
+    total_unchanged = 0
+    resultados: List[Dict] = []
+    startup_inicial = drivers.startup_seconds
+
+    API_CLIENT.reset_metrics()
 
     try:
         if not get_auth_token():
@@ -449,88 +1072,90 @@ def run_rpa(lookback_days: int, headless: bool, keep_open: bool):
             print("[-] Abortando: não autenticou na API.")
             return
 
-        driver, wait = setup_driver(headless=headless)
-
         # dedupe entre dias e páginas
-        seen = set()
+        seen = SeenSet()
+        extract_stats.reset()
+        datas = [date.today() - timedelta(days=offset) for offset in range(0, lookback_days + 1)]
+
+        if CHECKPOINT_ENABLED:
+            checkpoint = CheckpointStore(CHECKPOINT_PATH)
+            if CHECKPOINT_FREEZE_DAYS > 0:
+                limite = date.today() - timedelta(days=CHECKPOINT_FREEZE_DAYS)
+                congeladas = [d for d in datas if d < limite and checkpoint.has_date(d.isoformat())]
+                if congeladas:
+                    print(f"[*] {len(congeladas)} data(s) antigas já com checkpoint; pulando.")
+                datas = [d for d in datas if d not in congeladas]
+
+        print(f"[*] {len(datas)} data(s) com {max(1, workers)} worker(s), motor '{engine}'.")
+
+        if engine != "selenium":
+            http = HttpEngine(BASE_URL, HTTP_TIMEOUT_SECONDS, pool_size=max(1, workers))
+
+        def selenium_pages(alvo: date, pular_paginas: int = 0) -> Iterator[List[Dict]]:
+            driver, wait = drivers.get()
+            return iter_pages(driver, wait, alvo, profiler, pular_paginas)
+
+        def pages(alvo: date) -> Iterator[List[Dict]]:
+            if http is None:
+                return selenium_pages(alvo)
+            return iter_with_fallback(
+                lambda: http.iter_pages(alvo, profiler),
+                lambda entregues: selenium_pages(alvo, entregues),
+                f"{alvo:%d/%m/%Y}",
+                estrito=engine == "http",
+            )
 
-        for offset in range(0, lookback_days + 1):
-            alvo = date.today() - timedelta(days=offset)
-            data_str = alvo.strftime("%d/%m/%Y")
-            data_iso = alvo.isoformat()
+        if UPLOAD_WORKERS > 0:
+            pipeline = IngestPipeline(
+                post_bulk,
+                to_payload=build_payload,
+                workers=UPLOAD_WORKERS,
+                queue_size=UPLOAD_QUEUE_SIZE,
+                batch_size=BULK_CHUNK_SIZE,
+                max_retries=UPLOAD_MAX_RETRIES,
+                backoff_seconds=UPLOAD_BACKOFF_SECONDS,
+            )
 
-            print(f"\n[*] Buscando por 'da publicação' em: {data_str} (offset -{offset}d)")
-            driver.get(BASE_URL)
+        def worker(alvo: date) -> Dict:
+            return process_date(alvo, seen, pages, checkpoint, pipeline)
 
-            try:
-                ensure_radio_publicacao(driver, wait)
-                ensure_checkbox_atos_vigentes_desmarcado(driver)
-
-                time.sleep(0.4)
-                dt_ini, dt_fim = pick_date_inputs(driver)
-
-                fill_date_input(driver, dt_ini, data_str)
-                fill_date_input(driver, dt_fim, data_str)
-
-                # Debug opcional
-                print("    [DEBUG] dt_inicio.value =", dt_ini.get_attribute("value"))
-                print("    [DEBUG] dt_fim.value    =", dt_fim.get_attribute("value"))
-
-                btn_locators = [
-                    (By.ID, "btnSubmit"),
-                    (By.CSS_SELECTOR, "button#btnSubmit"),
-                    (By.XPATH, "//button[contains(normalize-space(.),'Buscar')]"),
-                ]
-                btn_buscar = find_clickable_any(driver, wait, btn_locators)
-                click_safely(driver, btn_buscar)
-
-                wait_results_or_empty(wait)
-                time.sleep(0.2)
-
-                if page_has_no_results(driver):
-                    print("    [!] Sem resultados nessa data.")
-                    continue
-
-                # Extrai (com paginação se existir)
-                items_to_send: List[Dict] = []
-                while True:
-                    rows = extract_rows(driver, wait)
-
-                    for r in rows:
-                        key = (
-                            r.get("tipo_ato", ""),
-                            r.get("numero_ato", 0),
-                            r.get("orgao", ""),
-                            r.get("publicacao_texto", ""),
-                            r.get("ementa", ""),
-                        )
-                        if key in seen:
-                            continue
-                        seen.add(key)
-                        items_to_send.append(r)
-
-                    if not try_go_next_page(driver, wait):
-                        break
-
-                print(f"    [+] Capturados (novos) na data {data_str}: {len(items_to_send)}")
-                total_new += len(items_to_send)
-
-                if items_to_send:
-                    ok, fail = send_to_api(items_to_send, data_iso)
-                    total_ok += ok
-                    total_fail += fail
-                    print(f"    [API] OK: {ok} | Falhas: {fail}")
-
-            except Exception as e:
-                msg = f"Erro ao processar {data_str}: {repr(e)}"
-                error_messages.append(msg)
-                print(f"    [ERRO] {msg}")
-                traceback.print_exc()
+        try:
+            resultados = run_dates(datas, workers, worker)
+        finally:
+            if pipeline is not None:
+                # Espera os uploaders confirmarem tudo o que foi enfileirado
+                pipeline.close()
+
+        for r in resultados:
+            total_new += r["new"]
+            total_ok += r["ok"]
+            total_fail += r["fail"]
+            total_unchanged += r.get("unchanged", 0)
+            if r["erro"]:
+                error_messages.append(f"Erro ao processar {r['data']:%d/%m/%Y}: {r['erro']}")
+            if r["erros_itens"]:
+                erros = r["erros_itens"]
+                error_messages.append(
+                    f"{len(erros)} item(ns) recusados em {r['data']:%d/%m/%Y}: "
+                    + "; ".join(erros[:MAX_ITEM_ERRORS_PER_DATE])
+                    + (" ..." if len(erros) > MAX_ITEM_ERRORS_PER_DATE else "")
+                )
 
         print("\n===== RESUMO =====")
         print(f"Total capturado (novo): {total_new}")
         print(f"Total enviado OK:       {total_ok}")
         print(f"Total falhas:           {total_fail}")
+        if checkpoint is not None:
+            print(f"Inalterados (checkpoint): {total_unchanged}")
+        if pipeline is not None:
+            print(f"Pipeline de envio:      {pipeline.stats}")
+        if error_messages:
+            print(f"Datas com erro:         {len(error_messages)}/{len(datas)}")
+        for linha in extract_stats.summary_lines():
+            print(linha)
+        print("Tempo por etapa:")
+        for linha in profiler.summary_lines():
+            print(linha)
 
     finally:
         finished_at = datetime.now()
@@ -547,86 +1172,250 @@ def run_rpa(lookback_days: int, headless: bool, keep_open: bool):
         mensagem_erro = "\n".join(error_messages) if error_messages else None
 
         # Salva log no backend
-        if AUTH_TOKEN:
+        if API_CLIENT.token:
+            perfil = profiler.to_dict()
+            # Contagem e histograma de latência das chamadas à API na rodada
+            perfil["api"] = API_CLIENT.metrics()
+            # Latência só dos envios de atos: o POST do próprio log ainda não aconteceu
+            latencia = API_CLIENT.latency_percentiles(["bulk"])
+            metricas = {
+                "paginas_visitadas": sum(r.get("paginas", 0) for r in resultados),
+                "linhas_extraidas": sum(r.get("linhas", 0) for r in resultados),
+                "linhas_enviadas": total_ok,
+                "linhas_com_falha": total_fail,
+                "api_latencia_p50_ms": latencia["p50"],
+                "api_latencia_p95_ms": latencia["p95"],
+                "navegador_inicializacao_segundos": round(drivers.startup_seconds - startup_inicial, 3),
+            }
             send_execution_log(
                 registros_capturados=total_new,
                 tempo_execucao_segundos=tempo_execucao,
                 status=status,
-                mensagem_erro=mensagem_erro
+                mensagem_erro=mensagem_erro,
+                perfil=perfil,
+                metricas=metricas,
+                datas=metricas_por_data(resultados),
             )
 
-        # Fecha o navegador
-        try:
-            if driver:
-                if keep_open:
-                    input("\n[PAUSA] Aperte ENTER para fechar o navegador...")
-                driver.quit()
-        except Exception:
-            pass
+        # Fecha os navegadores
+        if keep_open:
+            input("\n[PAUSA] Aperte ENTER para fechar o navegador...")
+        if pool_proprio:
+            drivers.quit_all()
+        else:
+            drivers.end_run()
+            print(f"[DRIVER] {drivers.stats}")
+        if http is not None:
+            http.close()
+        if checkpoint is not None:
+            checkpoint.close()
+
+
+def run_backfill(
+    inicio: date,
+    fim: date,
+    headless: bool = HEADLESS_DEFAULT,
+    workers: int = RPA_WORKERS,
+    engine: str = SCRAPE_ENGINE,
+    max_pages: int = BACKFILL_MAX_PAGES,
+):
+    """
+    Carga histórica de inicio a fim: uma consulta por mês (dividida quando
+    passa de max_pages páginas), com a data de cada linha lida da coluna
+    Publicação. O andamento fica no checkpoint: rodar de novo com o mesmo
+    intervalo retoma do que faltou.
+    """
+    started_at = datetime.now()
+    error_messages: List[str] = []
+    resultados: List[Dict] = []
+    drivers = DriverPool(headless=headless)
+    http: Optional[HttpEngine] = None
+    profiler = StepProfiler(WAIT_STRATEGY)
+    store = CheckpointStore(CHECKPOINT_PATH)
+    pipeline: Optional[IngestPipeline] = None
 
+    API_CLIENT.reset_metrics()
 
-# =========================================================
-# SCHEDULER INTERNO (AUTO REEXECUÇÃO)
-# =========================================================
-def seconds_until_next_daily_run(times_hhmm: List[str]) -> int:
-    now = datetime.now()
-    candidates: List[datetime] = []
-    for hhmm in times_hhmm:
-        hh, mm = map(int, hhmm.split(":"))
-        run_dt = now.replace(hour=hh, minute=mm, second=0, microsecond=0)
-        if run_dt <= now:
-            run_dt += timedelta(days=1)
-        candidates.append(run_dt)
-    next_run = min(candidates)
-    return max(1, int((next_run - now).total_seconds()))
+    try:
+        if not get_auth_token():
+            error_messages.append("Falha ao autenticar na API (token).")
+            print("[-] Abortando: não autenticou na API.")
+            return
 
+        seen = SeenSet()
+        janelas = monthly_windows(inicio, fim)
+        print(f"[*] Backfill de {inicio:%d/%m/%Y} a {fim:%d/%m/%Y}: {len(janelas)} janela(s), motor '{engine}'.")
+
+        if engine != "selenium":
+            http = HttpEngine(BASE_URL, HTTP_TIMEOUT_SECONDS, pool_size=max(1, workers))
+
+        def selenium_pages(de: date, ate: date, pular_paginas: int = 0) -> Iterator[List[Dict]]:
+            driver, wait = drivers.get()
+            return iter_range_pages(driver, wait, de, ate, profiler, pular_paginas)
+
+        def pages(de: date, ate: date) -> Iterator[List[Dict]]:
+            if http is None:
+                return selenium_pages(de, ate)
+            return iter_with_fallback(
+                lambda: http.iter_range(de, ate, profiler),
+                lambda entregues: selenium_pages(de, ate, entregues),
+                f"{de:%d/%m/%Y}-{ate:%d/%m/%Y}",
+                estrito=engine == "http",
+            )
 
-def run_forever():
-    print("\n[SCHEDULER] Auto-run habilitado.")
-    print(f"[SCHEDULER] Modo: {SCHEDULE_MODE}")
+        sink = DirectSink(build_backfill_payload)
+        if UPLOAD_WORKERS > 0:
+            pipeline = sink = IngestPipeline(
+                post_bulk,
+                to_payload=build_backfill_payload,
+                workers=UPLOAD_WORKERS,
+                queue_size=UPLOAD_QUEUE_SIZE,
+                batch_size=BULK_CHUNK_SIZE,
+                max_retries=UPLOAD_MAX_RETRIES,
+                backoff_seconds=UPLOAD_BACKOFF_SECONDS,
+            )
 
-    while True:
-        started_at = datetime.now()
-        print(f"\n[SCHEDULER] Execução iniciada em {started_at:%Y-%m-%d %H:%M:%S}")
+        def worker(janela) -> List[Dict]:
+            return process_window(*janela, pages, lambda rows: filter_new(rows, seen), sink, store, max_pages)
 
         try:
+            por_janela = run_dates(janelas, workers, worker)
+        finally:
+            if pipeline is not None:
+                pipeline.close()
+
+        resultados = [r for lista in por_janela for r in lista]
+        for r in resultados:
+            if r["erro"]:
+                error_messages.append(f"Erro ao processar {r['janela']}: {r['erro']}")
+            if r["erros_itens"]:
+                erros = r["erros_itens"]
+                error_messages.append(
+                    f"{len(erros)} item(ns) recusados em {r['janela']}: "
+                    + "; ".join(erros[:MAX_ITEM_ERRORS_PER_DATE])
+                    + (" ..." if len(erros) > MAX_ITEM_ERRORS_PER_DATE else "")
+                )
+
+        print("\n===== RESUMO (BACKFILL) =====")
+        print(f"Consultas (janelas):    {len(resultados)}")
+        print(f"Páginas visitadas:      {sum(r['paginas'] for r in resultados)}")
+        print(f"Total capturado (novo): {sum(r['new'] for r in resultados)}")
+        print(f"Total enviado OK:       {sum(r['ok'] for r in resultados)}")
+        print(f"Total falhas:           {sum(r['fail'] for r in resultados)}")
+        if error_messages:
+            print(f"Janelas com erro:       {len(error_messages)}")
+
+    finally:
+        total_new = sum(r["new"] for r in resultados)
+        total_ok = sum(r["ok"] for r in resultados)
+        total_fail = sum(r["fail"] for r in resultados)
+        if error_messages and total_ok == 0 and total_new == 0:
+            status = "failed"
+        elif total_fail > 0 or error_messages:
+            status = "partial"
+        else:
+            status = "success"
+
+        if API_CLIENT.token:
+            perfil = profiler.to_dict()
+            perfil["api"] = API_CLIENT.metrics()
+            perfil["backfill"] = {"inicio": inicio.isoformat(), "fim": fim.isoformat(), "janelas": len(resultados)}
+            latencia = API_CLIENT.latency_percentiles(["bulk"])
+            send_execution_log(
+                registros_capturados=total_new,
+                tempo_execucao_segundos=(datetime.now() - started_at).total_seconds(),
+                status=status,
+                mensagem_erro="\n".join(error_messages) if error_messages else None,
+                perfil=perfil,
+                metricas={
+                    "paginas_visitadas": sum(r["paginas"] for r in resultados),
+                    "linhas_extraidas": sum(r["linhas"] for r in resultados),
+                    "linhas_enviadas": total_ok,
+                    "linhas_com_falha": total_fail,
+                    "api_latencia_p50_ms": latencia["p50"],
+                    "api_latencia_p95_ms": latencia["p95"],
+                    "navegador_inicializacao_segundos": round(drivers.startup_seconds, 3),
+                },
+            )
+
+        drivers.quit_all()
+        if http is not None:
+            http.close()
+        store.close()
+
+
+# =========================================================
+# SCHEDULER INTERNO (AUTO REEXECUÇÃO)
+# =========================================================
+def build_scheduler() -> Scheduler:
+    """Um job por entrada de JOBS, cada um com o próprio pool de navegadores."""
+    jobs = []
+    for cfg in JOBS:
+        drivers = DriverPool(headless=HEADLESS_DEFAULT)
+
+        def coleta(cfg=cfg, drivers=drivers):
             run_rpa(
-                lookback_days=LOOKBACK_DAYS_DEFAULT,
+                lookback_days=cfg.get("lookback_days", LOOKBACK_DAYS_DEFAULT),
                 headless=HEADLESS_DEFAULT,
-                keep_open=KEEP_BROWSER_OPEN_ON_DEBUG
+                keep_open=False,
+                drivers=drivers,
             )
-            print("[SCHEDULER] Execução finalizada.")
-        except KeyboardInterrupt:
-            print("\n[SCHEDULER] Interrompido pelo usuário. Encerrando.")
-            break
-        except Exception as e:
-            print(f"[SCHEDULER] ERRO na execução: {e}")
-            traceback.print_exc()
 
-        if not AUTO_RUN_ENABLED:
-            print("[SCHEDULER] Auto-run desabilitado. Encerrando.")
-            break
+        job = Job(
+            cfg["nome"],
+            cfg["cron"],
+            coleta,
+            jitter_seconds=cfg.get("jitter_seconds", SCHEDULER_JITTER_SECONDS),
+            catch_up=cfg.get("catch_up", SCHEDULER_CATCH_UP),
+            sobreposicao=cfg.get("sobreposicao", SCHEDULER_OVERLAP),
+            # Navegadores aquecidos entre as execuções; fechados no fim do serviço
+            fechar=drivers.quit_all,
+        )
+        jobs.append(job)
+    return Scheduler(jobs, SCHEDULER_STATE_PATH, SCHEDULER_LOCK_DIR)
 
-        if SCHEDULE_MODE == "interval":
-            sleep_seconds = max(60, RUN_EVERY_MINUTES * 60)
-            next_run = datetime.now() + timedelta(seconds=sleep_seconds)
-            print(f"[SCHEDULER] Próxima execução (intervalo): {next_run:%Y-%m-%d %H:%M:%S}")
-        elif SCHEDULE_MODE == "daily":
-            sleep_seconds = seconds_until_next_daily_run(RUN_AT_TIMES)
-            next_run = datetime.now() + timedelta(seconds=sleep_seconds)
-            print(f"[SCHEDULER] Próxima execução (diária): {next_run:%Y-%m-%d %H:%M:%S}")
-        else:
-            print("[SCHEDULER] SCHEDULE_MODE inválido. Use 'interval' ou 'daily'. Encerrando.")
-            break
 
-        time.sleep(sleep_seconds)
+def run_forever():
+    print("\n[SCHEDULER] Auto-run habilitado.")
+    scheduler = build_scheduler()
+    try:
+        asyncio.run(scheduler.run())
+    except KeyboardInterrupt:
+        print("\n[SCHEDULER] Interrompido pelo usuário. Encerrando.")
+    finally:
+        scheduler.close()
 
 
 # =========================================================
 # ENTRYPOINT
 # =========================================================
 if __name__ == "__main__":
-    if AUTO_RUN_ENABLED:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="RPA SIJUT -> API")
+    parser.add_argument("--backfill", metavar="AAAA-MM-DD", type=date.fromisoformat,
+                        help="Carga histórica a partir desta data (retomável)")
+    parser.add_argument("--ate", metavar="AAAA-MM-DD", type=date.fromisoformat, default=None,
+                        help="Fim do backfill (padrão: hoje)")
+    parser.add_argument("--job", metavar="NOME", help="Roda agora um job do scheduler (respeita a trava)")
+    parser.add_argument("--uma-vez", action="store_true", help="Roda uma coleta e sai, sem scheduler")
+    parser.add_argument("--status", action="store_true", help="Mostra os jobs, a última e a próxima execução")
+    args = parser.parse_args()
+
+    if args.backfill:
+        run_backfill(args.backfill, args.ate or date.today())
+    elif args.status:
+        for linha in build_scheduler().status():
+            print(json.dumps(linha, ensure_ascii=False))
+    elif args.job:
+        scheduler = build_scheduler()
+        if args.job not in scheduler.jobs:
+            parser.error(f"job desconhecido: {args.job} (disponíveis: {', '.join(scheduler.jobs)})")
+        try:
+            asyncio.run(scheduler.run_job(args.job))
+        finally:
+            scheduler.close()
+    elif AUTO_RUN_ENABLED and not args.uma_vez:
         run_forever()
     else:
         run_rpa(
@@ -0,0 +1,192 @@
+"""
+Checkpoint local (SQLite) do que já foi enviado à API, por data de
+publicação: hash de cada linha (pela chave natural do ato) e de cada página
+de resultado. Permite mandar só as linhas novas ou alteradas entre execuções.
+Guarda também o andamento do backfill por janela de datas, para retomar
+uma carga histórica interrompida.
+"""
+import hashlib
+import json
+import sqlite3
+import threading
+from datetime import datetime
+from itertools import groupby
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+CAMPOS_CONTEUDO = ("tipo_ato", "numero_ato", "orgao", "publicacao_texto", "ementa")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoint_data (
+    data TEXT PRIMARY KEY,
+    hash TEXT NOT NULL,
+    linhas INTEGER NOT NULL,
+    atualizado_em TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS checkpoint_pagina (
+    data TEXT NOT NULL,
+    pagina INTEGER NOT NULL,
+    hash TEXT NOT NULL,
+    PRIMARY KEY (data, pagina)
+);
+CREATE TABLE IF NOT EXISTS checkpoint_linha (
+    data TEXT NOT NULL,
+    chave TEXT NOT NULL,
+    hash TEXT NOT NULL,
+    PRIMARY KEY (data, chave)
+);
+CREATE TABLE IF NOT EXISTS backfill_janela (
+    inicio TEXT NOT NULL,
+    fim TEXT NOT NULL,
+    estado TEXT NOT NULL,
+    linhas INTEGER NOT NULL DEFAULT 0,
+    atualizado_em TEXT NOT NULL,
+    PRIMARY KEY (inicio, fim)
+);
+"""
+
+# Estados de uma janela do backfill
+JANELA_CONCLUIDA = "concluida"
+JANELA_DIVIDIDA = "dividida"
+
+
+def row_key(row: Dict) -> str:
+    """Chave natural do ato na data (a API completa com data_publicacao)."""
+    return f"{row.get('tipo_ato', '')}|{row.get('numero_ato', 0)}|{row.get('orgao', '')}"
+
+
+def row_hash(row: Dict) -> str:
+    conteudo = json.dumps([row.get(c) for c in CAMPOS_CONTEUDO], ensure_ascii=False)
+    return hashlib.sha1(conteudo.encode("utf-8")).hexdigest()
+
+
+def _hash_de(hashes: Iterable[str]) -> str:
+    return hashlib.sha1("\n".join(hashes).encode("ascii")).hexdigest()
+
+
+def page_hashes(rows: List[Dict]) -> Dict[int, str]:
+    """Hash de cada página (campo _pagina que os motores preenchem)."""
+    return {
+        pagina: _hash_de(row_hash(r) for r in grupo)
+        for pagina, grupo in groupby(rows, key=lambda r: r.get("_pagina", 1))
+    }
+
+
+class DateCheckpoint:
+    """
+    Estado de uma data durante a raspagem em streaming: filtra página a
+    página e guarda só os hashes (não as linhas) até o commit.
+    """
+
+    def __init__(self, store: "CheckpointStore", data: str, paginas: Dict[int, str], linhas: Dict[str, str]):
+        self.store = store
+        self.data = data
+        self._paginas_salvas = paginas
+        self._linhas_salvas = linhas
+        self.paginas: Dict[int, str] = {}
+        self.linhas: Dict[str, str] = {}
+
+    def filter_page(self, rows: List[Dict]) -> Tuple[List[Dict], int]:
+        """(linhas novas ou alteradas desta página, quantidade inalterada)."""
+        enviar: List[Dict] = []
+        inalteradas = 0
+        for pagina, hash_pagina in page_hashes(rows).items():
+            grupo = [r for r in rows if r.get("_pagina", 1) == pagina]
+            pagina_igual = self._paginas_salvas.get(pagina) == hash_pagina
+            for r in grupo:
+                if pagina_igual or self._linhas_salvas.get(row_key(r)) == row_hash(r):
+                    # Já enviada antes: continua valendo no próximo commit
+                    self.linhas[row_key(r)] = row_hash(r)
+                    inalteradas += 1
+                else:
+                    enviar.append(r)
+        return enviar, inalteradas
+
+    def mark_queued(self, rows: List[Dict], enfileiradas: List[Dict]):
+        """
+        Registra os hashes das linhas que foram de fato para o envio. Uma
+        página só é registrada quando todas as suas linhas estão registradas
+        (as descartadas pelo dedupe da execução ficam para a próxima).
+        """
+        for r in enfileiradas:
+            self.linhas[row_key(r)] = row_hash(r)
+        for pagina, hash_pagina in page_hashes(rows).items():
+            grupo = [r for r in rows if r.get("_pagina", 1) == pagina]
+            if all(self.linhas.get(row_key(r)) == row_hash(r) for r in grupo):
+                self.paginas[pagina] = hash_pagina
+
+    def commit(self, agora: Optional[datetime] = None):
+        self.store.save(self.data, self.paginas, self.linhas, len(self.linhas), agora)
+
+
+class CheckpointStore:
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def has_date(self, data: str) -> bool:
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM checkpoint_data WHERE data = ?", (data,)).fetchone() is not None
+
+    def begin(self, data: str) -> DateCheckpoint:
+        with self._lock:
+            paginas = dict(self._conn.execute(
+                "SELECT pagina, hash FROM checkpoint_pagina WHERE data = ?", (data,)
+            ).fetchall())
+            linhas = dict(self._conn.execute(
+                "SELECT chave, hash FROM checkpoint_linha WHERE data = ?", (data,)
+            ).fetchall())
+        return DateCheckpoint(self, data, paginas, linhas)
+
+    def save(
+        self,
+        data: str,
+        paginas: Dict[int, str],
+        linhas: Dict[str, str],
+        total: int,
+        agora: Optional[datetime] = None,
+    ):
+        hash_data = _hash_de(paginas[p] for p in sorted(paginas))
+        agora_iso = (agora or datetime.now()).isoformat(timespec="seconds")
+
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM checkpoint_pagina WHERE data = ?", (data,))
+            self._conn.executemany(
+                "INSERT INTO checkpoint_pagina (data, pagina, hash) VALUES (?, ?, ?)",
+                [(data, p, h) for p, h in paginas.items()],
+            )
+            self._conn.executemany(
+                "INSERT INTO checkpoint_linha (data, chave, hash) VALUES (?, ?, ?) "
+                "ON CONFLICT (data, chave) DO UPDATE SET hash = excluded.hash",
+                list((data, chave, h) for chave, h in linhas.items()),
+            )
+            self._conn.execute(
+                "INSERT INTO checkpoint_data (data, hash, linhas, atualizado_em) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (data) DO UPDATE SET hash = excluded.hash, linhas = excluded.linhas, "
+                "atualizado_em = excluded.atualizado_em",
+                (data, hash_data, total, agora_iso),
+            )
+
+    def window_state(self, inicio: str, fim: str) -> Optional[str]:
+        with self._lock:
+            linha = self._conn.execute(
+                "SELECT estado FROM backfill_janela WHERE inicio = ? AND fim = ?", (inicio, fim)
+            ).fetchone()
+        return linha[0] if linha else None
+
+    def save_window(self, inicio: str, fim: str, estado: str, linhas: int = 0, agora: Optional[datetime] = None):
+        agora_iso = (agora or datetime.now()).isoformat(timespec="seconds")
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO backfill_janela (inicio, fim, estado, linhas, atualizado_em) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (inicio, fim) DO UPDATE SET estado = excluded.estado, linhas = excluded.linhas, "
+                "atualizado_em = excluded.atualizado_em",
+                (inicio, fim, estado, linhas, agora_iso),
+            )
@@ -0,0 +1,72 @@
+import re
+from datetime import date
+from typing import Dict, List, Optional
+
+# Índices usados quando o cabeçalho da tabela não é reconhecido
+FALLBACK_COLS = {"tipo": 0, "orgao": 2, "pub": 3, "ementa": 4}
+
+
+def parse_numero_ato(tipo_ato: str) -> int:
+    m = re.search(r"(\d+)", tipo_ato or "")
+    return int(m.group(1)) if m else 0
+
+
+def parse_data_publicacao(texto: str) -> Optional[date]:
+    """Primeira data dd/mm/aaaa do texto da coluna Publicação (None se não houver)."""
+    m = re.search(r"(\d{1,2})/(\d{1,2})/(\d{4})", texto or "")
+    if not m:
+        return None
+    dia, mes, ano = (int(g) for g in m.groups())
+    try:
+        return date(ano, mes, dia)
+    except ValueError:
+        return None
+
+
+def pick_col(idx_map: Dict[str, int], candidates: List[str]) -> Optional[int]:
+    for c in candidates:
+        for k, i in idx_map.items():
+            if c in k:
+                return i
+    return None
+
+
+def rows_from_table(headers: List[str], linhas: List[List[str]]) -> List[Dict]:
+    """
+    Converte o texto das células de #tabelaAtos nos dicts enviados à API.
+    Compartilhado pelos motores Selenium e HTTP, para que os dois produzam
+    exatamente o mesmo formato:
+    - tipo_ato
+    - numero_ato
+    - orgao
+    - publicacao_texto
+    - ementa
+    """
+    idx_map = {h.strip().lower(): i for i, h in enumerate(headers)}
+
+    col_tipo = pick_col(idx_map, ["tipo do ato", "tipo"])
+    col_orgao = pick_col(idx_map, ["órgão", "orgao", "unidade"])
+    col_pub = pick_col(idx_map, ["publicação", "publicacao"])
+    col_ementa = pick_col(idx_map, ["ementa"])
+
+    i_tipo = col_tipo if col_tipo is not None else FALLBACK_COLS["tipo"]
+    i_orgao = col_orgao if col_orgao is not None else FALLBACK_COLS["orgao"]
+    i_pub = col_pub if col_pub is not None else FALLBACK_COLS["pub"]
+    i_ementa = col_ementa if col_ementa is not None else FALLBACK_COLS["ementa"]
+    maior = max(i_tipo, i_orgao, i_pub, i_ementa)
+
+    results = []
+    for tds in linhas:
+        if len(tds) < 4 or maior >= len(tds):
+            continue
+
+        tipo_ato = tds[i_tipo].strip()
+        results.append({
+            "tipo_ato": tipo_ato,
+            "numero_ato": parse_numero_ato(tipo_ato),
+            "orgao": tds[i_orgao].strip(),
+            "publicacao_texto": tds[i_pub].strip(),
+            "ementa": tds[i_ementa].strip(),
+        })
+
+    return results
@@ -0,0 +1,176 @@
+"""
+Servidor HTML local que imita o formulário de consulta do SIJUT e a tabela
+de resultados (tabelaAtos), para testar o bot sem acessar a Receita.
+
+Uso avulso:
+    python rpa/fixtures/sijut_server.py --port 8765
+    RPA_BASE_URL=http://127.0.0.1:8765/consulta.action python rpa/bot.py
+"""
+import argparse
+import html
+import threading
+import time
+from datetime import date, datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional
+from urllib.parse import parse_qs, urlencode, urlparse
+
+TIPOS = ["Solução de Consulta", "Instrução Normativa RFB", "Portaria RFB", "Ato Declaratório Executivo"]
+ORGAOS = ["Cosit", "RFB", "SRRF01", "SRRF08", "DRF São Paulo"]
+
+FORMULARIO = """<!DOCTYPE html>
+<html lang="pt-br"><head><meta charset="utf-8"><title>SIJUT - Consulta</title></head>
+<body>
+<form id="formConsulta" method="get" action="consulta.action">
+  <input type="hidden" name="acao" value="buscar">
+  <label><input type="radio" name="tipoData" id="daAssinatura" value="assinatura" checked> da assinatura</label>
+  <label><input type="radio" name="tipoData" id="daPublicacao" value="publicacao"> da publicação</label>
+  <input type="text" class="form-control maskDate" id="dt_inicio" name="dt_inicio" maxlength="10">
+  <input type="text" class="form-control maskDate" id="dt_fim" name="dt_fim" maxlength="10">
+  <label><input type="checkbox" id="vigentes" name="vigentes" value="1" checked> Apenas atos vigentes</label>
+  <button type="submit" id="btnSubmit" class="btn">Buscar</button>
+</form>
+{resultado}
+</body></html>
+"""
+
+
+def atos_sinteticos(dia: date) -> List[Dict]:
+    """Atos determinísticos por data: 0 a 30, alguns dias sem nenhum."""
+    quantidade = (dia.toordinal() % 7) * 5
+    atos = []
+    for i in range(quantidade):
+        numero = (dia.toordinal() % 1000) * 100 + i + 1
+        tipo = TIPOS[i % len(TIPOS)]
+        atos.append({
+            "tipo_ato": f"{tipo} nº {numero}",
+            "numero_ato": numero,
+            "orgao": ORGAOS[(i + dia.day) % len(ORGAOS)],
+            "publicacao_texto": dia.strftime("%d/%m/%Y"),
+            "ementa": f"Dispõe sobre o tema {i + 1} publicado em {dia:%d/%m/%Y}.",
+        })
+    return atos
+
+
+class SijutFixtureServer:
+    """Sobe o servidor numa thread; use como context manager."""
+
+    def __init__(
+        self,
+        port: int = 0,
+        page_size: int = 10,
+        delay_seconds: float = 0.0,
+        atos_fn: Callable[[date], List[Dict]] = atos_sinteticos,
+    ):
+        self.page_size = page_size
+        self.delay_seconds = delay_seconds
+        self.atos_fn = atos_fn
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/consulta.action"
+
+    def atos_da_data(self, dia: date) -> List[Dict]:
+        return self.atos_fn(dia)
+
+    def start(self) -> "SijutFixtureServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def render(self, query: Dict[str, List[str]]) -> str:
+        if query.get("acao", [""])[0] != "buscar":
+            return FORMULARIO.format(resultado="")
+
+        try:
+            inicio = datetime.strptime(query.get("dt_inicio", [""])[0], "%d/%m/%Y").date()
+            fim = datetime.strptime(query.get("dt_fim", [""])[0], "%d/%m/%Y").date()
+        except ValueError:
+            return FORMULARIO.format(resultado="<div class='alert'>Informe datas válidas.</div>")
+
+        atos: List[Dict] = []
+        for ordinal in range(inicio.toordinal(), fim.toordinal() + 1):
+            atos.extend(self.atos_fn(date.fromordinal(ordinal)))
+
+        if not atos:
+            return FORMULARIO.format(resultado="<div class='alert'>Nenhum ato publicado encontrado.</div>")
+
+        pagina = max(1, int(query.get("p", ["1"])[0]))
+        total_paginas = (len(atos) + self.page_size - 1) // self.page_size
+        trecho = atos[(pagina - 1) * self.page_size:pagina * self.page_size]
+
+        linhas = "\n".join(
+            "<tr><td>{}</td><td>Vigente</td><td>{}</td><td>{}</td><td>{}</td></tr>".format(
+                html.escape(a["tipo_ato"]), html.escape(a["orgao"]),
+                html.escape(a["publicacao_texto"]), html.escape(a["ementa"]),
+            )
+            for a in trecho
+        )
+        proxima = {k: v[0] for k, v in query.items()}
+        proxima["p"] = str(pagina + 1)
+        if pagina < total_paginas:
+            paginacao = f"<ul class='pagination'><li class='next'><a href='consulta.action?{html.escape(urlencode(proxima))}'>Próxima</a></li></ul>"
+        else:
+            paginacao = "<ul class='pagination'><li class='next disabled'><a href='#'>Próxima</a></li></ul>"
+
+        resultado = f"""
+<table id="tabelaAtos">
+  <thead><tr><th>Tipo do Ato</th><th>Situação</th><th>Órgão de Origem</th><th>Publicação</th><th>Ementa</th></tr></thead>
+  <tbody>
+{linhas}
+  </tbody>
+</table>
+{paginacao}
+"""
+        return FORMULARIO.format(resultado=resultado)
+
+    def _handler(self):
+        servidor = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with servidor._lock:
+                    servidor.requests += 1
+                if servidor.delay_seconds:
+                    time.sleep(servidor.delay_seconds)
+                corpo = servidor.render(parse_qs(urlparse(self.path).query)).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(corpo)))
+                self.end_headers()
+                self.wfile.write(corpo)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--page-size", type=int, default=10)
+    parser.add_argument("--delay", type=float, default=0.0, help="Latência simulada por requisição (s)")
+    args = parser.parse_args()
+
+    servidor = SijutFixtureServer(args.port, args.page_size, args.delay)
+    print(f"[FIXTURE] SIJUT local em {servidor.url}")
+    try:
+        servidor._httpd.serve_forever()
+    except KeyboardInterrupt:
+        servidor.stop()
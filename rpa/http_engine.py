@@ -0,0 +1,256 @@
+"""
+Motor de raspagem só com HTTP: envia o formulário de consulta.action com uma
+sessão requests (conexões reaproveitadas) e lê #tabelaAtos com o HTMLParser
+da biblioteca padrão, sem abrir navegador.
+
+Os campos do formulário são descobertos na própria página (action, método,
+hidden inputs, nome do rádio "da publicação" e dos campos de data), então
+mudanças de nome no SIJUT não exigem alteração aqui.
+"""
+from datetime import date
+from html.parser import HTMLParser
+from typing import Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urljoin
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from extraction import rows_from_table
+from profiling import NullProfiler, StepProfiler
+
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/120.0 Safari/537.36"
+)
+# Limite de segurança contra paginação em loop
+MAX_PAGES = 500
+
+
+class ScrapeError(Exception):
+    """A página não tem o formato esperado (formulário ou tabela)."""
+
+
+def _texto(partes: List[str]) -> str:
+    return " ".join("".join(partes).split())
+
+
+class FormParser(HTMLParser):
+    """Coleta os formulários da página: action, método e campos."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.forms: List[Dict] = []
+        self._atual: Optional[Dict] = None
+
+    def handle_starttag(self, tag, attrs):
+        a = dict(attrs)
+        if tag == "form":
+            self._atual = {"action": a.get("action") or "", "method": (a.get("method") or "get").lower(), "inputs": []}
+            self.forms.append(self._atual)
+        elif tag in ("input", "select", "textarea") and self._atual is not None:
+            self._atual["inputs"].append({
+                "tag": tag,
+                "type": (a.get("type") or "text").lower(),
+                "name": a.get("name"),
+                "id": a.get("id"),
+                "value": a.get("value") or "",
+                "checked": "checked" in a,
+            })
+
+    def handle_endtag(self, tag):
+        if tag == "form":
+            self._atual = None
+
+
+class TabelaAtosParser(HTMLParser):
+    """Lê cabeçalho e células de #tabelaAtos e o link "Próxima"."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.encontrou_tabela = False
+        self.headers: List[str] = []
+        self.linhas: List[List[str]] = []
+        self.proxima: Optional[str] = None
+        self.sem_resultados = False
+
+        self._profundidade = 0  # tabelas aninhadas dentro de #tabelaAtos
+        self._celula: Optional[List[str]] = None
+        self._celula_th = False
+        self._linha: Optional[List[str]] = None
+        self._li_classes: List[str] = []
+        self._link: Optional[Tuple[str, List[str], bool]] = None
+
+    def handle_starttag(self, tag, attrs):
+        a = dict(attrs)
+        if tag == "table":
+            if self._profundidade:
+                self._profundidade += 1
+            elif a.get("id") == "tabelaAtos":
+                self.encontrou_tabela = True
+                self._profundidade = 1
+        elif self._profundidade == 1 and tag == "tr":
+            self._linha = []
+        elif self._profundidade == 1 and tag in ("td", "th") and self._linha is not None:
+            self._celula = []
+            self._celula_th = tag == "th"
+        elif tag == "li":
+            self._li_classes.append((a.get("class") or "").lower())
+        elif tag == "a":
+            desabilitado = any("disabled" in c for c in self._li_classes[-1:]) or "disabled" in (a.get("class") or "")
+            self._link = (a.get("href") or "", [a.get("title") or ""], desabilitado)
+
+    def handle_endtag(self, tag):
+        if tag == "table" and self._profundidade:
+            self._profundidade -= 1
+        elif self._profundidade == 1 and tag in ("td", "th") and self._celula is not None:
+            texto = _texto(self._celula)
+            if self._celula_th:
+                self.headers.append(texto.lower())
+            else:
+                self._linha.append(texto)
+            self._celula = None
+        elif self._profundidade == 1 and tag == "tr" and self._linha is not None:
+            if self._linha:
+                self.linhas.append(self._linha)
+            self._linha = None
+        elif tag == "li" and self._li_classes:
+            self._li_classes.pop()
+        elif tag == "a" and self._link is not None:
+            href, partes, desabilitado = self._link
+            rotulo = _texto(partes)
+            if ("Próxima" in rotulo or "Proxima" in rotulo) and not desabilitado and href and href != "#":
+                self.proxima = href
+            self._link = None
+
+    def handle_data(self, data):
+        if self._celula is not None:
+            self._celula.append(data)
+        if self._link is not None:
+            self._link[1].append(data)
+        if "Nenhum ato" in data:
+            self.sem_resultados = True
+
+
+def build_session(pool_size: int = 4, retries: int = 2) -> requests.Session:
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=pool_size,
+        pool_maxsize=pool_size,
+        max_retries=Retry(total=retries, backoff_factor=0.5, status_forcelist=(502, 503, 504), allowed_methods=None),
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers["User-Agent"] = USER_AGENT
+    return session
+
+
+def form_params(html: str, data_str: str, data_fim_str: Optional[str] = None) -> Tuple[str, str, Dict[str, str]]:
+    """
+    Monta (action, método, parâmetros) do formulário de consulta para
+    "da publicação" de data_str a data_fim_str (padrão: o mesmo dia), sem
+    "Apenas atos vigentes".
+    """
+    parser = FormParser()
+    parser.feed(html)
+
+    form = next(
+        (f for f in parser.forms if any(i["id"] in ("dt_inicio", "dt_fim") for i in f["inputs"])),
+        None,
+    )
+    if form is None:
+        raise ScrapeError("Formulário de consulta não encontrado")
+
+    params: Dict[str, str] = {}
+    for campo in form["inputs"]:
+        nome, tipo = campo["name"], campo["type"]
+        if not nome or tipo in ("submit", "button", "image", "reset", "file"):
+            continue
+        if tipo == "checkbox":
+            # Marcados por padrão ("Apenas atos vigentes"): enviamos desmarcados
+            continue
+        if tipo == "radio":
+            if campo["id"] == "daPublicacao":
+                params[nome] = campo["value"] or "on"
+            elif campo["checked"]:
+                params.setdefault(nome, campo["value"] or "on")
+            continue
+        params[nome] = campo["value"]
+
+    datas = {i["id"]: i["name"] for i in form["inputs"] if i["id"] in ("dt_inicio", "dt_fim") and i["name"]}
+    if len(datas) < 2:
+        raise ScrapeError("Campos de data do formulário não encontrados")
+    params[datas["dt_inicio"]] = data_str
+    params[datas["dt_fim"]] = data_fim_str or data_str
+
+    radio = [i for i in form["inputs"] if i["id"] == "daPublicacao"]
+    if not radio:
+        raise ScrapeError('Opção "da publicação" não encontrada no formulário')
+
+    return form["action"], form["method"], params
+
+
+def parse_resultados(html: str) -> Tuple[List[Dict], Optional[str], bool]:
+    """(linhas, href da próxima página, sem_resultados) de uma página de resultado."""
+    parser = TabelaAtosParser()
+    parser.feed(html)
+    parser.close()
+    if not parser.encontrou_tabela:
+        if parser.sem_resultados:
+            return [], None, True
+        raise ScrapeError("Tabela #tabelaAtos não encontrada na resposta")
+    return rows_from_table(parser.headers, parser.linhas), parser.proxima, False
+
+
+class HttpEngine:
+    """Raspa uma data (ou um intervalo) com requisições HTTP diretas (sem navegador)."""
+
+    def __init__(self, base_url: str, timeout: float = 15, pool_size: int = 4):
+        self.base_url = base_url
+        self.timeout = timeout
+        self.session = build_session(pool_size)
+
+    def _get(self, url: str, params: Optional[Dict[str, str]] = None) -> requests.Response:
+        r = self.session.get(url, params=params, timeout=self.timeout)
+        r.raise_for_status()
+        return r
+
+    def scrape_date(self, alvo: date, profiler: StepProfiler = NullProfiler()) -> List[Dict]:
+        return [row for pagina in self.iter_pages(alvo, profiler) for row in pagina]
+
+    def iter_pages(self, alvo: date, profiler: StepProfiler = NullProfiler()) -> Iterator[List[Dict]]:
+        """Gera as linhas página a página (a próxima só é buscada depois de consumida a atual)."""
+        return self.iter_range(alvo, alvo, profiler)
+
+    def iter_range(self, inicio: date, fim: date, profiler: StepProfiler = NullProfiler()) -> Iterator[List[Dict]]:
+        """Como iter_pages, para "da publicação" de inicio a fim numa única consulta."""
+        data_str = inicio.strftime("%d/%m/%Y")
+        data_iso = inicio.isoformat() if inicio == fim else f"{inicio.isoformat()}/{fim.isoformat()}"
+
+        with profiler.step("navigate", data_iso):
+            formulario = self._get(self.base_url)
+        with profiler.step("fill", data_iso):
+            action, method, params = form_params(formulario.text, data_str, fim.strftime("%d/%m/%Y"))
+            url = urljoin(formulario.url, action) if action else formulario.url
+
+        with profiler.step("submit", data_iso):
+            if method == "post":
+                r = self.session.post(url, data=params, timeout=self.timeout)
+                r.raise_for_status()
+            else:
+                r = self._get(url, params)
+
+        for numero in range(1, MAX_PAGES + 1):
+            with profiler.step("extract", data_iso):
+                pagina, proxima, vazio = parse_resultados(r.text)
+            if vazio:
+                return
+            # _pagina: usado pelo checkpoint; não vai para a API
+            yield [dict(linha, _pagina=numero) for linha in pagina]
+            if not proxima:
+                break
+            with profiler.step("paginate", data_iso):
+                r = self._get(urljoin(r.url, proxima))
+
+    def close(self):
+        self.session.close()
@@ -0,0 +1,181 @@
+"""
+Pipeline produtor/consumidor entre a raspagem e a API.
+
+Os workers de raspagem colocam as linhas de cada página numa fila limitada
+(put bloqueia quando ela enche: backpressure) e um pool de uploaders
+esvazia a fila em lotes, com retry/backoff. Erros ficam registrados por
+item e por data, e cada data avisa quando todas as suas linhas foram
+confirmadas (finish_date) para o checkpoint ser gravado.
+"""
+import queue
+import random
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+_FIM = object()
+
+
+class RetryableError(Exception):
+    """Falha transitória (rede, 429, 5xx, token expirado): o lote é reenviado."""
+
+
+class BatchRejected(Exception):
+    """A API recusou o lote (4xx): divide o lote para isolar o item inválido."""
+
+
+class _Data:
+    def __init__(self):
+        self.pendentes = 0
+        self.ok = 0
+        self.fail = 0
+        self.erros: List[str] = []
+        self.callback: Optional[Callable[[int, int, List[str]], None]] = None
+
+
+class IngestPipeline:
+    def __init__(
+        self,
+        send_fn: Callable[[List[Dict]], None],
+        to_payload: Callable[[str, Dict], Dict] = lambda data_iso, row: row,
+        workers: int = 2,
+        queue_size: int = 1000,
+        batch_size: int = 200,
+        max_retries: int = 4,
+        backoff_seconds: float = 0.5,
+        linger_seconds: float = 0.1,
+    ):
+        self.send_fn = send_fn
+        self.to_payload = to_payload
+        self.batch_size = max(1, batch_size)
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.linger_seconds = linger_seconds
+        self._fila: "queue.Queue" = queue.Queue(maxsize=max(1, queue_size))
+        self._lock = threading.Lock()
+        self._datas: Dict[str, _Data] = {}
+        self.stats = {"batches": 0, "retries": 0, "splits": 0, "ok": 0, "fail": 0, "max_queue_depth": 0}
+        self._threads = [
+            threading.Thread(target=self._uploader, name=f"uploader-{i}", daemon=True)
+            for i in range(max(1, workers))
+        ]
+        for t in self._threads:
+            t.start()
+
+    # ------------------------------------------------------------ produtor
+    def put(self, data_iso: str, rows: List[Dict]):
+        """Enfileira as linhas de uma página; bloqueia se a fila estiver cheia."""
+        # Payloads montados antes de contar as pendentes: uma linha que não
+        # vira payload é falha do item, e não deixa a data pendente para sempre
+        payloads = []
+        erros = []
+        for row in rows:
+            try:
+                payloads.append(self.to_payload(data_iso, row))
+            except Exception as e:
+                erros.append(f"{row.get('tipo_ato', '')}: payload inválido ({e!r})")
+        with self._lock:
+            estado = self._datas.setdefault(data_iso, _Data())
+            estado.pendentes += len(payloads)
+            estado.fail += len(erros)
+            estado.erros.extend(erros)
+            self.stats["fail"] += len(erros)
+        for payload in payloads:
+            self._fila.put((data_iso, payload))
+        with self._lock:
+            self.stats["max_queue_depth"] = max(self.stats["max_queue_depth"], self._fila.qsize())
+
+    def finish_date(self, data_iso: str, callback: Callable[[int, int, List[str]], None]):
+        """Chama callback(ok, fail, erros) quando todas as linhas da data forem confirmadas."""
+        with self._lock:
+            estado = self._datas.setdefault(data_iso, _Data())
+            if estado.pendentes > 0:
+                estado.callback = callback
+                return
+        callback(estado.ok, estado.fail, estado.erros)
+
+    def close(self):
+        """Espera a fila esvaziar e encerra os uploaders."""
+        for _ in self._threads:
+            self._fila.put(_FIM)
+        for t in self._threads:
+            t.join()
+
+    # ------------------------------------------------------------ consumidor
+    def _proximo_lote(self) -> Tuple[List[Tuple[str, Dict]], bool]:
+        primeiro = self._fila.get()
+        if primeiro is _FIM:
+            return [], True
+        lote = [primeiro]
+        limite = time.monotonic() + self.linger_seconds
+        while len(lote) < self.batch_size:
+            restante = limite - time.monotonic()
+            try:
+                item = self._fila.get(timeout=max(0.0, restante)) if restante > 0 else self._fila.get_nowait()
+            except queue.Empty:
+                break
+            if item is _FIM:
+                # devolve o sinal de parada para depois deste lote
+                self._fila.put(_FIM)
+                break
+            lote.append(item)
+        return lote, False
+
+    def _uploader(self):
+        while True:
+            lote, fim = self._proximo_lote()
+            if fim:
+                return
+            self._enviar(lote)
+
+    def _enviar(self, lote: List[Tuple[str, Dict]]):
+        payloads = [p for _, p in lote]
+        tentativa = 0
+        while True:
+            try:
+                with self._lock:
+                    self.stats["batches"] += 1
+                self.send_fn(payloads)
+                self._confirmar(lote, None)
+                return
+            except RetryableError as e:
+                tentativa += 1
+                if tentativa > self.max_retries:
+                    self._confirmar(lote, f"{e} (após {self.max_retries} tentativas)")
+                    return
+                with self._lock:
+                    self.stats["retries"] += 1
+                espera = self.backoff_seconds * (2 ** (tentativa - 1))
+                time.sleep(espera + random.uniform(0, espera / 2))
+            except BatchRejected as e:
+                if len(lote) == 1:
+                    self._confirmar(lote, str(e))
+                    return
+                with self._lock:
+                    self.stats["splits"] += 1
+                meio = len(lote) // 2
+                self._enviar(lote[:meio])
+                self._enviar(lote[meio:])
+                return
+            except Exception as e:
+                self._confirmar(lote, repr(e))
+                return
+
+    def _confirmar(self, lote: List[Tuple[str, Dict]], erro: Optional[str]):
+        prontos = []
+        with self._lock:
+            for data_iso, payload in lote:
+                estado = self._datas[data_iso]
+                estado.pendentes -= 1
+                if erro is None:
+                    estado.ok += 1
+                    self.stats["ok"] += 1
+                else:
+                    estado.fail += 1
+                    self.stats["fail"] += 1
+                    estado.erros.append(f"{payload.get('tipo_ato', '')}: {erro}")
+                if estado.pendentes == 0 and estado.callback is not None:
+                    prontos.append((estado.callback, estado))
+                    estado.callback = None
+        for callback, estado in prontos:
+            callback(estado.ok, estado.fail, estado.erros)
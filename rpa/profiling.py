@@ -0,0 +1,70 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+# Etapas medidas por data (na ordem em que acontecem)
+ETAPAS = ("navigate", "fill", "submit", "wait", "extract", "paginate")
+
+
+class StepProfiler:
+    """
+    Tempo por etapa da raspagem, agregado na execução e por data.
+    O resultado de to_dict() vai no campo "perfil" do ExecucaoLog.
+    """
+
+    def __init__(self, estrategia: str = ""):
+        self.estrategia = estrategia
+        self._lock = threading.Lock()
+        self._etapas: Dict[str, Dict[str, float]] = {}
+        self._por_data: Dict[str, Dict[str, float]] = {}
+
+    def record(self, etapa: str, seconds: float, data: Optional[str] = None):
+        with self._lock:
+            e = self._etapas.setdefault(etapa, {"n": 0, "total_s": 0.0, "max_s": 0.0})
+            e["n"] += 1
+            e["total_s"] += seconds
+            e["max_s"] = max(e["max_s"], seconds)
+            if data:
+                d = self._por_data.setdefault(data, {})
+                d[etapa] = d.get(etapa, 0.0) + seconds
+
+    @contextmanager
+    def step(self, etapa: str, data: Optional[str] = None):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(etapa, time.perf_counter() - inicio, data)
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            ordem = sorted(self._etapas, key=lambda k: ETAPAS.index(k) if k in ETAPAS else len(ETAPAS))
+            return {
+                "estrategia_espera": self.estrategia,
+                "etapas": {
+                    k: {
+                        "n": int(self._etapas[k]["n"]),
+                        "total_s": round(self._etapas[k]["total_s"], 4),
+                        "max_s": round(self._etapas[k]["max_s"], 4),
+                    }
+                    for k in ordem
+                },
+                "por_data": {
+                    data: {k: round(v, 4) for k, v in etapas.items()}
+                    for data, etapas in sorted(self._por_data.items())
+                },
+            }
+
+    def summary_lines(self) -> list:
+        linhas = []
+        for etapa, e in self.to_dict()["etapas"].items():
+            linhas.append(f"  {etapa:<9} n={e['n']:<5} total={e['total_s']:.2f}s max={e['max_s']:.2f}s")
+        return linhas
+
+
+class NullProfiler(StepProfiler):
+    """Usado quando ninguém pediu perfil (ex.: chamadas avulsas de scrape_date)."""
+
+    def record(self, etapa: str, seconds: float, data: Optional[str] = None):
+        pass
@@ -0,0 +1,389 @@
+"""
+Agendador assíncrono dos jobs do RPA: expressões cron (horário local),
+estado da última execução em disco para recuperar janelas perdidas depois
+de um restart (catch-up), trava por job contra execuções sobrepostas
+(também entre processos) e atraso aleatório (jitter) no disparo.
+
+Cada job é uma função síncrona (run_rpa, run_backfill...) executada numa
+thread; um único processo supervisiona vários jobs ao mesmo tempo.
+"""
+import asyncio
+import json
+import os
+import random
+import re
+import threading
+import traceback
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+ATALHOS = {
+    "@hourly": "0 * * * *",
+    "@daily": "0 0 * * *",
+    "@weekly": "0 0 * * 0",
+    "@monthly": "0 0 1 * *",
+}
+NOMES_MES = {n: i for i, n in enumerate(
+    ["jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"], start=1
+)}
+NOMES_DIA = {n: i for i, n in enumerate(["sun", "mon", "tue", "wed", "thu", "fri", "sat"])}
+
+# (mínimo, máximo, nomes) de minuto, hora, dia do mês, mês e dia da semana
+CAMPOS_CRON = ((0, 59, {}), (0, 23, {}), (1, 31, {}), (1, 12, NOMES_MES), (0, 7, NOMES_DIA))
+
+# Busca da próxima execução desiste depois disso (ex.: "0 0 31 2 *")
+MAX_ANOS_BUSCA = 5
+
+SOBREPOSICAO_PULAR = "skip"
+SOBREPOSICAO_ENFILEIRAR = "queue"
+
+
+class CronError(ValueError):
+    """Expressão cron inválida."""
+
+
+def _valor(texto: str, nomes: Dict[str, int]) -> int:
+    texto = texto.strip().lower()
+    if texto in nomes:
+        return nomes[texto]
+    if not texto.isdigit():
+        raise CronError(f"Valor inválido: {texto!r}")
+    return int(texto)
+
+
+def parse_campo(texto: str, minimo: int, maximo: int, nomes: Dict[str, int]) -> Set[int]:
+    """Um campo cron: *, listas (1,15), intervalos (1-5) e passos (*/10, 8-18/2)."""
+    valores: Set[int] = set()
+    for item in texto.split(","):
+        intervalo, _, passo_txt = item.partition("/")
+        passo = int(passo_txt) if passo_txt else 1
+        if passo < 1:
+            raise CronError(f"Passo inválido em {texto!r}")
+        if intervalo == "*":
+            inicio, fim = minimo, maximo
+        elif "-" in intervalo:
+            a, b = intervalo.split("-", 1)
+            inicio, fim = _valor(a, nomes), _valor(b, nomes)
+        else:
+            inicio = _valor(intervalo, nomes)
+            fim = maximo if passo_txt else inicio
+        if not minimo <= inicio <= fim <= maximo:
+            raise CronError(f"Fora do intervalo {minimo}-{maximo}: {texto!r}")
+        valores.update(range(inicio, fim + 1, passo))
+    return valores
+
+
+class CronExpression:
+    """
+    Cron de 5 campos (minuto hora dia mês dia-da-semana), ou um atalho como
+    @daily. Várias expressões separadas por ";" são unidas (ex.: dois
+    horários com minutos diferentes). Como no cron, se dia do mês e dia da
+    semana forem ambos restritos, basta um dos dois casar.
+    """
+
+    def __init__(self, expr: str):
+        self.expr = expr.strip()
+        self._alternativas: List[Tuple[Set[int], ...]] = []
+        for parte in self.expr.split(";"):
+            parte = ATALHOS.get(parte.strip().lower(), parte.strip())
+            campos = parte.split()
+            if len(campos) != 5:
+                raise CronError(f"Esperados 5 campos em {parte!r}")
+            minutos, horas, dias, meses, semana = (
+                parse_campo(c, lo, hi, nomes) for c, (lo, hi, nomes) in zip(campos, CAMPOS_CRON)
+            )
+            # 7 também é domingo
+            semana = {d % 7 for d in semana}
+            dia_livre = campos[2] == "*"
+            semana_livre = campos[4] == "*"
+            self._alternativas.append((minutos, horas, dias, meses, semana, dia_livre, semana_livre))
+        # Valida que a expressão tem alguma execução possível
+        self.next_after(datetime(2000, 1, 1))
+
+    def __repr__(self):
+        return f"CronExpression({self.expr!r})"
+
+    @staticmethod
+    def _dia_casa(alt, dt: datetime) -> bool:
+        _, _, dias, meses, semana, dia_livre, semana_livre = alt
+        if dt.month not in meses:
+            return False
+        dia_ok = dt.day in dias
+        semana_ok = dt.isoweekday() % 7 in semana
+        if dia_livre or semana_livre:
+            return dia_ok and semana_ok
+        return dia_ok or semana_ok
+
+    def matches(self, dt: datetime) -> bool:
+        return any(
+            dt.minute in alt[0] and dt.hour in alt[1] and self._dia_casa(alt, dt)
+            for alt in self._alternativas
+        )
+
+    def _proxima(self, alt, depois: datetime) -> datetime:
+        minutos, horas = alt[0], alt[1]
+        dt = depois.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limite = dt + timedelta(days=366 * MAX_ANOS_BUSCA)
+        while dt < limite:
+            if not self._dia_casa(alt, dt):
+                dt = (dt + timedelta(days=1)).replace(hour=0, minute=0)
+                continue
+            if dt.hour not in horas:
+                dt = (dt + timedelta(hours=1)).replace(minute=0)
+                continue
+            if dt.minute not in minutos:
+                dt += timedelta(minutes=1)
+                continue
+            return dt
+        raise CronError(f"Sem próxima execução para {self.expr!r}")
+
+    def next_after(self, depois: datetime) -> datetime:
+        """Próximo instante (minuto cheio) estritamente depois de `depois`."""
+        return min(self._proxima(alt, depois) for alt in self._alternativas)
+
+
+@dataclass
+class Job:
+    nome: str
+    cron: CronExpression
+    fn: Callable[[], Any]
+    jitter_seconds: float = 0.0
+    # Na subida, roda uma vez se alguma execução agendada foi perdida
+    catch_up: bool = True
+    # "skip": ignora o disparo se a anterior ainda roda; "queue": roda logo
+    # depois dela (disparos acumulados viram um só)
+    sobreposicao: str = SOBREPOSICAO_PULAR
+    # Libera recursos do job (ex.: navegadores) no fim do serviço
+    fechar: Optional[Callable[[], None]] = None
+
+    def __post_init__(self):
+        if isinstance(self.cron, str):
+            self.cron = CronExpression(self.cron)
+        if not re.fullmatch(r"[\w.-]+", self.nome):
+            raise ValueError(f"Nome de job inválido: {self.nome!r}")
+        if self.sobreposicao not in (SOBREPOSICAO_PULAR, SOBREPOSICAO_ENFILEIRAR):
+            raise ValueError(f"Sobreposição inválida: {self.sobreposicao!r}")
+
+
+class StateStore:
+    """Estado por job num JSON: última janela agendada concluída, início, fim e status."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        try:
+            self._dados: Dict[str, Dict[str, Any]] = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            self._dados = {}
+
+    def get(self, nome: str) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self._dados.get(nome, {}))
+
+    def last_scheduled(self, nome: str) -> Optional[datetime]:
+        valor = self.get(nome).get("ultima_agendada")
+        return datetime.fromisoformat(valor) if valor else None
+
+    def update(self, nome: str, **campos):
+        with self._lock:
+            estado = self._dados.setdefault(nome, {})
+            for chave, valor in campos.items():
+                estado[chave] = valor.isoformat(timespec="seconds") if isinstance(valor, datetime) else valor
+            # Escrita atômica: um crash no meio não corrompe o arquivo
+            tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+            tmp.write_text(json.dumps(self._dados, indent=2, ensure_ascii=False), encoding="utf-8")
+            os.replace(tmp, self.path)
+
+
+class JobLock:
+    """
+    Trava exclusiva por job num arquivo (flock/msvcrt): impede a mesma
+    coleta rodando duas vezes, inclusive em processos diferentes (serviço
+    e disparo manual pela CLI). O sistema libera a trava se o processo morrer.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._fd: Optional[int] = None
+
+    def acquire(self) -> bool:
+        fd = os.open(str(self.path), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+        except OSError:
+            os.close(fd)
+            return False
+        os.ftruncate(fd, 0)
+        os.write(fd, str(os.getpid()).encode("ascii"))
+        self._fd = fd
+        return True
+
+    def release(self):
+        if self._fd is None:
+            return
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+            else:
+                os.lseek(self._fd, 0, os.SEEK_SET)
+                msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+        finally:
+            os.close(self._fd)
+            self._fd = None
+
+
+class Scheduler:
+    def __init__(
+        self,
+        jobs: List[Job],
+        state_path: Path,
+        lock_dir: Path,
+        max_sleep_seconds: float = 60,
+    ):
+        nomes = [j.nome for j in jobs]
+        if len(set(nomes)) != len(nomes):
+            raise ValueError("Nomes de job repetidos")
+        self.jobs = {j.nome: j for j in jobs}
+        self.state = StateStore(state_path)
+        self.lock_dir = Path(lock_dir)
+        self.lock_dir.mkdir(parents=True, exist_ok=True)
+        # Dorme em pedaços para acompanhar mudança de relógio/suspensão
+        self.max_sleep_seconds = max_sleep_seconds
+        self._parar: Optional[asyncio.Event] = None
+        self._rodando: Dict[str, asyncio.Task] = {}
+        self._pendente: Dict[str, Optional[datetime]] = {}
+
+    # ------------------------------------------------------------ serviço
+    async def run(self):
+        """Roda até stop(); espera os jobs em andamento terminarem."""
+        self._parar = asyncio.Event()
+        print(f"[SCHEDULER] {len(self.jobs)} job(s): " + ", ".join(f"{j.nome} ({j.cron.expr})" for j in self.jobs.values()))
+        tarefas = [asyncio.create_task(self._loop(job)) for job in self.jobs.values()]
+        try:
+            await self._parar.wait()
+        finally:
+            for t in tarefas:
+                t.cancel()
+            await asyncio.gather(*tarefas, return_exceptions=True)
+            if self._rodando:
+                print("[SCHEDULER] Aguardando jobs em andamento...")
+                await asyncio.gather(*self._rodando.values(), return_exceptions=True)
+
+    def stop(self):
+        if self._parar is not None:
+            self._parar.set()
+
+    def close(self):
+        for job in self.jobs.values():
+            if job.fechar is not None:
+                job.fechar()
+
+    async def _loop(self, job: Job):
+        agora = datetime.now()
+        anterior = self.state.last_scheduled(job.nome)
+        if job.catch_up and anterior is not None:
+            perdida = job.cron.next_after(anterior)
+            if perdida <= agora:
+                print(f"[SCHEDULER] {job.nome}: execução de {perdida:%Y-%m-%d %H:%M} perdida; rodando agora (catch-up).")
+                self._disparar(job, perdida)
+
+        ultima = agora
+        while True:
+            proxima = job.cron.next_after(ultima)
+            print(f"[SCHEDULER] {job.nome}: próxima execução {proxima:%Y-%m-%d %H:%M}")
+            if await self._dormir_ate(proxima):
+                return
+            self._disparar(job, proxima)
+            ultima = proxima
+
+    async def _dormir_ate(self, quando: datetime) -> bool:
+        """Espera até `quando`; True se o scheduler foi parado antes."""
+        while True:
+            falta = (quando - datetime.now()).total_seconds()
+            if falta <= 0:
+                return False
+            try:
+                await asyncio.wait_for(self._parar.wait(), timeout=min(falta, self.max_sleep_seconds))
+                return True
+            except asyncio.TimeoutError:
+                continue
+
+    def _disparar(self, job: Job, agendada: datetime):
+        atual = self._rodando.get(job.nome)
+        if atual is not None and not atual.done():
+            if job.sobreposicao == SOBREPOSICAO_ENFILEIRAR:
+                print(f"[SCHEDULER] {job.nome}: ainda rodando; execução de {agendada:%H:%M} enfileirada.")
+                self._pendente[job.nome] = agendada
+            else:
+                print(f"[SCHEDULER] {job.nome}: ainda rodando; execução de {agendada:%H:%M} ignorada.")
+                self.state.update(job.nome, ultima_ignorada=agendada)
+            return
+        self._rodando[job.nome] = asyncio.create_task(self._executar_fila(job, agendada))
+
+    async def _executar_fila(self, job: Job, agendada: Optional[datetime]):
+        while True:
+            if job.jitter_seconds > 0:
+                await asyncio.sleep(random.uniform(0, job.jitter_seconds))
+            await self.run_job(job.nome, agendada)
+            if job.nome not in self._pendente:
+                return
+            agendada = self._pendente.pop(job.nome)
+
+    # ------------------------------------------------------------ execução
+    async def run_job(self, nome: str, agendada: Optional[datetime] = None) -> Optional[str]:
+        """
+        Executa o job já (sem jitter), respeitando a trava. Devolve o status
+        ("ok", "erro") ou None se outra execução estava em andamento.
+        `agendada` é a janela do cron atendida (None = disparo manual).
+        """
+        job = self.jobs[nome]
+        trava = JobLock(self.lock_dir / f"{nome}.lock")
+        if not trava.acquire():
+            print(f"[SCHEDULER] {nome}: outra execução em andamento (trava); ignorando.")
+            return None
+
+        inicio = datetime.now()
+        print(f"\n[SCHEDULER] {nome}: iniciada em {inicio:%Y-%m-%d %H:%M:%S}")
+        self.state.update(nome, ultimo_inicio=inicio, status="executando")
+        status, erro = "ok", None
+        try:
+            await asyncio.to_thread(job.fn)
+        except Exception as e:
+            status, erro = "erro", repr(e)
+            print(f"[SCHEDULER] {nome}: ERRO na execução: {e}")
+            traceback.print_exc()
+        finally:
+            trava.release()
+
+        campos: Dict[str, Any] = {"ultimo_fim": datetime.now(), "status": status, "erro": erro}
+        # Só a janela agendada concluída conta para o catch-up (um crash no
+        # meio da execução faz ela rodar de novo na subida)
+        if agendada is not None:
+            campos["ultima_agendada"] = agendada
+        self.state.update(nome, **campos)
+        print(f"[SCHEDULER] {nome}: finalizada ({status}).")
+        return status
+
+    # ------------------------------------------------------------ consulta
+    def status(self, agora: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        agora = agora or datetime.now()
+        return [
+            {
+                "job": job.nome,
+                "cron": job.cron.expr,
+                "proxima": job.cron.next_after(agora).isoformat(timespec="minutes"),
+                **self.state.get(job.nome),
+            }
+            for job in self.jobs.values()
+        ]
@@ -0,0 +1,95 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from api_client import ApiClient
+
+
+class ApiFalsa:
+    """API mínima: /token emite t1, t2...; /atos/bulk falha com 503 e depois recusa t1."""
+
+    def __init__(self):
+        self.tokens = 0
+        self.bulk = 0
+        self.portas = set()
+        servidor = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _responder(self, status, corpo):
+                dados = json.dumps(corpo).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(dados)))
+                self.end_headers()
+                self.wfile.write(dados)
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                servidor.portas.add(self.client_address[1])
+                if self.path == "/token":
+                    servidor.tokens += 1
+                    return self._responder(200, {"access_token": f"t{servidor.tokens}", "expires_in": 3600})
+                servidor.bulk += 1
+                if servidor.bulk == 1:
+                    return self._responder(503, {"detail": "indisponível"})
+                if self.headers.get("Authorization") == "Bearer t1":
+                    return self._responder(401, {"detail": "Token inválido ou expirado"})
+                return self._responder(200, {"total": 1})
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+
+@pytest.fixture
+def api_falsa():
+    api = ApiFalsa()
+    yield api
+    api.httpd.shutdown()
+    api.httpd.server_close()
+
+
+def test_retry_reauth_e_metricas(api_falsa, tmp_path):
+    client = ApiClient(
+        f"{api_falsa.url}/token", "robo", "senha",
+        backoff_seconds=0.01, token_cache_path=tmp_path / "token.json",
+    )
+    try:
+        r = client.post("bulk", f"{api_falsa.url}/atos/bulk", [{"numero_ato": 1}])
+        assert r.status_code == 200
+        for _ in range(5):
+            assert client.post("bulk", f"{api_falsa.url}/atos/bulk", [{"numero_ato": 1}]).status_code == 200
+    finally:
+        client.close()
+
+    # 503 -> retry; 401 com t1 -> novo login (t2) e reenvio
+    assert api_falsa.tokens == 2 and client.token == "t2"
+    metricas = client.metrics()
+    assert metricas["bulk"]["requests"] == 8
+    assert metricas["bulk"]["retries"] == 2
+    assert metricas["bulk"]["status"] == {"503": 1, "401": 1, "200": 6}
+    assert sum(metricas["bulk"]["latency"]["buckets"].values()) == 8
+    latencia = client.latency_percentiles(["bulk"])
+    assert 0 < latencia["p50"] <= latencia["p95"] <= metricas["bulk"]["latency"]["max_ms"]
+    assert client.latency_percentiles(["logs"]) == {"p50": None, "p95": None}
+    # keep-alive: todas as chamadas na mesma conexão
+    assert len(api_falsa.portas) == 1
+
+
+def test_token_reaproveitado_do_cache(api_falsa, tmp_path):
+    cache = tmp_path / "token.json"
+    primeiro = ApiClient(f"{api_falsa.url}/token", "robo", "senha", token_cache_path=cache)
+    assert primeiro.authenticate()
+    primeiro.close()
+
+    segundo = ApiClient(f"{api_falsa.url}/token", "robo", "senha", token_cache_path=cache)
+    assert segundo.authenticate() and segundo.token == "t1"
+    segundo.close()
+    assert api_falsa.tokens == 1
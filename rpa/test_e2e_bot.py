@@ -0,0 +1,396 @@
+import shutil
+import threading
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+import pytest
+import requests
+
+import backfill
+import bot
+import checkpoint
+import pipeline
+import http_engine
+from fixtures.sijut_server import SijutFixtureServer, atos_sinteticos as fixtures_atos
+from profiling import StepProfiler
+
+HTML = Path(__file__).resolve().parent / "fixtures" / "html"
+
+CHROME = any(shutil.which(b) for b in ("google-chrome", "google-chrome-stable", "chromium", "chromium-browser", "chrome"))
+
+
+@pytest.fixture(scope="module")
+def sijut():
+    with SijutFixtureServer(page_size=10) as servidor:
+        yield servidor
+
+
+def test_fixture_formulario_e_paginacao(sijut):
+    form = requests.get(sijut.url, timeout=5).text
+    for seletor in ('id="daPublicacao"', 'id="dt_inicio"', 'id="dt_fim"', 'id="btnSubmit"'):
+        assert seletor in form
+
+    # 2024-01-06: ordinal % 7 == 6 -> 30 atos, 3 páginas
+    dia = date(2024, 1, 6)
+    assert len(sijut.atos_da_data(dia)) == 30
+    params = {"acao": "buscar", "dt_inicio": "06/01/2024", "dt_fim": "06/01/2024"}
+    pagina1 = requests.get(sijut.url, params=params, timeout=5).text
+    assert 'id="tabelaAtos"' in pagina1 and "li class='next'" in pagina1
+    pagina3 = requests.get(sijut.url, params={**params, "p": 3}, timeout=5).text
+    assert "next disabled" in pagina3
+
+
+def test_run_dates_paralelo_compartilha_seen():
+    seen = bot.SeenSet()
+    threads = set()
+    datas = [date(2024, 1, 1) + timedelta(days=i) for i in range(8)]
+
+    def worker(alvo):
+        threads.add(threading.current_thread().name)
+        time.sleep(0.05)
+        # a mesma chave em todas as datas: só a primeira a registrar ganha
+        novos = sum(1 for chave in [("fixa",), (alvo,)] if seen.add(chave))
+        return {"data": alvo, "new": novos}
+
+    resultados = bot.run_dates(datas, workers=4, worker_fn=worker)
+
+    assert [r["data"] for r in resultados] == datas
+    assert sum(r["new"] for r in resultados) == len(datas) + 1
+    assert len(threads) > 1
+
+
+@pytest.mark.skipif(not CHROME, reason="Chrome não instalado")
+def test_scrape_paralelo_contra_fixture(sijut, monkeypatch):
+    monkeypatch.setattr(bot, "BASE_URL", sijut.url)
+    enviados = {}
+    # DirectSink envia página a página: acumula as páginas da data
+    monkeypatch.setattr(bot, "send_to_api", lambda items, data_iso, **_: (enviados.setdefault(data_iso, []).extend(items), (len(items), 0))[1])
+
+    datas = [date(2024, 1, 1) + timedelta(days=i) for i in range(6)]
+    seen = bot.SeenSet()
+    drivers = bot.DriverPool(headless=True)
+    try:
+        resultados = bot.run_dates(datas, 3, lambda alvo: bot.process_date(alvo, seen, lambda d: bot.iter_pages(*drivers.get(), d)))
+    finally:
+        drivers.quit_all()
+
+    for r in resultados:
+        assert r["erro"] is None
+        esperado = sijut.atos_da_data(r["data"])
+        assert r["new"] == len(esperado)
+        if esperado:
+            assert [i["numero_ato"] for i in enviados[r["data"].isoformat()]] == [a["numero_ato"] for a in esperado]
+
+
+def test_http_engine_fixtures_gravadas():
+    _, metodo, params = http_engine.form_params((HTML / "formulario.html").read_text(encoding="utf-8"), "01/02/2024")
+    assert metodo == "get"
+    assert params["tipoData"] == "publicacao"
+    assert params["dt_inicio"] == params["dt_fim"] == "01/02/2024"
+    assert "vigentes" not in params
+
+    rows, proxima, vazio = http_engine.parse_resultados((HTML / "resultado_pagina1.html").read_text(encoding="utf-8"))
+    assert len(rows) == 10 and proxima and not vazio
+    assert set(rows[0]) == {"tipo_ato", "numero_ato", "orgao", "publicacao_texto", "ementa"}
+    assert rows[0]["numero_ato"] == 89101
+
+    rows, proxima, _ = http_engine.parse_resultados((HTML / "resultado_ultima_pagina.html").read_text(encoding="utf-8"))
+    assert len(rows) == 10 and proxima is None
+
+    rows, _, vazio = http_engine.parse_resultados((HTML / "sem_resultados.html").read_text(encoding="utf-8"))
+    assert rows == [] and vazio
+
+
+def test_http_engine_contra_fixture(sijut):
+    engine = http_engine.HttpEngine(sijut.url, timeout=5)
+    profiler = StepProfiler("event")
+    try:
+        for dia in (date(2024, 1, 6), date(2024, 1, 7), date(2024, 1, 9)):
+            rows = [{k: v for k, v in r.items() if k != "_pagina"} for r in engine.scrape_date(dia, profiler)]
+            assert rows == sijut.atos_da_data(dia)
+    finally:
+        engine.close()
+
+    perfil = profiler.to_dict()
+    assert list(perfil["etapas"]) == ["navigate", "fill", "submit", "extract", "paginate"]
+    assert perfil["etapas"]["navigate"]["n"] == 3
+    # 06/01: 30 atos em 3 páginas -> 2 paginações
+    assert perfil["etapas"]["paginate"]["n"] == 2
+    assert set(perfil["por_data"]) == {"2024-01-06", "2024-01-07", "2024-01-09"}
+
+
+@pytest.mark.skipif(not CHROME, reason="Chrome não instalado")
+def test_extract_rows_js_igual_elements(sijut):
+    driver, wait = bot.setup_driver(headless=True)
+    try:
+        driver.get(sijut.url + "?acao=buscar&dt_inicio=06/01/2024&dt_fim=06/01/2024")
+        assert bot.extract_rows(driver, wait, mode="js") == bot.extract_rows(driver, wait, mode="elements")
+    finally:
+        driver.quit()
+
+
+def test_resolve_driver_path_usa_cache_em_disco(tmp_path, monkeypatch):
+    binario = tmp_path / "chromedriver"
+    binario.write_text("#!/bin/sh\n")
+    binario.chmod(0o755)
+    cache = tmp_path / "driver.json"
+    cache.write_text(f'{{"path": "{binario}"}}')
+
+    def sem_rede():
+        raise AssertionError("não deveria consultar o webdriver-manager")
+
+    monkeypatch.delenv("CHROMEDRIVER_PATH", raising=False)
+    monkeypatch.setattr(bot, "DRIVER_CACHE_PATH", cache)
+    monkeypatch.setattr(bot, "ChromeDriverManager", sem_rede)
+    assert bot.resolve_driver_path() == str(binario)
+
+    # Binário salvo sumiu: resolve de novo e regrava o cache
+    binario.unlink()
+    novo = tmp_path / "novo-chromedriver"
+    monkeypatch.setattr(bot, "ChromeDriverManager", lambda: type("M", (), {"install": lambda self: str(novo)})())
+    assert bot.resolve_driver_path() == str(novo)
+    assert str(novo) in cache.read_text()
+
+
+@pytest.mark.skipif(not CHROME, reason="Chrome não instalado")
+def test_driver_pool_reaproveita_entre_execucoes(sijut):
+    drivers = bot.DriverPool(headless=True, max_runs=2)
+    try:
+        primeiro, _ = drivers.get()
+        drivers.end_run()
+        segundo, _ = drivers.get()
+        assert segundo is primeiro
+        drivers.end_run()
+        # max_runs=2: reciclado
+        terceiro, _ = drivers.get()
+        assert terceiro is not primeiro
+        assert drivers.stats == {"created": 2, "reused": 1, "recycled": 1}
+    finally:
+        drivers.quit_all()
+
+
+def test_checkpoint_envia_so_novas_ou_alteradas(sijut, tmp_path, monkeypatch):
+    enviados = []
+    monkeypatch.setattr(bot, "send_to_api", lambda items, data_iso, **_: (enviados.extend(items), (len(items), 0))[1])
+    engine = http_engine.HttpEngine(sijut.url, timeout=5)
+    store = checkpoint.CheckpointStore(tmp_path / "checkpoint.sqlite3")
+    dia = date(2024, 1, 6)
+
+    def paginas_de(rows):
+        return lambda _: iter([[r for r in rows if r["_pagina"] == p] for p in sorted({r["_pagina"] for r in rows})])
+
+    try:
+        rows = engine.scrape_date(dia)
+        # Uma linha já enviada por outra data nesta execução: o dedupe a
+        # descarta e ela não pode entrar no checkpoint
+        seen = bot.SeenSet()
+        bot.filter_new([rows[15]], seen)
+        primeira = bot.process_date(dia, seen, paginas_de(rows), store)
+        assert primeira["new"] == 29
+
+        # Próxima execução: só a linha que ficou de fora
+        enviados.clear()
+        segunda = bot.process_date(dia, bot.SeenSet(), paginas_de(rows), store)
+        assert [r["numero_ato"] for r in enviados] == [rows[15]["numero_ato"]]
+        assert segunda["unchanged"] == 29
+
+        # Nada mudou: tudo inalterado
+        enviados.clear()
+        terceira = bot.process_date(dia, bot.SeenSet(), paginas_de(rows), store)
+        assert enviados == [] and terceira["unchanged"] == 30
+
+        # Uma ementa alterada na página 2 e um ato novo no fim
+        alterado = [dict(r) for r in rows]
+        alterado[12]["ementa"] += " (retificada)"
+        alterado.append(dict(alterado[-1], tipo_ato="Portaria RFB nº 1", numero_ato=1, _pagina=4))
+        quarta = bot.process_date(dia, bot.SeenSet(), paginas_de(alterado), store)
+        assert [r["numero_ato"] for r in enviados] == [alterado[12]["numero_ato"], 1]
+        assert quarta["unchanged"] == 29
+    finally:
+        store.close()
+        engine.close()
+
+
+def test_process_date_com_checkpoint(sijut, tmp_path, monkeypatch):
+    enviados = []
+    monkeypatch.setattr(bot, "send_to_api", lambda items, data_iso, **_: (enviados.append(len(items)), (len(items), 0))[1])
+    engine = http_engine.HttpEngine(sijut.url, timeout=5)
+    store = checkpoint.CheckpointStore(tmp_path / "checkpoint.sqlite3")
+    dia = date(2024, 1, 6)
+    try:
+        primeira = bot.process_date(dia, bot.SeenSet(), engine.iter_pages, store)
+        segunda = bot.process_date(dia, bot.SeenSet(), engine.iter_pages, store)
+    finally:
+        store.close()
+        engine.close()
+
+    assert primeira["new"] == 30 and segunda["new"] == 0
+    assert segunda["unchanged"] == 30
+    # DirectSink: um envio por página
+    assert enviados == [10, 10, 10]
+
+
+def test_fallback_selenium_retoma_da_pagina_que_falhou(monkeypatch):
+    monkeypatch.setattr(bot, "send_to_api", lambda items, data_iso, **_: (len(items), 0))
+    dia = date(2024, 1, 6)
+    paginas = [
+        [{"tipo_ato": f"Portaria {p}-{i}", "numero_ato": p * 10 + i, "orgao": "RFB", "publicacao_texto": "06/01/2024", "ementa": "x", "_pagina": p} for i in range(10)]
+        for p in (1, 2, 3)
+    ]
+    pedidos = []
+
+    def http():
+        yield paginas[0]
+        yield paginas[1]
+        raise requests.ConnectionError("conexão caiu na página 3")
+
+    def selenium(pular_paginas):
+        pedidos.append(pular_paginas)
+        return iter(paginas[pular_paginas:])
+
+    resultado = bot.process_date(dia, bot.SeenSet(), lambda d: bot.iter_with_fallback(http, selenium, f"{d:%d/%m/%Y}"))
+    # Selenium continua da página 3: nada contado duas vezes
+    assert pedidos == [2]
+    assert resultado["erro"] is None
+    assert (resultado["paginas"], resultado["linhas"], resultado["new"]) == (3, 30, 30)
+
+    # Motor "http" (estrito): a falha vira erro da data
+    resultado = bot.process_date(dia, bot.SeenSet(), lambda d: bot.iter_with_fallback(http, selenium, "", estrito=True))
+    assert "ConnectionError" in resultado["erro"] and pedidos == [2]
+
+
+def test_pipeline_lotes_retry_e_erro_por_item():
+    lotes = []
+    falhas = {"transitorias": 2}
+
+    def send(payloads):
+        if falhas["transitorias"]:
+            falhas["transitorias"] -= 1
+            raise pipeline.RetryableError("HTTP 503")
+        if any(p["numero_ato"] == 13 for p in payloads):
+            raise pipeline.BatchRejected("HTTP 422: numero_ato inválido")
+        time.sleep(0.01)
+        lotes.append(len(payloads))
+
+    fila = pipeline.IngestPipeline(send, workers=2, queue_size=5, batch_size=4, backoff_seconds=0.01)
+    concluidas = {}
+    for dia in ("2024-01-01", "2024-01-02"):
+        fila.put(dia, [{"tipo_ato": f"Portaria {n}", "numero_ato": n} for n in range(10 if dia.endswith("1") else 20, 20 if dia.endswith("1") else 25)])
+        fila.finish_date(dia, lambda ok, fail, erros, dia=dia: concluidas.__setitem__(dia, (ok, fail, erros)))
+    fila.close()
+
+    assert concluidas["2024-01-01"][:2] == (9, 1)
+    assert "Portaria 13" in concluidas["2024-01-01"][2][0]
+    assert concluidas["2024-01-02"] == (5, 0, [])
+    assert max(lotes) <= 4 and sum(lotes) == 14
+    assert fila.stats["retries"] == 2 and fila.stats["splits"] >= 1
+    # put bloqueia com a fila cheia (5): a profundidade nunca passa disso
+    assert fila.stats["max_queue_depth"] <= 5
+
+
+def test_pipeline_payload_invalido_nao_trava_a_data():
+    recebidos = []
+
+    def to_payload(data_iso, row):
+        if row["numero_ato"] == 2:
+            raise ValueError("data ilegível")
+        return row
+
+    fila = pipeline.IngestPipeline(recebidos.extend, to_payload=to_payload, workers=1, batch_size=10)
+    concluida = []
+    fila.put("2024-01-01", [{"tipo_ato": f"Portaria {n}", "numero_ato": n} for n in range(1, 4)])
+    fila.finish_date("2024-01-01", lambda ok, fail, erros: concluida.append((ok, fail, erros)))
+    fila.close()
+
+    # O callback dispara (a data não fica pendente) e a linha conta como falha
+    (ok, fail, erros), = concluida
+    assert (ok, fail) == (2, 1) and "Portaria 2" in erros[0]
+    assert len(recebidos) == 2
+
+
+def test_process_date_com_pipeline(sijut, tmp_path):
+    recebidos = []
+    engine = http_engine.HttpEngine(sijut.url, timeout=5)
+    store = checkpoint.CheckpointStore(tmp_path / "checkpoint.sqlite3")
+    fila = pipeline.IngestPipeline(recebidos.extend, to_payload=bot.build_payload, workers=2, batch_size=7)
+    try:
+        resultado = bot.process_date(date(2024, 1, 6), bot.SeenSet(), engine.iter_pages, store, fila)
+        fila.close()
+        assert store.has_date("2024-01-06")
+    finally:
+        store.close()
+        engine.close()
+
+    assert resultado["ok"] == 30 and resultado["fail"] == 0
+    assert len(recebidos) == 30
+    assert all(p["data_publicacao"] == "2024-01-06" and "_pagina" not in p for p in recebidos)
+    assert resultado["paginas"] == 3 and resultado["linhas"] == 30
+
+    entrada, = bot.metricas_por_data([resultado])
+    assert entrada["data_publicacao"] == "2024-01-06"
+    assert entrada["paginas"] == 3 and entrada["linhas_extraidas"] == 30 and entrada["linhas_enviadas"] == 30
+    assert entrada["duracao_segundos"] > 0 and entrada["erro"] is None
+
+
+
+def test_data_publicacao_diaria_e_backfill():
+    linha = {"tipo_ato": "Portaria", "numero_ato": "1", "orgao": "RFB", "ementa": "x", "publicacao_texto": "05/01/2024"}
+    # Execução diária: a data do filtro, a mesma das linhas já gravadas
+    assert bot.build_payload("2024-01-06", linha)["data_publicacao"] == "2024-01-06"
+    # Backfill: a data da coluna Publicação; sem ela, a da janela
+    assert bot.build_backfill_payload("2024-01-01/2024-01-31", linha)["data_publicacao"] == "2024-01-05"
+    assert bot.build_backfill_payload("2024-01-06", {**linha, "publicacao_texto": ""})["data_publicacao"] == "2024-01-06"
+
+def test_backfill_divide_janelas_e_retoma(tmp_path):
+    inicio, fim = date(2024, 1, 1), date(2024, 2, 10)
+    esperados = {
+        (a["tipo_ato"], a["publicacao_texto"])
+        for n in range((fim - inicio).days + 1)
+        for a in fixtures_atos(inicio + timedelta(days=n))
+    }
+    recebidos = []
+
+    def rodar(servidor, send):
+        engine = http_engine.HttpEngine(servidor.url, timeout=5)
+        store = checkpoint.CheckpointStore(tmp_path / "checkpoint.sqlite3")
+        fila = pipeline.IngestPipeline(send, to_payload=bot.build_backfill_payload, workers=2, batch_size=50, backoff_seconds=0.01)
+        seen = bot.SeenSet()
+        try:
+            resultados = [
+                r
+                for janela in backfill.monthly_windows(inicio, fim)
+                for r in backfill.process_window(*janela, engine.iter_range, lambda rows: bot.filter_new(rows, seen), fila, store, max_pages=8)
+            ]
+            fila.close()
+        finally:
+            store.close()
+            engine.close()
+        return resultados
+
+    def recusa_dia_20(payloads):
+        if any(p["data_publicacao"] == "2024-01-20" for p in payloads):
+            raise pipeline.BatchRejected("HTTP 422")
+        recebidos.extend(payloads)
+
+    with SijutFixtureServer(page_size=10) as servidor:
+        primeira = rodar(servidor, recusa_dia_20)
+        requisicoes_primeira = servidor.requests
+        segunda = rodar(servidor, recebidos.extend)
+        requisicoes_segunda = servidor.requests - requisicoes_primeira
+        terceira = rodar(servidor, recebidos.extend)
+
+    # Janeiro inteiro passa de 8 páginas: foi dividido em janelas menores
+    assert len(primeira) > 2 and all(r["paginas"] <= 8 for r in primeira)
+    falhas = [r for r in primeira if r["fail"]]
+    assert len(falhas) == 1 and falhas[0]["inicio"] <= date(2024, 1, 20) <= falhas[0]["fim"]
+    # Retomada: só a janela com falha é consultada de novo; depois, nada
+    assert [r["janela"] for r in segunda] == [falhas[0]["janela"]]
+    assert requisicoes_segunda < requisicoes_primeira / 3
+    assert terceira == []
+
+    # Todos os atos chegam, com a data lida da coluna Publicação. A janela
+    # retomada é reenviada inteira (o upsert do /atos/bulk é idempotente)
+    assert len(recebidos) == len(esperados) + falhas[0]["ok"]
+    assert {(p["tipo_ato"], p["publicacao_texto"]) for p in recebidos} == esperados
+    assert all(p["data_publicacao"] == date(*map(int, reversed(p["publicacao_texto"].split("/")))).isoformat() for p in recebidos)
@@ -0,0 +1,116 @@
+import asyncio
+import json
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from scheduler import CronError, CronExpression, Job, JobLock, Scheduler
+
+
+def test_cron_proxima_execucao():
+    base = datetime(2024, 1, 31, 23, 59, 30)
+    assert CronExpression("30 0 * * *").next_after(base) == datetime(2024, 2, 1, 0, 30)
+    assert CronExpression("*/15 * * * *").next_after(datetime(2024, 1, 1, 10, 7)) == datetime(2024, 1, 1, 10, 15)
+    # 06/01/2024 é sábado: próximo dia útil às 8h é segunda, 08/01
+    assert CronExpression("0 8-18/2 * * mon-fri").next_after(datetime(2024, 1, 6, 12, 0)) == datetime(2024, 1, 8, 8, 0)
+    # Dia do mês e da semana restritos: basta um casar (dia 1 ou domingo)
+    assert CronExpression("0 0 1 * 0").next_after(datetime(2024, 1, 2)) == datetime(2024, 1, 7, 0, 0)
+    assert CronExpression("0 0 29 2 *").next_after(datetime(2024, 3, 1)) == datetime(2028, 2, 29, 0, 0)
+    # União de horários com minutos diferentes
+    dois = CronExpression("30 0 * * *; 15 12 * * *")
+    assert dois.next_after(datetime(2024, 1, 1, 1, 0)) == datetime(2024, 1, 1, 12, 15)
+    assert CronExpression("@daily").matches(datetime(2024, 5, 5, 0, 0))
+
+    for invalida in ("* * * *", "60 * * * *", "0 0 31 2 *", "*/0 * * * *", "0 0 * * fri-mon"):
+        with pytest.raises(CronError):
+            CronExpression(invalida)
+
+
+def test_trava_entre_processos(tmp_path):
+    primeira = JobLock(tmp_path / "coleta.lock")
+    segunda = JobLock(tmp_path / "coleta.lock")
+    assert primeira.acquire()
+    assert not segunda.acquire()
+    primeira.release()
+    assert segunda.acquire()
+    segunda.release()
+
+
+def test_catch_up_sobreposicao_e_estado(tmp_path):
+    estado = tmp_path / "scheduler.json"
+    # Última janela concluída há 2 horas num job de hora em hora: perdeu uma
+    duas_horas = (datetime.now() - timedelta(hours=2)).replace(minute=0, second=0, microsecond=0)
+    estado.write_text(json.dumps({"horaria": {"ultima_agendada": duas_horas.isoformat()}}))
+
+    execucoes = []
+    liberar = threading.Event()
+
+    def horaria():
+        execucoes.append("horaria")
+        liberar.wait(5)
+
+    def falha():
+        raise RuntimeError("site fora do ar")
+
+    scheduler = Scheduler(
+        [
+            Job("horaria", "0 * * * *", horaria),
+            Job("sem-estado", "0 * * * *", lambda: execucoes.append("sem-estado")),
+            Job("falha", "0 0 1 1 *", falha),
+        ],
+        estado,
+        tmp_path / "locks",
+        max_sleep_seconds=0.05,
+    )
+
+    async def cenario():
+        servico = asyncio.create_task(scheduler.run())
+        await asyncio.sleep(0.2)
+        # Catch-up em andamento: novo disparo é ignorado e a CLI esbarra na trava
+        scheduler._disparar(scheduler.jobs["horaria"], datetime.now())
+        assert await scheduler.run_job("horaria") is None
+        liberar.set()
+        assert await scheduler.run_job("falha") == "erro"
+        scheduler.stop()
+        await asyncio.wait_for(servico, 5)
+
+    asyncio.run(cenario())
+
+    # Só o job com janela perdida rodou na subida; o sem estado espera o cron
+    assert execucoes == ["horaria"]
+    salvo = json.loads(estado.read_text())
+    assert salvo["horaria"]["status"] == "ok"
+    assert salvo["horaria"]["ultima_agendada"] == (duas_horas + timedelta(hours=1)).isoformat()
+    assert "ultima_ignorada" in salvo["horaria"]
+    # Disparo manual não conta como janela agendada
+    assert salvo["falha"]["status"] == "erro" and "ultima_agendada" not in salvo["falha"]
+    assert "site fora do ar" in salvo["falha"]["erro"]
+
+
+def test_enfileira_e_jitter(tmp_path):
+    inicios = []
+
+    def lenta():
+        inicios.append(time.monotonic())
+        time.sleep(0.2)
+
+    scheduler = Scheduler(
+        [Job("fila", "0 0 1 1 *", lenta, jitter_seconds=0.1, sobreposicao="queue")],
+        tmp_path / "scheduler.json",
+        tmp_path / "locks",
+    )
+
+    async def cenario():
+        scheduler._parar = asyncio.Event()
+        job = scheduler.jobs["fila"]
+        agora = datetime.now()
+        # Três disparos com a primeira rodando: viram uma única execução extra
+        for minutos in range(3):
+            scheduler._disparar(job, agora + timedelta(minutes=minutos))
+        await asyncio.wait_for(scheduler._rodando["fila"], 5)
+
+    asyncio.run(cenario())
+    assert len(inicios) == 2
+    assert inicios[1] - inicios[0] >= 0.2